@@ -1,12 +1,32 @@
 import pygame
-import random
 import sys
 import time
 import os
+import random
 import math
 
+from dirty_rects import DirtyRectRenderer
+from engine import GameState, level_size, level_time
+from frame_profiler import FrameProfiler
+from frame_scheduler import IdleScheduler
+from hint_cache import HintCache
+from hints import HintEngine
+from leaderboard import CAMPAIGN, ENDLESS, deal_label, level_label, load_results, record_result, save_results
+from level_catalog import SEEDS_PER_LEVEL, LevelCatalog, deal_number, estimate_par, level_seed
+from level_pipeline import LevelPipeline, ParSolver, PreparedLevel
+from endless import EndlessLevel, endless_levels
+from render_cache import GradientCache, PlateAtlas, TextCache
+from board_view import BOARD_KEYS, BoardView
+from tablebase import Tablebase
+from widgets import RetainedSurface, compose_labels, compose_panel
+
+# STACKING_PLATES_HEADLESS=1 draws through SDL's dummy video driver: no window, no sound (benchmarks, CI)
+HEADLESS = os.environ.get("STACKING_PLATES_HEADLESS") == "1"
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
 pygame.init()
-pygame.mixer.init()
 
 
 def run_splash_screen():
@@ -14,7 +34,7 @@ def run_splash_screen():
     splash_image = pygame.transform.scale(splash_image, (WIDTH, HEIGHT))
 
     button_rect = pygame.Rect(WIDTH // 2 - 150, HEIGHT - 180, 300, 70)
-    button_text = BIG_FONT.render("Start Game", True, BLACK)
+    button_text = text_cache.render(BIG_FONT, "Start Game", True, BLACK)
 
     running = True
     while running:
@@ -32,7 +52,7 @@ def run_splash_screen():
 
         # Optional loading dots animation
         dots = int((time.time() * 2) % 4)
-        loading_text = FONT.render("Loading" + "." * dots, True, (0, 0, 0))
+        loading_text = text_cache.render(FONT, "Loading" + "." * dots, True, (0, 0, 0))
         screen.blit(loading_text, (WIDTH // 2 - loading_text.get_width() // 2, HEIGHT - 80))
 
         # Draw start button
@@ -53,24 +73,42 @@ BLUE = (70,130,255)
 YELLOW = (255,215,0)
 GREEN = (0,200,0)
 RED = (255,0,0)
+ORANGE = (255,140,0)
+PURPLE = (150,60,220)
 
 FONT = pygame.font.SysFont("Segoe UI Emoji",25)
 BIG_FONT = pygame.font.SysFont("Segoe UI Emoji",50)
 SMALL_FONT = pygame.font.SysFont("Segoe UI Emoji", 20)
+TITLE_FONT = pygame.font.SysFont("Segoe UI Emoji", 70)
+text_cache = TextCache() # Shared by every text render below
 
 info = pygame.display.Info()
-WIDTH, HEIGHT = info.current_w, info.current_h
-screen = pygame.display.set_mode((WIDTH , HEIGHT), pygame.FULLSCREEN | pygame.SCALED)
-
-
-pygame.display.set_caption("Stacking Plates Game")
-clock = pygame.time.Clock()
+if HEADLESS:
+    # STACKING_PLATES_SIZE=WxH picks the off-screen resolution
+    WIDTH, HEIGHT = map(int, os.environ.get("STACKING_PLATES_SIZE", "1920x1080").split("x"))
+else:
+    WIDTH, HEIGHT = info.current_w, info.current_h
+screen = None # Created by open_display()
+
+clock = pygame.time.Clock() # Splash screen only; the main loop runs on the idle scheduler
+scheduler = IdleScheduler(fps=30)
+# F3 toggles the frame-time HUD; STACKING_PLATES_PROFILE_LOG=frames.csv (or .jsonl) logs every frame to disk
+profiler = FrameProfiler(log_path=os.environ.get("STACKING_PLATES_PROFILE_LOG"))
 
 # --- Game States ---
-run_splash_screen()
 current_screen = "name_prompt"
 selected_level = 0
-start_time = elapsed_time = score = 0
+start_time = elapsed_time = 0
+game = GameState([], 0) # The level being played, replaced by init_game()
+dealt_layout = () # The level's starting position, for working out its par
+dealt_seed = 0 # Seed the level was dealt from; the same seed is the same layout for every player
+catalog = LevelCatalog.load() # Seeds per level with their par, if levels.json has been built (python level_catalog.py)
+# Fewest moves that win dealt_layout; solved on a worker thread when the level came without it
+par_solver = ParSolver(on_done=lambda: pygame.event.post(pygame.event.Event(pygame.USEREVENT)))
+tablebase = None # Moves-to-win table of the level's size, if one has been built (python tablebase.py)
+last_move_cost = None # Moves the last move or undo added to the shortest win, from the tablebase
+# Hints are kept in hints.sqlite, shared with the other front-ends; the event wakes the idle loop to draw a new one
+hints = HintEngine(on_update=lambda: pygame.event.post(pygame.event.Event(pygame.USEREVENT)), store=HintCache())
 max_time_per_level = 300
 CONTENT_RECT = pygame.Rect(
     int(WIDTH * 0.05),
@@ -81,7 +119,7 @@ CONTENT_RECT = pygame.Rect(
 
 STACK_COUNT = 3
 PLATE_HEIGHT, STACK_WIDTH = 23, 180
-move_history = []
+board_view = None # Scrolling, zoom and culling of the loaded level's board, made in init_game()
 paused = False
 pause_start_time = 0
 
@@ -96,21 +134,23 @@ player_name = ""
 leaderboard_data = []
 
 # --- Audio ---
-try:
-    pygame.mixer.music.load('background.mp3')
-    pygame.mixer.music.set_volume(0.3)
-    pygame.mixer.music.play(-1)
-    sound_move = pygame.mixer.Sound('move.wav'); sound_move.set_volume(0.5)
-    sound_win = pygame.mixer.Sound('win.wav'); sound_win.set_volume(0.7)
-    sound_timeout = pygame.mixer.Sound('timeout.wav'); sound_timeout.set_volume(0.7)
-
-except pygame.error:
-    sound_move = sound_win = None
+sound_move = sound_win = sound_timeout = None # Loaded by load_audio() when the game starts
+
+def load_audio():
+    global sound_move, sound_win, sound_timeout
+    try:
+        pygame.mixer.init()
+        pygame.mixer.music.load('background.mp3')
+        pygame.mixer.music.set_volume(0.3)
+        pygame.mixer.music.play(-1)
+        sound_move = pygame.mixer.Sound('move.wav'); sound_move.set_volume(0.5)
+        sound_win = pygame.mixer.Sound('win.wav'); sound_win.set_volume(0.7)
+        sound_timeout = pygame.mixer.Sound('timeout.wav'); sound_timeout.set_volume(0.7)
+
+    except pygame.error:
+        sound_move = sound_win = None
 
 # --- Level Config ---
-base_total_plates = 4
-plates_increment = 2
-base_stacks = 3
 MAX_LEVELS = 5
 completed_levels = [True] + [False]*(MAX_LEVELS-1)
 
@@ -122,13 +162,18 @@ class Button:
         self.rect = pygame.Rect(rect)
         self.text = text
         self.enabled = enabled
+        self.retained = RetainedSurface()
 
+    @profiler.timed("draw.buttons")
     def draw(self, s):
+        # Only recomposed when the label, enabled state or size changes
+        self.retained.draw(s, self.rect.topleft, (self.text, self.enabled, self.rect.size), self.compose)
+
+    def compose(self):
         clr = BLUE if self.enabled else GRAY
-        pygame.draw.rect(s, clr, self.rect, border_radius=8)
-        pygame.draw.rect(s, BLACK, self.rect, 2, border_radius=8)
-        t = FONT.render(self.text, True, BLACK)
-        s.blit(t, (self.rect.centerx - t.get_width()//2, self.rect.centery - t.get_height()//2))
+        t = text_cache.render(FONT, self.text, True, BLACK)
+        label = (t, (self.rect.width // 2 - t.get_width()//2, self.rect.height // 2 - t.get_height()//2))
+        return compose_panel(self.rect.size, clr, BLACK, 2, 8, [label])
 
     def is_clicked(self, pos):
         return self.enabled and self.rect.collidepoint(pos)
@@ -141,7 +186,7 @@ start_y = CONTENT_RECT.centery - ((button_height + button_spacing) * 2)
 
 home_buttons = [
     Button((CONTENT_RECT.centerx - button_width // 2, start_y + i * (button_height + button_spacing), button_width, button_height), label)
-    for i, label in enumerate(["Play", "Levels", "Help", "Quit", "Leaderboard"])
+    for i, label in enumerate(["Play", "Levels", "Endless", "Help", "Quit", "Leaderboard"])
 ]
 
 
@@ -178,160 +223,291 @@ timeout_exit_button = Button((CONTENT_RECT.centerx+40, CONTENT_RECT.bottom-90, 1
 clear_lb_button = Button((CONTENT_RECT.centerx - 120, CONTENT_RECT.bottom - 100, 240, 60), "Clear Leaderboard")
 # Updated pause_button text to use Unicode characters
 pause_button = Button((WIDTH - 150, 10, 140, 40), "⏸️")
+hint_button = Button((WIDTH - 300, 10, 140, 40), "Hint")
+
+# --- Backgrounds ---
+bg_colors = {
+    "home": ((10, 100, 150), (60, 180, 200)),
+    "levels": ((40, 20, 60), (130, 50, 150)),
+    "help": ((60, 60, 60), (180, 180, 180)),
+    "game": ((30, 30, 60), (80, 120, 180)),
+    "win": ((0, 70, 0), (80, 180, 80)),
+    "timeout": ((100, 0, 0), (180, 50, 50)),
+    "name_prompt": ((40, 40, 80), (100, 100, 180)),
+    "leaderboard": ((30, 30, 30), (90, 90, 90))
+}
+gradient_cache = GradientCache()
+renderer = DirtyRectRenderer()
+moves_box = RetainedSurface()
+coach_box = RetainedSurface() # Best move / moves to go, when the level has a tablebase
+leaderboard_table = RetainedSurface()
+
+def open_display():
+    # The window, or an off-screen surface of the same size when headless
+    global screen
+    screen = pygame.display.set_mode((WIDTH , HEIGHT), 0 if HEADLESS else pygame.FULLSCREEN | pygame.SCALED)
+    pygame.display.set_caption("Stacking Plates Game")
 
 # --- Utility Functions ---
+@profiler.timed("draw.text")
 def draw_text_center(txt, font, color, y):
-    t = font.render(txt, True, color)
+    t = text_cache.render(font, txt, True, color)
     screen.blit(t, (WIDTH // 2 - t.get_width() // 2, y))
 
+@profiler.timed("draw.box")
 def draw_box():
     pygame.draw.rect(screen, (230,230,250), CONTENT_RECT, border_radius=12)
     pygame.draw.rect(screen, BLACK, CONTENT_RECT, 3, border_radius=12)
 
-def draw_gradient(s, top, bottom):
-    
-    for y in range(HEIGHT):
-        t = y / HEIGHT
-        r = int(top[0]*(1-t)+bottom[0]*t)
-        g = int(top[1]*(1-t)+bottom[1]*t)
-        b = int(top[2]*(1-t)+bottom[2]*t)
-        pygame.draw.line(s, (r,g,b), (0, y), (WIDTH, y))  # This is fine
+@profiler.timed("draw.gradient")
+def draw_gradient(s, name, top, bottom):
+    s.blit(gradient_cache.get(name, top, bottom, (WIDTH, HEIGHT)), (0, 0))
+
+def prepare_level(level, solve_par=False, stop=None):
+    # Deal, par and plate sprites of a level: everything init_game() needs that does not depend on play.
+    # `level` is a campaign level number or an endless.EndlessLevel. Runs on the prefetch worker too,
+    # so it only reads the globals it uses; there stop() ends the par search once the level is not wanted.
+    endless = isinstance(level, EndlessLevel)
+    total_plates, STACK_COUNT = (level.total_plates, level.stack_count) if endless else level_size(level)
+
+    picked = catalog.pick(level, STACK_COUNT) if catalog and not endless else None
+    if picked:
+        seed = picked.seed
+        state = GameState(picked.stacks, total_plates)
+    else:
+        seed = level.seed if endless else level_seed(level, random.randrange(SEEDS_PER_LEVEL))
+        state = GameState.deal(total_plates, STACK_COUNT, random.Random(seed))
+    table = Tablebase.load(total_plates, STACK_COUNT)
+    par = picked.par if picked else None # Without a catalog it is solved in the background during play ...
+    if par is None and solve_par: # ... unless there is time to spare now
+        par = table.distance(state.key()) if table else estimate_par(state.stacks, total_plates, stop=stop)[0]
+    widest = min(40 + total_plates * 8, CONTENT_RECT.width // STACK_COUNT * 9 // 10) # Big levels squeeze plates into their column
+    atlas = PlateAtlas({p: 40 + (widest - 40) * p // total_plates for p in range(1, total_plates + 1)}, PLATE_HEIGHT, FONT, 2,
+                       {False: BLUE, True: YELLOW})
+    plate_height, stack_width = PLATE_HEIGHT, STACK_WIDTH # Fixed in this front-end
+    return PreparedLevel(level, (WIDTH, HEIGHT), total_plates, STACK_COUNT, state, seed, par, table,
+                         plate_height, stack_width, atlas)
+
+level_pipeline = LevelPipeline(lambda level, stop: prepare_level(level, solve_par=True, stop=stop)) # Gets the next level ready during play
+endless_run = None # endless_levels() of the endless run being played
+endless_level = None # EndlessLevel being played, None in the campaign
+endless_next = None # The one after it, which level_pipeline is preparing
 
 def init_game(level):
-    global stacks, total_plates, STACK_COUNT, plates, selected_stack
-    global start_time, elapsed_time, score, move_history, max_time_per_level, paused, pause_start_time
-
-    total_plates = base_total_plates + plates_increment * level
-    STACK_COUNT = base_stacks + (level // 2)
-    plates = list(range(1, total_plates + 1))
-    random.shuffle(plates)
-    stacks = [[] for _ in range(STACK_COUNT)]
-    sel = 0
-    for plate in plates:
-        stacks[sel].append(plate)
-        sel = (sel + 1) % (STACK_COUNT - 1)
+    global game, dealt_layout, dealt_seed, tablebase, last_move_cost, total_plates, STACK_COUNT, selected_stack
+    global start_time, elapsed_time, max_time_per_level, paused, pause_start_time
+    global PLATE_HEIGHT, STACK_WIDTH, plate_atlas, board_view, endless_level, endless_next
+
+    endless_level = level if isinstance(level, EndlessLevel) else None
+    number = endless_level.level if endless_level else level
+    prepared = level_pipeline.take(level)
+    if prepared is None or prepared.resolution != (WIDTH, HEIGHT):
+        prepared = prepare_level(level)
+    total_plates, STACK_COUNT = prepared.total_plates, prepared.stack_count
+    game = prepared.game
+    dealt_seed = prepared.seed
+    dealt_layout = game.key()
+    tablebase = prepared.tablebase
+    if prepared.par is not None:
+        par_solver.known(prepared.par)
+    else: # Neither the catalog nor the prefetch had it
+        par_solver.start(lambda stop, stacks=dealt_layout, table=tablebase, plates=total_plates:
+                         table.distance(stacks) if table else estimate_par(stacks, plates, stop=stop)[0])
+    PLATE_HEIGHT, STACK_WIDTH, plate_atlas = prepared.plate_height, prepared.stack_width, prepared.atlas
+    board_view = make_board_view()
+    last_move_cost = None
+    hints.cancel()
 
     selected_stack = None
     start_time = time.time()
-    elapsed_time = score = 0
-    move_history = []
+    elapsed_time = 0
     paused = False
     pause_start_time = 0
 
-    max_time_per_level = 45 * (level + 1)
-
-def is_valid_move(f, t):
-    if not stacks[f]: return False
-    return not stacks[t] or stacks[f][-1] > stacks[t][-1]
+    max_time_per_level = level_time(number)
+    if endless_level:
+        if endless_next is None or endless_next.level != number + 1: # Kept when the level is retried
+            endless_next = next(endless_run)
+        level_pipeline.prefetch([endless_next])
+    elif level + 1 < MAX_LEVELS:
+        level_pipeline.prefetch([level + 1])
+
+def start_endless():
+    # A new endless run from level 1; levels are dealt as they are reached, with no end
+    global endless_run, endless_next
+    endless_run = endless_levels()
+    endless_next = None
+    init_game(next(endless_run))
 
 def move_plate(f, t):
-    global score
-    if is_valid_move(f, t):
-        plate = stacks[f].pop()
-        stacks[t].append(plate)
-        move_history.append((f, t, plate))
-        score += 1
+    global last_move_cost
+    before = moves_to_go()
+    if game.move(f, t):
+        hints.cancel()
         if sound_move: sound_move.play()
+        if before is not None:
+            last_move_cost = moves_to_go() + 1 - before
         return True
     return False
 
 def undo_move():
-    global score
-    if move_history:
-        f, t, plate = move_history.pop()
-        if stacks[t] and stacks[t][-1] == plate:
-            stacks[t].pop()
-            stacks[f].append(plate)
-            score += 1
-            if sound_move:
-                sound_move.play()
+    global last_move_cost
+    before = moves_to_go()
+    if game.undo():
+        hints.cancel()
+        if sound_move: sound_move.play()
+        if before is not None:
+            last_move_cost = moves_to_go() + 1 - before # Undo counts as a move too
+
+def hint_colors():
+    # Pole colours for the hint on show: orange for the stack to move from, purple for the one to move to
+    hint = hints.hint
+    return {hint.move[0]: ORANGE, hint.move[1]: PURPLE} if hint else {}
+
+def hint_label():
+    return "Thinking..." if hints.searching else "No hint" if hints.gave_up else "Hint"
 
 def is_win():
-    return any(len(s)==total_plates and all(s[i]<s[i+1] for i in range(len(s)-1)) for s in stacks)
+    return game.won # Kept up to date by the engine on every move and undo
+
+def moves_to_go():
+    # Fewest moves still needed to win, None if the level has no tablebase
+    return tablebase.lookup(game.packed) if tablebase else None
+
+def par_label():
+    done, par = par_solver.result()
+    return par if par is not None else "unknown" if done else "..."
 
 def get_clicked_stack(pos):
-    x, y = pos
-    if not CONTENT_RECT.collidepoint(pos): return None
-    idx = (x - CONTENT_RECT.left) // (CONTENT_RECT.width // STACK_COUNT)
-    return idx if 0 <= idx < STACK_COUNT else None
+    # Same columns and scroll position draw_stacks() uses
+    return board_view.stack_at(pos)
 
 def save_leaderboard():
-    with open("leaderboard.txt", "w") as f:
-        for name, level, moves, t in leaderboard_data:
-            f.write(f"{name},{level},{moves},{t}\n")
+    save_results(leaderboard_data)
 
 def load_leaderboard():
     global leaderboard_data
-    if os.path.exists("leaderboard.txt"):
-        with open("leaderboard.txt", "r") as f:
-            leaderboard_data = [line.strip().split(",") for line in f.readlines()]
-            leaderboard_data = [(n, int(lv), int(mv), int(t)) for n, lv, mv, t in leaderboard_data]
+    leaderboard_data = load_results()
 
-def add_to_leaderboard(name, level, moves, t):
-    leaderboard_data.append((name, level, moves, t))
-    leaderboard_data.sort(key=lambda x: (x[1], x[2], x[3]))
-    leaderboard_data[:] = leaderboard_data[:8]
-    save_leaderboard()
+def make_board_view():
+    # Poles at least 300 high, one spare plate of room above a full stack
+    return BoardView(CONTENT_RECT, STACK_COUNT, total_plates, CONTENT_RECT.width // STACK_COUNT, 40, 2, 300, 1, plate_atlas)
 
+@profiler.timed("draw.stacks")
 def draw_stacks():
-    y_base = CONTENT_RECT.bottom - 40
-    width_each = CONTENT_RECT.width // STACK_COUNT
+    pole_top, pole_height = board_view.pole()
+    hinted = hint_colors()
+    clip = screen.get_clip()
+    screen.set_clip(clip.clip(board_view.rect)) # Whatever is scrolled off the board is not drawn
     for i in range(STACK_COUNT):
-        x = CONTENT_RECT.left + i * width_each + width_each // 2
-        rc = GREEN if is_win() and len(stacks[i]) == total_plates else GRAY
-        pygame.draw.rect(screen, rc, (x - STACK_WIDTH // 2, y_base - 300, STACK_WIDTH, 300), 5 if rc == GREEN else 3)
-        y = y_base
-        for p in reversed(stacks[i]):
-            w = 40 + p * 8
-            rect = pygame.Rect(x - w // 2, y - PLATE_HEIGHT, w, PLATE_HEIGHT)
-            clr = YELLOW if i == selected_stack else BLUE
-            pygame.draw.rect(screen, clr, rect)
-            pygame.draw.rect(screen, BLACK, rect, 2)
-            t = FONT.render(str(p), True, BLACK)
-            screen.blit(t, (rect.centerx - t.get_width() // 2, rect.centery - t.get_height() // 2))
-            y -= PLATE_HEIGHT + 2
+        x = board_view.center_x(i)
+        rc = GREEN if game.won and len(game.stacks[i]) == total_plates else hinted.get(i, GRAY)
+        pygame.draw.rect(screen, rc, (x - STACK_WIDTH // 2, pole_top, STACK_WIDTH, pole_height), 5 if rc != GRAY else 3)
+        board_view.draw_stack(screen, game.stacks[i], x, i == selected_stack)
+    screen.set_clip(clip)
+
+def get_stack_column_rect(i):
+    # Screen area owned by stack i: the pole plus the widest plate that can sit on it
+    width_each = CONTENT_RECT.width // STACK_COUNT
+    return board_view.column_rect(i, max(width_each, STACK_WIDTH, max(plate_atlas.plate_widths.values())))
+
+def get_time_left_rect(tleft):
+    return pygame.Rect((CONTENT_RECT.left + 10, CONTENT_RECT.top + 10), FONT.size(f"Time Left: {tleft}s"))
+
+def get_moves_box_rect():
+    return pygame.Rect(CONTENT_RECT.right - 300, CONTENT_RECT.top + 5, 280, 40)
+
+def get_coach_box_rect():
+    return pygame.Rect(CONTENT_RECT.right - 360, CONTENT_RECT.top + 50, 340, 60)
+
+def seconds_until_next_change():
+    # The countdown is the only thing that changes without input; every other screen can sleep until an event
+    if current_screen == "game" and not paused:
+        return 1 - (time.time() - start_time) % 1
+    return None
+
+def track_dirty_regions():
+    # Anything that changes the whole picture is part of the scene key and forces a full repaint
+    renderer.begin_frame((current_screen, paused, board_view.state() if current_screen == "game" else None))
+    if current_screen == "name_prompt":
+        renderer.track("name_input", CONTENT_RECT, (input_text, input_error))
+    elif current_screen == "levels":
+        renderer.track("level_grid", CONTENT_RECT, tuple(completed_levels))
+    elif current_screen == "win":
+        renderer.track("par", CONTENT_RECT, par_label()) # Redrawn when a background solve finishes
+    elif current_screen == "leaderboard":
+        renderer.track("leaderboard", CONTENT_RECT, tuple(leaderboard_data))
+    elif current_screen == "game":
+        win = is_win()
+        hinted = hint_colors()
+        for i in range(STACK_COUNT):
+            renderer.track(("stack", i), get_stack_column_rect(i), (tuple(game.stacks[i]), i == selected_stack, win, hinted.get(i)))
+        renderer.track("hint_button", hint_button.rect, hint_label())
+        tleft = max(0, max_time_per_level - elapsed_time)
+        renderer.track("time_left", get_time_left_rect(tleft), tleft)
+        renderer.track("moves", get_moves_box_rect(), (game.moves, game.min_to_go))
+        if tablebase:
+            renderer.track("coach", get_coach_box_rect(), coach_lines())
+    renderer.track("profiler_hud", *profiler.hud_region((WIDTH, HEIGHT)))
+
+def compose_moves_box(size):
+    label = text_cache.render(FONT, f"Moves: {game.moves} | {game.min_to_go}+ to go", True, BLACK) # Never fewer moves than that left
+    return compose_panel(size, (255, 255, 200), BLACK, 2, 6, [(label, (10, size[1] // 2 - 10))])
+
+def coach_lines():
+    # Tablebase advice for the current position, as the coach panel shows it
+    best, togo = tablebase.advice(game)
+    first = f"Best: {best[0] + 1} → {best[1] + 1} | {togo} to go" if best else "Solved!"
+    if last_move_cost is None:
+        return first, ""
+    return first, "Perfect move!" if last_move_cost == 0 else f"That move cost you {last_move_cost}"
+
+def compose_coach_box(size, lines):
+    labels = [(text_cache.render(SMALL_FONT, line, True, BLACK), (10, 6 + i * 24)) for i, line in enumerate(lines) if line]
+    return compose_panel(size, (220, 240, 255), BLACK, 2, 6, labels)
+
+def compose_leaderboard_table():
+    # Positions relative to CONTENT_RECT's top-left
+    labels = []
+    headers = ["Name", "Level", "Deal", "Moves", "Time"]
+    for i, h in enumerate(headers):
+        labels.append((text_cache.render(FONT, h, True, BLACK), (80 + i * 150, 80)))
+    for i, (n, mode, lv, deal, mv, t) in enumerate(leaderboard_data[:10]):
+        for j, val in enumerate([n, level_label(mode, lv), deal_label(deal), str(mv), str(t)]):
+            labels.append((text_cache.render(SMALL_FONT, val, True, RED), (80 + j*150, 120 + i*30)))
+    return compose_labels(labels)
 
 def draw_screens():
     global elapsed_time, current_screen
-    bg_colors = {
-        "home": ((10, 100, 150), (60, 180, 200)),
-        "levels": ((40, 20, 60), (130, 50, 150)),
-        "help": ((60, 60, 60), (180, 180, 180)),
-        "game": ((30, 30, 60), (80, 120, 180)),
-        "win": ((0, 70, 0), (80, 180, 80)),
-        "timeout": ((100, 0, 0), (180, 50, 50)),
-        "name_prompt": ((40, 40, 80), (100, 100, 180)),
-        "leaderboard": ((30, 30, 30), (90, 90, 90))
-    }
-    draw_gradient(screen, *bg_colors[current_screen])
+    draw_gradient(screen, current_screen, *bg_colors[current_screen])
     draw_box()
 
     if current_screen == "name_prompt":
         draw_text_center("Enter Your Name", BIG_FONT, BLACK, CONTENT_RECT.top + 40)
         pygame.draw.rect(screen, WHITE, name_input_box, 0, border_radius=10)
         pygame.draw.rect(screen, BLACK, name_input_box, 2, border_radius=10)
-        name_surface = FONT.render(input_text, True, BLACK)
+        name_surface = text_cache.render(FONT, input_text, True, BLACK)
         screen.blit(name_surface, (name_input_box.x + 10, name_input_box.y + 10))
         if input_error:
-            err_surface = SMALL_FONT.render(input_error, True, RED)
+            err_surface = text_cache.render(SMALL_FONT, input_error, True, RED)
             screen.blit(err_surface, (CONTENT_RECT.centerx - err_surface.get_width()//2, name_input_box.bottom + 10))
         draw_text_center("Press Enter(only alphabets) to Continue", SMALL_FONT, BLACK, CONTENT_RECT.bottom - 60)
 
     elif current_screen == "home":
-        draw_text_center(" STACKING PLATES ", pygame.font.SysFont("Segoe UI Emoji", 70), BLACK, CONTENT_RECT.top + 20)
+        draw_text_center(" STACKING PLATES ", TITLE_FONT, BLACK, CONTENT_RECT.top + 20)
         #draw_text_center_splash(" STACKING PLATES ", BIG_FONT, (50, 10, 10), HEIGHT // 2 + 100)
 
         for b in home_buttons: b.draw(screen)
 
     elif current_screen == "levels":
-        draw_text_center("Select Level", pygame.font.SysFont("Segoe UI Emoji", 70), BLUE, CONTENT_RECT.top + 30)
+        draw_text_center("Select Level", TITLE_FONT, BLUE, CONTENT_RECT.top + 30)
 
 
         for i, b in enumerate(level_buttons):
             b.enabled = completed_levels[i]
             b.draw(screen)
             if not b.enabled:
-                l = FONT.render("\U0001F512", True, RED)
+                l = text_cache.render(FONT, "\U0001F512", True, RED)
                 screen.blit(l, (b.rect.right - 30, b.rect.top + 10))
         back_button.draw(screen)
 
@@ -347,10 +523,13 @@ def draw_screens():
             "- Click stacks to move.",
             "- Use ← Back to go back.",
             "- Press Z to undo last move.",
-            "- starts at 45 secs and increment of 45 secs for every level"
+            "- Press H or click Hint: move from the orange stack to the purple one.",
+            "- Big levels: wheel scrolls, Ctrl+wheel or +/- zooms, 0 shows the whole board.",
+            "- starts at 45 secs and increment of 45 secs for every level",
+            "- Endless: the levels keep coming, each bigger than the last."
         ]
         for i, ln in enumerate(lines):
-            screen.blit(FONT.render(ln, True, BLACK), (CONTENT_RECT.left + 20, CONTENT_RECT.top + 80 + i * 30))
+            screen.blit(text_cache.render(FONT, ln, True, BLACK), (CONTENT_RECT.left + 20, CONTENT_RECT.top + 80 + i * 30))
         back_button.draw(screen)
 
     elif current_screen == "game":
@@ -358,17 +537,21 @@ def draw_screens():
         if not paused:
             elapsed_time = int(time.time() - start_time)
         tleft = max(0, max_time_per_level - elapsed_time)
-        screen.blit(FONT.render(f"Time Left: {tleft}s", True, BLACK), (CONTENT_RECT.left + 10, CONTENT_RECT.top + 10))
-        sb = pygame.Rect(CONTENT_RECT.right - 160, CONTENT_RECT.top + 5, 140, 40)
-        pygame.draw.rect(screen, (255, 255, 200), sb, border_radius=6)
-        pygame.draw.rect(screen, BLACK, sb, 2, border_radius=6)
-        screen.blit(FONT.render(f"Moves: {score}", True, BLACK), (sb.left + 10, sb.centery - 10))
-        screen.blit(FONT.render(f"Level: {selected_level + 1}", True, BLACK), (CONTENT_RECT.left + 10, CONTENT_RECT.top + 40))
+        screen.blit(text_cache.render(FONT, f"Time Left: {tleft}s", True, BLACK), get_time_left_rect(tleft))
+        sb = get_moves_box_rect()
+        moves_box.draw(screen, sb.topleft, (game.moves, game.min_to_go, sb.size), lambda: compose_moves_box(sb.size))
+        if tablebase:
+            cb = get_coach_box_rect()
+            lines = coach_lines()
+            coach_box.draw(screen, cb.topleft, (lines, cb.size), lambda: compose_coach_box(cb.size, lines))
+        screen.blit(text_cache.render(FONT, f"Level: {selected_level + 1}", True, BLACK), (CONTENT_RECT.left + 10, CONTENT_RECT.top + 40))
         back_button.draw(screen)
         
         # Draw Pause/Resume button with Unicode characters
         pause_button.text = "▶️" if paused else "⏸️"
         pause_button.draw(screen)
+        hint_button.text = hint_label()
+        hint_button.draw(screen)
 
         if paused:
             overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
@@ -380,158 +563,204 @@ def draw_screens():
 
     elif current_screen == "win":
         draw_text_center("\U0001F389 CONGRATULATIONS!", BIG_FONT, BLACK, CONTENT_RECT.top + 50)
-        draw_text_center(f"Level {selected_level+1} Completed", FONT, BLACK, CONTENT_RECT.top + 140)
-        draw_text_center(f"Moves: {score} | Time: {elapsed_time}s", FONT, BLACK, CONTENT_RECT.top + 200)
+        draw_text_center(f"{'Endless level' if endless_level else 'Level'} {selected_level+1} (deal #{deal_number(dealt_seed)}) Completed", FONT, BLACK, CONTENT_RECT.top + 140)
+        draw_text_center(f"Moves: {game.moves} vs. par {par_label()} | Time: {elapsed_time}s", FONT, BLACK, CONTENT_RECT.top + 200)
         win_back_button.draw(screen)
-        win_next_button.enabled = (selected_level+1 < MAX_LEVELS and completed_levels[selected_level+1])
+        win_next_button.enabled = endless_level is not None or (selected_level+1 < MAX_LEVELS and completed_levels[selected_level+1])
         win_next_button.draw(screen)
 
     elif current_screen == "timeout":
         draw_text_center("⏰ TIME'S UP!", BIG_FONT, BLACK, CONTENT_RECT.top + 80)
-        draw_text_center(f"Level {selected_level+1} failed", FONT, BLACK, CONTENT_RECT.top + 160)
-        draw_text_center(f"Moves: {score} | Time: {elapsed_time}s", FONT, BLACK, CONTENT_RECT.top + 220)
+        draw_text_center(f"{'Endless level' if endless_level else 'Level'} {selected_level+1} failed", FONT, BLACK, CONTENT_RECT.top + 160)
+        draw_text_center(f"Moves: {game.moves} | Time: {elapsed_time}s", FONT, BLACK, CONTENT_RECT.top + 220)
         timeout_retry_button.draw(screen)
         timeout_exit_button.draw(screen)
 
     elif current_screen == "leaderboard":
         draw_text_center("Leaderboard", BIG_FONT, BLACK, CONTENT_RECT.top + 30)
-        headers = ["Name", "Level", "Moves", "Time"]
-        for i, h in enumerate(headers):
-            screen.blit(FONT.render(h, True, BLACK), (CONTENT_RECT.left + 80 + i * 180, CONTENT_RECT.top + 80))
-        for i, (n, lv, mv, t) in enumerate(leaderboard_data[:10]):
-            for j, val in enumerate([n, str(lv), str(mv), str(t)]):
-                screen.blit(SMALL_FONT.render(val, True, RED), (CONTENT_RECT.left + 80 + j*180, CONTENT_RECT.top + 120 + i*30))
+        leaderboard_table.draw(screen, CONTENT_RECT.topleft, tuple(leaderboard_data[:10]), compose_leaderboard_table)
         back_button.draw(screen)
         clear_lb_button.draw(screen)
     
 
 # --- Main loop ---
-running = True
-selected_stack = None
-
-while running:
-    clock.tick(30)
-    pos = pygame.mouse.get_pos()
-
-    for e in pygame.event.get():
-        if e.type == pygame.QUIT:
-            running = False
-
-        if current_screen == "name_prompt":
-            if e.type == pygame.KEYDOWN:
-                if input_active:
-                    if e.key == pygame.K_RETURN:
-                        if len(input_text.strip()) >= 2:
-                            player_name = input_text.strip()
-                            load_leaderboard()
-                            current_screen = "home"
+def main():
+    global current_screen, selected_level, selected_stack, player_name, input_text, input_error
+    global start_time, elapsed_time, paused, pause_start_time
+    open_display()
+    run_splash_screen()
+    load_audio()
+    running = True
+    selected_stack = None
+
+    while running:
+        events = scheduler.next_events(seconds_until_next_change())
+        profiler.begin_frame("events")
+        pos = pygame.mouse.get_pos()
+
+        for e in events:
+            if e.type == pygame.QUIT:
+                running = False
+
+            if e.type == pygame.KEYDOWN and e.key == pygame.K_F3:
+                profiler.toggle_hud()
+
+            if current_screen == "name_prompt":
+                if e.type == pygame.KEYDOWN:
+                    if input_active:
+                        if e.key == pygame.K_RETURN:
+                            if len(input_text.strip()) >= 2:
+                                player_name = input_text.strip()
+                                load_leaderboard()
+                                current_screen = "home"
+                            else:
+                                input_error = "Name must be at least 2 characters(alphabets only)"
+                        elif e.key == pygame.K_BACKSPACE:
+                            input_text = input_text[:-1]
                         else:
-                            input_error = "Name must be at least 2 characters(alphabets only)"
-                    elif e.key == pygame.K_BACKSPACE:
-                        input_text = input_text[:-1]
-                    else:
-                        if len(input_text) < 20 and e.unicode.isalpha():
-                            input_text += e.unicode
-
-        elif e.type == pygame.MOUSEBUTTONDOWN:
-            if current_screen == "home":
-                for b in home_buttons:
-                    if b.is_clicked(pos):
-                        if b.text == "Play":
-                            selected_level = 0
-                            init_game(0)
-                            current_screen = "game"
-                        elif b.text == "Levels":
-                            current_screen = "levels"
-                        elif b.text == "Help":
-                            current_screen = "help"
-                        elif b.text == "Quit":
-                            running = False
-                        elif b.text == "Leaderboard":
-                            current_screen = "leaderboard"
-
-            elif current_screen == "levels":
-                if back_button.is_clicked(pos):
-                    current_screen = "home"
-                else:
-                    for i, b in enumerate(level_buttons):
-                        if b.is_clicked(pos) and b.enabled:
-                            selected_level = i
-                            init_game(i)
-                            current_screen = "game"
-
-            elif current_screen == "help" and back_button.is_clicked(pos):
-                current_screen = "home"
-
-            elif current_screen == "game":
-                if pause_button.is_clicked(pos):
-                    if not paused:
-                        paused = True
-                        pause_start_time = time.time()
-                        pygame.mixer.music.pause()
-                    else:
-                        paused = False
-                        start_time += (time.time() - pause_start_time)
-                        pygame.mixer.music.unpause()
-                elif not paused:
+                            if len(input_text) < 20 and e.unicode.isalpha():
+                                input_text += e.unicode
+
+            elif e.type == pygame.MOUSEBUTTONDOWN and e.button not in (4, 5): # The wheel scrolls the board (MOUSEWHEEL)
+                if current_screen == "home":
+                    for b in home_buttons:
+                        if b.is_clicked(pos):
+                            if b.text == "Play":
+                                selected_level = 0
+                                init_game(0)
+                                current_screen = "game"
+                            elif b.text == "Levels":
+                                current_screen = "levels"
+                            elif b.text == "Endless":
+                                selected_level = 0
+                                start_endless()
+                                current_screen = "game"
+                            elif b.text == "Help":
+                                current_screen = "help"
+                            elif b.text == "Quit":
+                                running = False
+                            elif b.text == "Leaderboard":
+                                current_screen = "leaderboard"
+
+                elif current_screen == "levels":
                     if back_button.is_clicked(pos):
                         current_screen = "home"
                     else:
-                        cs = get_clicked_stack(pos)
-                        if cs is not None:
-                            if selected_stack is None and stacks[cs]:
-                                selected_stack = cs
-                            elif selected_stack is not None:
-                                move_plate(selected_stack, cs)
-                                selected_stack = None
-                
-                if not paused and is_win():
-                    completed_levels[selected_level] = True
-                    if selected_level + 1 < MAX_LEVELS:
-                        completed_levels[selected_level + 1] = True
-                    if sound_win: sound_win.play()
-                    if not any(n == player_name and lv == selected_level+1 and mv == score for n, lv, mv, t in leaderboard_data):
-                        add_to_leaderboard(player_name, selected_level + 1, score, elapsed_time)
-                    current_screen = "win"
-                    pygame.mixer.music.play(-1)
-
-            elif current_screen == "win":
-                if win_back_button.is_clicked(pos):
-                    current_screen = "home"
-                elif win_next_button.is_clicked(pos) and win_next_button.enabled:
-                    selected_level += 1
-                    init_game(selected_level)
-                    current_screen = "game"
-
-            elif current_screen == "timeout":
-                if timeout_retry_button.is_clicked(pos):
-                    init_game(selected_level)
-                    current_screen = "game"
-                    pygame.mixer.music.play(-1)
-                elif timeout_exit_button.is_clicked(pos):
-                    current_screen = "home"
+                        for i, b in enumerate(level_buttons):
+                            if b.is_clicked(pos) and b.enabled:
+                                selected_level = i
+                                init_game(i)
+                                current_screen = "game"
 
-            elif current_screen == "leaderboard":
-                if back_button.is_clicked(pos):
+                elif current_screen == "help" and back_button.is_clicked(pos):
                     current_screen = "home"
-                elif clear_lb_button.is_clicked(pos):
-                    leaderboard_data.clear()
-                    save_leaderboard()
 
-        elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key == pygame.K_z:
-            if not paused:
-                undo_move()
+                elif current_screen == "game":
+                    if pause_button.is_clicked(pos):
+                        if not paused:
+                            paused = True
+                            pause_start_time = time.time()
+                            pygame.mixer.music.pause()
+                        else:
+                            paused = False
+                            start_time += (time.time() - pause_start_time)
+                            pygame.mixer.music.unpause()
+                    elif not paused and hint_button.is_clicked(pos):
+                        hints.request(game, tablebase)
+                    elif not paused:
+                        if back_button.is_clicked(pos):
+                            current_screen = "home"
+                            hints.cancel()
+                            level_pipeline.cancel()
+                        else:
+                            cs = get_clicked_stack(pos)
+                            if cs is not None:
+                                if selected_stack is None and game.stacks[cs]:
+                                    selected_stack = cs
+                                elif selected_stack is not None:
+                                    move_plate(selected_stack, cs)
+                                    selected_stack = None
+
+                    if not paused and is_win():
+                        if not endless_level: # Endless wins do not unlock campaign levels
+                            completed_levels[selected_level] = True
+                            if selected_level + 1 < MAX_LEVELS:
+                                completed_levels[selected_level + 1] = True
+                        if sound_win: sound_win.play()
+                        record_result(leaderboard_data, player_name, ENDLESS if endless_level else CAMPAIGN, selected_level + 1,
+                                      deal_number(dealt_seed), game.moves, elapsed_time)
+                        current_screen = "win"
+                        pygame.mixer.music.play(-1)
+
+                elif current_screen == "win":
+                    if win_back_button.is_clicked(pos):
+                        current_screen = "home"
+                        level_pipeline.cancel()
+                    elif win_next_button.is_clicked(pos) and win_next_button.enabled:
+                        selected_level += 1
+                        init_game(endless_next if endless_level else selected_level)
+                        current_screen = "game"
+
+                elif current_screen == "timeout":
+                    if timeout_retry_button.is_clicked(pos):
+                        init_game(endless_level or selected_level)
+                        current_screen = "game"
+                        pygame.mixer.music.play(-1)
+                    elif timeout_exit_button.is_clicked(pos):
+                        current_screen = "home"
+                        level_pipeline.cancel()
+
+                elif current_screen == "leaderboard":
+                    if back_button.is_clicked(pos):
+                        current_screen = "home"
+                    elif clear_lb_button.is_clicked(pos):
+                        leaderboard_data.clear()
+                        save_leaderboard()
+
+            elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key == pygame.K_z:
+                if not paused:
+                    undo_move()
 
-    if current_screen == "game" and not paused:
-        elapsed_time = int(time.time() - start_time)
-        if elapsed_time >= max_time_per_level:
-            current_screen = "timeout"
-            pygame.mixer.music.stop()
-            if sound_timeout: sound_timeout.play()
+            elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key == pygame.K_h:
+                if not paused:
+                    hints.request(game, tablebase)
 
+            elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key in BOARD_KEYS:
+                if not paused:
+                    board_view.press(e.key)
 
-    draw_screens()
-    pygame.display.flip()
+            elif e.type == pygame.MOUSEWHEEL and current_screen == "game":
+                if not paused:
+                    board_view.wheel(e.y, zoom=bool(pygame.key.get_mods() & pygame.KMOD_CTRL))
 
-pygame.quit()
-sys.exit()
\ No newline at end of file
+        profiler.switch("timer")
+        hints.poll() # Take up what the hint worker found since the last frame
+        if current_screen == "game" and not paused:
+            elapsed_time = int(time.time() - start_time)
+            if elapsed_time >= max_time_per_level:
+                current_screen = "timeout"
+                pygame.mixer.music.stop()
+                if sound_timeout: sound_timeout.play()
+
+
+        profiler.switch("dirty")
+        track_dirty_regions()
+        drawn = renderer.needs_redraw()
+        if drawn:
+            profiler.switch("draw")
+            screen.set_clip(renderer.clip_rect()) # Repaint only what changed since the last frame
+            draw_screens()
+            profiler.draw_hud(screen)
+            screen.set_clip(None)
+            profiler.switch("present")
+            renderer.present()
+        profiler.end_frame(record=bool(events) or drawn, screen=current_screen, level=selected_level + 1,
+                           plates=total_plates if current_screen == "game" else None)
+
+    profiler.close()
+    print(scheduler.summary())
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from engine import GameState, level_size, level_time
+from heuristic_solver import solve_heuristic
+from level_catalog import SEEDS_PER_LEVEL, deal_level, level_seed
+
+# --- Batch Simulator ---
+# Plays thousands of games at once, for statistics no single GameState could
+# gather in reasonable time: how many moves a random, greedy or scripted player
+# needs to win each level, and how often that fits in the level's time limit
+# (engine.level_time). Every game of a batch is a row of the same NumPy arrays
+# and all of them move in lockstep, one vectorized step per move, so a step costs
+# about the same for 10 games as for 10 000.
+#
+# Per game: the top plate and height of each stack, and per plate the plate
+# under it and the stack it is on, so a move is a handful of array writes. The
+# sorted runs and min_to_go (with its settled plates and floors) are kept the way
+# GameState keeps them, move by move. Plates are numbered from 1 and an empty
+# stack's top is 0, so f -> t is legal exactly when top(f) > top(t); this is
+# GameState.is_valid_move() for every pair of stacks at once (--check compares
+# the two move by move).
+#
+# A policy picks one move per game from the legal ones. A game stops when it is
+# won, after max_moves, or when its policy has no move for it (a script that
+# ran out or asks for an illegal move). Games that did not finish are censored:
+# the move percentiles count each of them at max_moves, so on a level where many
+# do not finish they are lower bounds, and a percentile at the cap means "at
+# least max_moves". The win rate is reported next to them for that reason.
+#
+#   python batch_sim.py                              levels 1-5, 10 000 random games each
+#   python batch_sim.py --policy greedy --games 100000 --levels 8
+#   python batch_sim.py --policy heuristic --games 2000 --catalog   replay heuristic_solver.py lines on catalog deals
+#   python batch_sim.py --check                      compare with GameState move by move
+
+POLICIES = ("random", "greedy", "heuristic")
+DEFAULT_GAMES = 10000
+DEFAULT_MAX_MOVES = 5000
+GREEDY_EPSILON = 0.1 # Share of the greedy player's moves made at random, so it does not go round in circles
+SECONDS_PER_MOVE = 1.0 # Assumed pace of a player, for the share of games won in time
+NO_MOVE = -1
+
+class BatchGames:
+    __slots__ = ("count", "stack_count", "total_plates", "tops", "heights", "below", "where", "runs", "floors",
+                 "settled", "home", "min_to_go", "moves", "won", "last")
+
+    def __init__(self, count, total_plates, stack_count):
+        # `count` games with every stack empty; deal() and from_stacks() put the plates on
+        self.count = count
+        self.stack_count = stack_count
+        self.total_plates = total_plates
+        self.tops = np.zeros((count, stack_count), np.int16) # 0 for an empty stack
+        self.heights = np.zeros((count, stack_count), np.int16)
+        self.below = np.zeros((count, total_plates + 1), np.int16) # Plate under each plate, 0 on the bottom of a stack
+        self.where = np.full((count, total_plates + 1), -1, np.int16) # Stack each plate is on
+        self.runs = np.zeros((count, stack_count), np.int16) # GameState.sorted_runs
+        self.floors = np.zeros((count, total_plates + 1), np.int16) # GameState.floors; floors[:, 0] stands for an empty stack
+        self.floors[:, 0] = total_plates + 1
+        self.settled = np.zeros(count, np.int16)
+        self.home = np.full(count, -1, np.int16)
+        self.min_to_go = np.zeros(count, np.int32)
+        self.moves = np.zeros(count, np.int32)
+        self.won = np.zeros(count, bool)
+        self.last = np.full(count, NO_MOVE, np.int32) # Last move as f * stack_count + t
+
+    @classmethod
+    def deal(cls, count, total_plates, stack_count, rng):
+        # Shuffled plates dealt round-robin over all stacks but the last, like GameState.deal() (with NumPy's rng)
+        games = cls(count, total_plates, stack_count)
+        plates = rng.permuted(np.tile(np.arange(1, total_plates + 1, dtype=np.int16), (count, 1)), axis=1)
+        dealt_to = stack_count - 1 if stack_count > 1 else stack_count
+        rows = np.arange(count)
+        for i in range(total_plates):
+            games._push(rows, np.full(count, i % dealt_to, np.int16), plates[:, i])
+        games.won = games.runs.max(1) == total_plates
+        return games
+
+    @classmethod
+    def from_stacks(cls, layouts):
+        # Games from lists of stacks, bottom plate first; all with the same plate and stack counts
+        first = layouts[0]
+        games = cls(len(layouts), sum(map(len, first)), len(first))
+        tallest = max(len(stack) for stacks in layouts for stack in stacks)
+        for height in range(tallest):
+            for i in range(games.stack_count):
+                rows = np.array([g for g, stacks in enumerate(layouts) if len(stacks[i]) > height], np.intp)
+                if rows.size:
+                    plates = np.array([layouts[g][i][height] for g in rows], np.int16)
+                    games._push(rows, np.full(rows.size, i, np.int16), plates)
+        games.won = games.runs.max(1) == games.total_plates
+        return games
+
+    def stacks(self, g):
+        # Game g as a list of stacks, bottom plate first
+        result = []
+        for top in self.tops[g]:
+            stack = []
+            while top:
+                stack.append(int(top))
+                top = self.below[g, top]
+            result.append(stack[::-1])
+        return result
+
+    def legal(self, rows):
+        # (rows, f, t) mask of the legal moves of the given games
+        tops = self.tops[rows]
+        return tops[:, :, None] > tops[:, None, :]
+
+    # --- Moves ---
+    def _push(self, rows, t, plate):
+        # GameState._push() for one plate per row, onto stack t of that row
+        h = self.heights[rows, t]
+        top = self.tops[rows, t]
+        settled = self.settled[rows]
+        settles = (h == settled) & (plate == settled + 1) & ((h == 0) | (t == self.home[rows]))
+        floor = np.where(settles, 1, np.minimum(plate, self.floors[rows, top]))
+        self.min_to_go[rows] += np.where(settles, 0, np.where(floor < plate, 2, 1))
+        self.settled[rows] = settled + settles
+        self.home[rows] = np.where(settles, t, self.home[rows])
+        self.floors[rows, plate] = floor
+        self.runs[rows, t] += (self.runs[rows, t] == h) & (top < plate) # top is 0 on an empty stack
+        self.below[rows, plate] = top
+        self.where[rows, plate] = t
+        self.tops[rows, t] = plate
+        self.heights[rows, t] = h + 1
+
+    def _pop(self, rows, f):
+        h = self.heights[rows, f]
+        plate = self.tops[rows, f]
+        unsettles = (f == self.home[rows]) & (h == self.settled[rows])
+        settled = self.settled[rows] - unsettles
+        self.settled[rows] = settled
+        self.home[rows] = np.where(unsettles & (settled == 0), -1, self.home[rows])
+        self.min_to_go[rows] -= np.where(unsettles, 0, np.where(self.floors[rows, plate] < plate, 2, 1))
+        self.runs[rows, f] -= self.runs[rows, f] == h
+        self.tops[rows, f] = self.below[rows, plate]
+        self.heights[rows, f] = h - 1
+        return plate
+
+    def move(self, rows, f, t):
+        # One legal move per row; the caller checks legality (legal())
+        self._push(rows, t, self._pop(rows, f))
+        self.won[rows] = self.runs[rows, t] == self.total_plates
+        self.moves[rows] += 1
+        self.last[rows] = f * self.stack_count + t
+
+# --- Policies ---
+# policy(games, rows, legal, rng) -> a move f * stack_count + t for each row, or NO_MOVE to stop that game
+
+def random_policy(games, rows, legal, rng):
+    # Any legal move, all equally likely
+    scores = rng.random(legal.shape, np.float32)
+    scores[~legal] = -1
+    return scores.reshape(len(rows), -1).argmax(1)
+
+def greedy_policy(games, rows, legal, rng):
+    # The legal move that lowers min_to_go most (worked out on the position before it), ties broken at random;
+    # undoing the last move is a last resort, and a GREEDY_EPSILON share of moves are random ones
+    s = games.stack_count
+    tops, heights = games.tops[rows], games.heights[rows]
+    settled, home = games.settled[rows, None], games.home[rows, None]
+    floors = games.floors[rows[:, None], tops]
+    stack = np.arange(s)
+    lift = np.where((stack == home) & (heights == settled), 0, np.where(floors < tops, 2, 1))
+    plate = tops[:, :, None]
+    settles = (heights[:, None, :] == settled[:, :, None]) & (plate == settled[:, :, None] + 1) & \
+              ((heights[:, None, :] == 0) | (stack == home)[:, None, :])
+    land = np.where(settles, 0, np.where(np.minimum(plate, floors[:, None, :]) < plate, 2, 1))
+    scores = (land - lift[:, :, None]).reshape(len(rows), -1) + rng.random((len(rows), s * s), np.float32)
+    last = games.last[rows]
+    undo = np.where(last >= 0, last % s * s + last // s, 0)
+    scores[np.arange(len(rows)), undo] += np.where(last >= 0, 8, 0)
+    scores[~legal.reshape(len(rows), -1)] = np.inf
+    return np.where(rng.random(len(rows)) < GREEDY_EPSILON, random_policy(games, rows, legal, rng), scores.argmin(1))
+
+def scripted_policy(lines):
+    # Plays lines[g] (a list of (f, t) moves) in game g, then stops it. A game with no line (None, e.g. the
+    # heuristic solver gave up) plays NO_MOVE at once, so it is left unfinished and counted at max_moves.
+    lines = [line or [] for line in lines]
+    longest = max(map(len, lines), default=0)
+    froms = np.full((len(lines), longest + 1), NO_MOVE, np.int32) # Padded with NO_MOVE past the end of each line
+    tos = np.zeros((len(lines), longest + 1), np.int32)
+    for g, line in enumerate(lines):
+        for k, (f, t) in enumerate(line):
+            froms[g, k], tos[g, k] = f, t
+    def policy(games, rows, legal, rng):
+        step = np.minimum(games.moves[rows], longest)
+        f = froms[rows, step]
+        return np.where(f >= 0, f * games.stack_count + tos[rows, step], NO_MOVE)
+    return policy
+
+def heuristic_policy(games):
+    # Replays heuristic_solver.py's line for each game: about par moves, for comparison with the others
+    return scripted_policy([solve_heuristic(games.stacks(g), games.total_plates).moves for g in range(games.count)])
+
+def simulate(games, policy, max_moves=DEFAULT_MAX_MOVES, rng=None):
+    # Plays every game until it is won, reaches max_moves or its policy stops it; returns the number of moves made
+    rng = rng if rng is not None else np.random.default_rng()
+    s = games.stack_count
+    rows = np.flatnonzero(~games.won & (games.moves < max_moves))
+    made = 0
+    while rows.size:
+        legal = games.legal(rows)
+        choice = policy(games, rows, legal, rng)
+        ok = choice >= 0
+        ok[ok] = legal.reshape(len(rows), -1)[np.flatnonzero(ok), choice[ok]]
+        rows, choice = rows[ok], choice[ok]
+        games.move(rows, choice // s, choice % s)
+        made += rows.size
+        rows = rows[~games.won[rows] & (games.moves[rows] < max_moves)]
+    return made
+
+# --- Levels ---
+def level_games(level, count, rng, catalog=False):
+    # `count` deals of a level: random ones, or the catalog's seeds (the game's own deals) in turn
+    total_plates, stack_count = level_size(level)
+    if not catalog:
+        return BatchGames.deal(count, total_plates, stack_count, rng)
+    layouts = [deal_level(level, level_seed(level, index)).stacks for index in range(min(count, SEEDS_PER_LEVEL))]
+    return BatchGames.from_stacks([layouts[g % len(layouts)] for g in range(count)])
+
+def summarize(level, games, max_moves=DEFAULT_MAX_MOVES, seconds_per_move=SECONDS_PER_MOVE):
+    # Percentiles and mean over every game, unfinished ones counted at max_moves; the histogram is of won games only
+    won_moves = games.moves[games.won]
+    moves = np.where(games.won, games.moves, max_moves)
+    summary = {"level": level + 1, "plates": games.total_plates, "stacks": games.stack_count, "games": games.count,
+               "won": int(won_moves.size), "win_rate": won_moves.size / games.count, "max_moves": max_moves,
+               "censored": int(games.count - won_moves.size), "time_limit": level_time(level),
+               "in_time": int((won_moves * seconds_per_move <= level_time(level)).sum())}
+    if games.count:
+        summary.update({"mean": float(moves.mean()), "min": int(moves.min()), "max": int(moves.max()),
+                        **{f"p{q}": float(np.percentile(moves, q)) for q in (10, 50, 90, 99)},
+                        "histogram": np.bincount(won_moves).tolist()})
+    return summary
+
+def moves_label(summary, key):
+    # A percentile at the cap only says the game took at least that many moves
+    return f">={summary['max_moves']}" if summary[key] >= summary["max_moves"] else f"{summary[key]:.0f}"
+
+def check(games_count, rng):
+    # Plays random games in the batch and in GameState side by side, comparing legal moves and state every move
+    for level in range(3):
+        total_plates, stack_count = level_size(level)
+        games = BatchGames.deal(games_count, total_plates, stack_count, rng)
+        states = [GameState(games.stacks(g), total_plates) for g in range(games_count)]
+        rows = np.arange(games_count)
+        for _ in range(200):
+            legal = games.legal(rows)
+            for g, state in enumerate(states):
+                expected = [[state.is_valid_move(f, t) for t in range(stack_count)] for f in range(stack_count)]
+                if legal[g].tolist() != expected:
+                    raise SystemExit(f"Legal moves differ on {state.stacks}")
+            choice = random_policy(games, rows, legal, rng)
+            games.move(rows, choice // stack_count, choice % stack_count)
+            for g, state in enumerate(states):
+                state.move(int(choice[g]) // stack_count, int(choice[g]) % stack_count)
+                if games.stacks(g) != state.stacks or games.min_to_go[g] != state.min_to_go or games.won[g] != state.won:
+                    raise SystemExit(f"Batch state differs from GameState {state.stacks} after {state.moves} moves")
+        print(f"Level {level + 1}: {games_count} games x 200 moves match GameState")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many Stacking Plates games at once for moves-to-win statistics")
+    parser.add_argument("--policy", choices=POLICIES, default="random")
+    parser.add_argument("--games", type=int, default=DEFAULT_GAMES, help=f"games per level (default {DEFAULT_GAMES})")
+    parser.add_argument("--levels", type=int, default=5, help="levels 1..N (default 5)")
+    parser.add_argument("--max-moves", type=int, default=DEFAULT_MAX_MOVES, help="give up on a game after this many moves")
+    parser.add_argument("--seconds-per-move", type=float, default=SECONDS_PER_MOVE, help="player pace for the in-time share")
+    parser.add_argument("--catalog", action="store_true", help="play the catalog's deals instead of random ones")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="also write every level's summary and moves-to-win histogram here")
+    parser.add_argument("--check", action="store_true", help="compare with GameState move by move instead")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.check:
+        check(50, rng)
+        return
+    random.seed(args.seed)
+    summaries = []
+    for level in range(args.levels):
+        games = level_games(level, args.games, rng, args.catalog)
+        policy = {"random": random_policy, "greedy": greedy_policy}.get(args.policy) or heuristic_policy(games)
+        started = time.perf_counter()
+        made = simulate(games, policy, args.max_moves, rng)
+        seconds = time.perf_counter() - started
+        summary = summarize(level, games, args.max_moves, args.seconds_per_move)
+        summaries.append(summary)
+        line = (f"Level {level + 1} ({games.total_plates} plates, {games.stack_count} stacks): "
+                f"won {summary['won']}/{games.count} ({summary['win_rate']:.0%})")
+        if games.count:
+            line += (f", moves p10/p50/p90/p99 {'/'.join(moves_label(summary, f'p{q}') for q in (10, 50, 90, 99))}"
+                     + (f" (unfinished at {args.max_moves})" if summary["censored"] else "")
+                     + f", in {summary['time_limit']}s {summary['in_time'] / games.count:.0%}")
+        print(f"{line}; {made} moves in {seconds:.2f}s ({made / max(seconds, 1e-9) / 1e6:.1f}M/s)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"policy": args.policy, "max_moves": args.max_moves, "seconds_per_move": args.seconds_per_move,
+                       "levels": summaries}, f)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# --- Headless Render Benchmark ---
+# Drives draw_screens() of a front-end for every screen in its bg_colors, at
+# several resolutions and (on the game screen) plate counts, through SDL's
+# dummy video driver. Each front-end/resolution pair runs in its own process
+# because the front-ends size their fonts and layout at import. Endless-sized
+# boards (BIG_BOARDS) run at zoom 1 and zoomed out to fit, where board_view.py
+# drops detail; their draw_stacks should stay close to the 20-plate case.
+#
+#   python bench_render.py                 compare against bench_baselines.json, exit 1 on a regression
+#                                          (or when none of the cases run has a baseline to compare with)
+#   python bench_render.py --save          record the current timings as the new baselines (also --record)
+#   python bench_render.py --frontend photo --resolution 1080p
+
+FRONTENDS = ["photo", "new1", "background"]
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+GAME_LEVELS = [0, 2, 4, 8] # 4, 8, 12 and 20 plates
+BIG_BOARDS = [(100, 20), (300, 40)] # (plates, stacks) of endless levels
+TIMED_FUNCTIONS = ["draw_screens", "draw_gradient", "draw_stacks", "draw_box"]
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baselines.json")
+
+def instrument(module, timings):
+    # Swap the module-level functions for timed wrappers; draw_screens() looks them up as globals
+    for name in TIMED_FUNCTIONS:
+        fn = getattr(module, name)
+        def timed(*args, _fn=fn, _name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _fn(*args, **kwargs)
+            finally:
+                timings[_name] += time.perf_counter() - start
+        setattr(module, name, timed)
+
+def measure(module, timings, frames, warmup):
+    # Median per-frame milliseconds of each timed function over full (unclipped) redraws
+    samples = {name: [] for name in TIMED_FUNCTIONS}
+    for frame in range(warmup + frames):
+        for name in TIMED_FUNCTIONS:
+            timings[name] = 0.0
+        module.draw_screens()
+        if frame >= warmup:
+            for name in TIMED_FUNCTIONS:
+                samples[name].append(timings[name] * 1000)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+def run_child(frontend, frames, warmup):
+    # Runs inside the STACKING_PLATES_HEADLESS=1 process; prints one JSON object of results
+    sys.stdout = sys.stderr # Keep the front-end's own prints out of the JSON on stdout
+    module = importlib.import_module(frontend)
+    import pygame
+    from endless import LevelCurve, endless_levels
+    module.open_display()
+    module.leaderboard_data = [("Player", "campaign", lv, lv, 10 + lv, 30 + lv) for lv in range(1, 9)]
+    timings = {}
+    instrument(module, timings)
+    results = {}
+    for screen_name in module.bg_colors:
+        module.current_screen = screen_name
+        if screen_name == "game":
+            for level in GAME_LEVELS:
+                module.init_game(level)
+                results[f"game/{module.total_plates} plates"] = measure(module, timings, frames, warmup)
+            for plates, stacks in BIG_BOARDS:
+                module.endless_run = endless_levels(LevelCurve(plates, 0, stacks, 1), rng=random.Random(0))
+                module.endless_next = None
+                module.init_game(next(module.endless_run))
+                module.level_pipeline.cancel()
+                results[f"game/{plates} plates"] = measure(module, timings, frames, warmup)
+                module.board_view.press(pygame.K_0)
+                results[f"game/{plates} plates fit"] = measure(module, timings, frames, warmup)
+        else:
+            results[screen_name] = measure(module, timings, frames, warmup)
+    sys.stdout = sys.__stdout__
+    print(json.dumps(results))
+
+def run_frontend(frontend, resolution, frames, warmup):
+    w, h = RESOLUTIONS[resolution]
+    env = dict(os.environ, STACKING_PLATES_HEADLESS="1", STACKING_PLATES_SIZE=f"{w}x{h}")
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", frontend,
+                           "--frames", str(frames), "--warmup", str(warmup)],
+                          env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"Benchmark of {frontend} at {resolution} failed")
+    results = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {f"{frontend}/{resolution}/{case}": timing for case, timing in results.items()}
+
+def compare(results, baselines, tolerance, min_delta_ms):
+    # A case regresses when it is both tolerance (relative) and min_delta_ms (absolute) slower than its baseline
+    regressions = []
+    for key, timing in results.items():
+        base = baselines.get(key)
+        if base is None:
+            continue
+        for name, ms in timing.items():
+            old = base.get(name)
+            if old is not None and ms > old * (1 + tolerance) and ms - old > min_delta_ms:
+                regressions.append(f"{key} {name}: {ms:.3f} ms vs baseline {old:.3f} ms (+{(ms / old - 1) * 100 if old else float('inf'):.0f}%)")
+    return regressions
+
+def print_table(results, baselines):
+    print(f"{'case':<40}" + "".join(f"{name:>15}" for name in TIMED_FUNCTIONS))
+    for key, timing in results.items():
+        row = f"{key:<40}" + "".join(f"{timing[name]:>12.3f} ms" for name in TIMED_FUNCTIONS)
+        if key not in baselines:
+            row += "  (no baseline)"
+        print(row)
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless frame-time benchmark for the Stacking Plates front-ends")
+    parser.add_argument("--frontend", choices=FRONTENDS, action="append", help="default: all")
+    parser.add_argument("--resolution", choices=list(RESOLUTIONS), action="append", help="default: all")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--save", "--record", action="store_true", help="write the timings to the baseline file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative slowdown (default 0.3 = 30%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.2, help="slowdowns smaller than this never fail")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.frames, args.warmup)
+        return
+
+    results = {}
+    for frontend in args.frontend or FRONTENDS:
+        for resolution in args.resolution or list(RESOLUTIONS):
+            results.update(run_frontend(frontend, resolution, args.frames, args.warmup))
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baselines = json.load(f)
+    print_table(results, baselines)
+
+    if args.save:
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} baselines to {args.baseline}")
+        return
+
+    if not any(key in baselines for key in results): # Nothing was checked, so do not report a pass
+        print(f"No baselines for these cases in {args.baseline}; run with --save to record them.")
+        sys.exit(1)
+    regressions = compare(results, baselines, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} REGRESSION(S) against {args.baseline}:")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print("\nNo regressions against the baselines.")
+
+if __name__ == "__main__":
+    main()
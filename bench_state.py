@@ -0,0 +1,101 @@
+import argparse
+import random
+import sys
+import time
+
+from engine import GameState, level_size
+from state_codec import deep_size
+
+# --- Position Key Benchmark ---
+# Compares the packed code and Zobrist hash from state_codec.py with the plain
+# tuple(map(tuple, stacks)) key on positions from random play:
+#   - memory per key, and how many distinct keys a set of visited positions needs
+#     (the packed code merges positions that only differ in stack order)
+#   - keys per second when built from scratch, and when the engine keeps them up to
+#     date over a move (the tuple key has to be rebuilt after every move)
+#
+#   python bench_state.py                     levels 1-5, plus 20 and 40 plates
+#   python bench_state.py --level 4 --positions 200000
+
+def random_walk(state, count, rng):
+    # Positions visited by random play (undo included, as players use it)
+    positions = []
+    for _ in range(count):
+        if state.history and rng.random() < 0.2:
+            state.undo()
+        else:
+            state.move(*rng.choice(list(state.legal_moves())))
+        positions.append([stack[:] for stack in state.stacks])
+    return positions
+
+def rate(fn, items):
+    # Calls per second of fn over items
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - start)
+
+def incremental_rate_of(moves, key_of):
+    # Move + key + undo + key per second, the key read from the state the way a front-end or search would
+    start = time.perf_counter()
+    for state, (f, t) in moves:
+        state.move(f, t)
+        key_of(state)
+        state.undo()
+        key_of(state)
+    return len(moves) / (time.perf_counter() - start)
+
+def bench(total_plates, stack_count, positions, seed):
+    rng = random.Random(seed)
+    state = GameState.deal(total_plates, stack_count, rng)
+    codec = state.codec
+    walk = random_walk(state.copy(), positions, rng)
+
+    tuple_keys = [tuple(map(tuple, stacks)) for stacks in walk]
+    packed_keys = [codec.encode(stacks) for stacks in walk]
+    zobrist_keys = [codec.zobrist(stacks) for stacks in walk]
+    tuple_set, packed_set = set(tuple_keys), set(packed_keys)
+
+    moves = []
+    for stacks in walk[:max(1, positions // 4)]:
+        s = GameState(stacks, total_plates)
+        moves.append((s, rng.choice(list(s.legal_moves()))))
+
+    return {
+        "case": f"{total_plates} plates / {stack_count} stacks",
+        "bytes": (sum(map(deep_size, tuple_keys)) / positions, sum(map(deep_size, packed_keys)) / positions,
+                  sum(map(deep_size, zobrist_keys)) / positions),
+        "distinct": (len(tuple_set), len(packed_set)),
+        "set_bytes": (sys.getsizeof(tuple_set) + sum(map(deep_size, tuple_set)),
+                      sys.getsizeof(packed_set) + sum(map(deep_size, packed_set))),
+        "scratch": (rate(lambda stacks: hash(tuple(map(tuple, stacks))), walk), rate(codec.encode, walk),
+                    rate(codec.zobrist, walk)),
+        "incremental": (incremental_rate_of(moves, lambda s: hash(tuple(map(tuple, s.stacks)))),
+                        incremental_rate_of(moves, lambda s: s.packed),
+                        incremental_rate_of(moves, lambda s: s.zobrist)),
+    }
+
+def print_result(r):
+    tb, pb, zb = r["bytes"]
+    td, pd = r["distinct"]
+    ts, ps = r["set_bytes"]
+    print(r["case"])
+    print(f"  bytes per key        tuple {tb:8.0f}   packed {pb:8.0f}   zobrist {zb:8.0f}")
+    print(f"  distinct positions   tuple {td:8d}   packed {pd:8d}   ({100 * (1 - pd / td):.0f}% fewer)")
+    print(f"  visited set          tuple {ts / 1024:7.0f}K   packed {ps / 1024:7.0f}K   ({ts / ps:.1f}x smaller)")
+    print("  keys/s from scratch  tuple {:8.0f}   packed {:8.0f}   zobrist {:8.0f}".format(*r["scratch"]))
+    print("  move+key+undo+key/s  tuple {:8.0f}   packed {:8.0f}   zobrist {:8.0f}".format(*r["incremental"]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and speed of position keys: tuples vs packed codes and Zobrist hashes")
+    parser.add_argument("--level", type=int, action="append", help="0-based level (default: 0-4 plus two large custom sizes)")
+    parser.add_argument("--positions", type=int, default=50000, help="positions of random play per case")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    cases = [level_size(level) for level in args.level] if args.level else [level_size(level) for level in range(5)] + [(20, 6), (40, 8)]
+    for total_plates, stack_count in cases:
+        print_result(bench(total_plates, stack_count, args.positions, args.seed))
+
+if __name__ == "__main__":
+    main()
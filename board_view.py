@@ -0,0 +1,179 @@
+from collections import OrderedDict
+
+import pygame
+
+# --- Board View ---
+# The part of the game board the screen shows, so levels with hundreds of plates
+# and dozens of stacks stay playable (endless.py). Stacks keep their columns
+# across the viewport; when the stacks get taller than the viewport the board
+# scrolls (mouse wheel, Page Up / Page Down) and zooms (Ctrl+wheel, + and -, 0 to
+# fit the whole board, Home for the normal size).
+#
+# Only plates inside the viewport are drawn, and the detail drops as plates get
+# thin: below LABEL_MIN_HEIGHT pixels they lose their numbers, and below
+# RUN_MIN_HEIGHT every run of plates that get smaller going up is drawn as one
+# block as wide as its biggest plate. A frame therefore costs about the same at
+# 20 plates as at 500. Plates go where draw_stacks() always put them: the last
+# plate of a stack's list on the base, the rest going up from it.
+LABEL_MIN_HEIGHT = 10
+RUN_MIN_HEIGHT = 4
+MAX_ZOOM = 2.0
+ZOOM_STEP = 1.25
+WHEEL_PLATES = 3 # Plates scrolled per notch of the mouse wheel
+ATLAS_CACHE_SIZE = 4 # Zoomed plate sizes whose sprites are kept
+BOARD_KEYS = {pygame.K_PAGEUP, pygame.K_PAGEDOWN, pygame.K_HOME, pygame.K_0, pygame.K_KP0, pygame.K_EQUALS,
+              pygame.K_PLUS, pygame.K_KP_PLUS, pygame.K_MINUS, pygame.K_KP_MINUS}
+
+class BoardView:
+    def __init__(self, rect, stack_count, total_plates, column_width, base_inset, gap, min_pole, spare_plates, atlas):
+        self.rect = pygame.Rect(rect) # Viewport on screen; nothing of the board is drawn outside it
+        self.stack_count = stack_count
+        self.total_plates = total_plates
+        self.column_width = column_width
+        self.base_inset = base_inset
+        self.y_base = self.rect.bottom - base_inset # Base of the stacks when the board is not scrolled
+        self.gap = gap # Between plates, at zoom 1
+        self.min_pole = min_pole
+        self.spare_plates = spare_plates # Room left above a full stack, in plates
+        self.atlas_1 = atlas # Plate sprites at zoom 1, made with the level
+        self.atlases = OrderedDict() # (plate height, numbers) -> PlateAtlas, least recently used first
+        self.zoom = 1.0
+        self.scroll = 0 # Pixels the board is moved down, to show plates above the viewport
+
+    # --- Geometry ---
+    def plate_height(self):
+        return max(1, round(self.atlas_1.plate_height * self.zoom))
+
+    def step(self):
+        return self.plate_height() + round(self.gap * self.zoom)
+
+    def pole_height(self):
+        return max(self.min_pole, (self.total_plates + self.spare_plates) * self.plate_height())
+
+    def board_height(self):
+        # The pole, or every plate on one stack if that is taller
+        return max(self.pole_height(), self.total_plates * self.step())
+
+    def base(self):
+        return self.y_base + self.scroll
+
+    def pole(self):
+        # (top, height) of every pole on screen
+        height = self.pole_height()
+        return self.base() - height, height
+
+    def center_x(self, i):
+        return self.rect.left + i * self.column_width + self.column_width // 2
+
+    def column_rect(self, i, width=None):
+        # Screen area stack i draws in: its column (or `width` centered on it), from the top of the board
+        # to the base, inside the viewport
+        height = self.board_height()
+        top = self.base() - height
+        if width is None:
+            rect = pygame.Rect(int(self.rect.left + i * self.column_width), int(top), int(self.column_width) + 1, int(height) + 1)
+        else:
+            rect = pygame.Rect(self.center_x(i) - width // 2, top, width, height + 1)
+        return rect.clip(self.rect)
+
+    def stack_at(self, pos):
+        # Stack whose column is under pos, None outside the board
+        x, y = pos
+        if not self.rect.collidepoint(pos):
+            return None
+        if not self.base() - self.board_height() <= y <= self.base() + self.base_inset // 2:
+            return None
+        i = int((x - self.rect.left) // self.column_width)
+        return i if 0 <= i < self.stack_count else None
+
+    def state(self):
+        # Changes whenever everything on the board moves
+        return self.zoom, self.scroll
+
+    # --- Scrolling and Zoom ---
+    def max_scroll(self):
+        return max(0, self.board_height() - (self.y_base - self.rect.top))
+
+    def min_zoom(self):
+        # Small enough to fit the whole board, but not below one pixel per plate
+        h = self.atlas_1.plate_height
+        tallest = max((self.total_plates + self.spare_plates) * h, self.total_plates * (h + self.gap))
+        return max(1 / h, min(1.0, (self.y_base - self.rect.top) / tallest))
+
+    def scroll_by(self, pixels):
+        self.scroll = max(0, min(self.max_scroll(), self.scroll + int(pixels)))
+
+    def zoom_to(self, zoom):
+        # Keeps the plates at the bottom of the viewport where they are
+        old_step = self.step()
+        self.zoom = max(self.min_zoom(), min(MAX_ZOOM, zoom))
+        self.scroll = self.scroll * self.step() // old_step
+        self.scroll_by(0)
+
+    def wheel(self, notches, zoom=False):
+        if zoom:
+            self.zoom_to(self.zoom * ZOOM_STEP ** notches)
+        else:
+            self.scroll_by(notches * WHEEL_PLATES * self.step())
+
+    def press(self, key):
+        # One of BOARD_KEYS
+        page = (self.y_base - self.rect.top) * 4 // 5
+        if key == pygame.K_PAGEUP:
+            self.scroll_by(page)
+        elif key == pygame.K_PAGEDOWN:
+            self.scroll_by(-page)
+        elif key == pygame.K_HOME:
+            self.zoom_to(1.0)
+            self.scroll = 0
+        elif key in (pygame.K_0, pygame.K_KP0):
+            self.zoom_to(self.min_zoom())
+        elif key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+            self.zoom_to(self.zoom * ZOOM_STEP)
+        else:
+            self.zoom_to(self.zoom / ZOOM_STEP)
+
+    # --- Drawing ---
+    def atlas(self):
+        h = self.plate_height()
+        if h == self.atlas_1.plate_height:
+            return self.atlas_1
+        key = (h, h >= LABEL_MIN_HEIGHT)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = self.atlases[key] = self.atlas_1.resized(h, labels=key[1])
+            while len(self.atlases) > ATLAS_CACHE_SIZE:
+                self.atlases.popitem(last=False)
+        else:
+            self.atlases.move_to_end(key)
+        return atlas
+
+    def draw_stack(self, screen, stack, x_center, style):
+        # The plates of one stack that are inside the viewport, at the detail their size allows
+        h, step, base = self.plate_height(), self.step(), self.base()
+        if h < RUN_MIN_HEIGHT:
+            self._draw_runs(screen, stack, x_center, style, h, step, base)
+            return
+        atlas = self.atlas()
+        margin = atlas.overhang
+        # Plate k up from the base covers base - h - k * step .. base - k * step
+        lo = max(0, (base - h - margin - self.rect.bottom) // step)
+        hi = (base + margin - self.rect.top) // step + 1
+        screen.blits(atlas.stack_blits(stack, x_center, base, step, style, lo, hi), doreturn=False)
+
+    def _draw_runs(self, screen, stack, x_center, style, h, step, base):
+        color, widths = self.atlas_1.colors[style], self.atlas_1.plate_widths
+        lo = max(0, (base - h - self.rect.bottom) // step)
+        hi = min(len(stack), (base - self.rect.top) // step + 1)
+        k = lo
+        while k < hi:
+            start = k
+            while k + 1 < hi and stack[-2 - k] < stack[-1 - k]: # The plate above is smaller: same run
+                k += 1
+            width = widths[stack[-1 - start]]
+            top = base - h - k * step
+            block = pygame.Rect(x_center - width // 2, top, width, base - start * step - top)
+            pygame.draw.rect(screen, color, block)
+            if block.height > 2:
+                pygame.draw.rect(screen, (0, 0, 0), block, 1)
+            k += 1
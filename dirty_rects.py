@@ -0,0 +1,53 @@
+import pygame
+
+# --- Dirty Rectangle Renderer ---
+# Each frame the front-end reports every region that can change on its own
+# (a stack column, the timer, the moves box ...) together with a small value
+# describing what is drawn there. Only regions whose value or position changed
+# are repainted and handed to pygame.display.update(); switching scenes falls
+# back to a full repaint and a regular flip.
+class DirtyRectRenderer:
+    def __init__(self):
+        self.scene = None
+        self.regions = {} # key -> (rect, state) as last presented
+        self.dirty = []
+        self.full_repaint = True
+
+    def begin_frame(self, scene):
+        if scene != self.scene:
+            self.scene = scene
+            self.regions.clear()
+            self.invalidate()
+
+    def invalidate(self):
+        self.full_repaint = True
+        self.dirty = []
+
+    def track(self, key, rect, state):
+        rect = pygame.Rect(rect)
+        old = self.regions.get(key)
+        if old is not None and old[0] == rect and old[1] == state:
+            return
+        self.regions[key] = (rect, state)
+        if self.full_repaint:
+            return
+        if old is not None and old[0] != rect:
+            self.dirty.append(old[0]) # Uncover whatever the region used to occupy
+        self.dirty.append(rect)
+
+    def needs_redraw(self):
+        return self.full_repaint or bool(self.dirty)
+
+    def clip_rect(self):
+        # None means "no clipping" for Surface.set_clip()
+        if self.full_repaint or not self.dirty:
+            return None
+        return self.dirty[0].unionall(self.dirty[1:])
+
+    def present(self):
+        if self.full_repaint:
+            pygame.display.flip()
+        elif self.dirty:
+            pygame.display.update(self.dirty)
+        self.full_repaint = False
+        self.dirty = []
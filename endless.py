@@ -0,0 +1,113 @@
+import argparse
+import os
+import random
+import time
+
+from engine import BASE_STACKS, BASE_TOTAL_PLATES, PLATES_INCREMENT, GameState
+from level_catalog import SEEDS_PER_LEVEL, estimate_par, level_seed
+
+# --- Endless Mode ---
+# After the campaign's MAX_LEVELS the game can keep going: endless_levels() yields
+# level after level, forever, each getting more plates and stacks. A level is only
+# a handful of numbers (its size and seed) until a front-end deals it, and the
+# front-ends keep just the level being played and the next one, which the level
+# pipeline prepares in the background, so level 50 costs about what level 1 does
+# on the main thread however long a run goes on.
+#
+# Sizes follow a LevelCurve. By default it is the campaign's own (engine.level_size):
+# 4 + 2n plates on 3 + n // 2 stacks for level n from 0. STACKING_PLATES_CURVE
+# picks another, as "plates,plates per level,stacks,levels per extra stack".
+# A curve may not grow past MAX_PLATES_PER_STACK plates per stack, nor past
+# HANOI_PLATES while it is on 3 stacks: beyond that par takes the heuristic
+# solver seconds to find, if it finds one at all (see heuristic_solver.py).
+#
+#   python endless.py --levels 50           deal and rate levels 1-50, with the time each took
+#   STACKING_PLATES_CURVE=6,3,4,1 python endless.py --levels 20
+
+MAX_PLATES_PER_STACK = 8 # Most plates per stack a curve may reach; par stays within about 50 ms up to here
+HANOI_PLATES = 11 # Most plates a level on 3 stacks may have; there par about doubles with every plate
+
+class LevelCurve:
+    __slots__ = ("plates", "plates_step", "stacks", "levels_per_stack")
+
+    def __init__(self, plates, plates_step, stacks, levels_per_stack):
+        self.plates = plates
+        self.plates_step = plates_step
+        self.stacks = stacks
+        self.levels_per_stack = levels_per_stack
+
+    def size(self, level):
+        # (plates, stacks) of level n from 0, before a front-end clamps the stacks to its screen
+        return self.plates + self.plates_step * level, self.stacks + level // self.levels_per_stack
+
+    @classmethod
+    def parse(cls, spec):
+        plates, plates_step, stacks, levels_per_stack = (int(part) for part in spec.split(","))
+        if plates < 1 or plates_step < 0 or stacks < 3 or levels_per_stack < 1:
+            raise ValueError(f"Bad level curve {spec!r}: need plates >= 1, plates per level >= 0, stacks >= 3, levels per stack >= 1")
+        curve = cls(plates, plates_step, stacks, levels_per_stack)
+        if stacks == 3 and curve.size(levels_per_stack - 1)[0] > HANOI_PLATES:
+            raise ValueError(f"Bad level curve {spec!r}: it reaches {curve.size(levels_per_stack - 1)[0]} plates on 3 stacks; "
+                             f"par can only be found for up to {HANOI_PLATES}")
+        if curve.most_per_stack() > MAX_PLATES_PER_STACK:
+            raise ValueError(f"Bad level curve {spec!r}: it reaches {curve.most_per_stack():g} plates per stack; "
+                             f"par can only be found for up to {MAX_PLATES_PER_STACK}")
+        return curve
+
+    def most_per_stack(self):
+        # Plates per stack peak just before a stack is added: in the first step or in the long run
+        return max((self.plates + self.plates_step * (self.levels_per_stack - 1)) / self.stacks,
+                   self.plates_step * self.levels_per_stack)
+
+    def __repr__(self):
+        return f"LevelCurve({self.plates},{self.plates_step},{self.stacks},{self.levels_per_stack})"
+
+CAMPAIGN_CURVE = LevelCurve(BASE_TOTAL_PLATES, PLATES_INCREMENT, BASE_STACKS, 2)
+ENDLESS_CURVE = LevelCurve.parse(os.environ["STACKING_PLATES_CURVE"]) if os.environ.get("STACKING_PLATES_CURVE") \
+    else CAMPAIGN_CURVE
+
+class EndlessLevel:
+    __slots__ = ("level", "total_plates", "stack_count", "seed")
+
+    def __init__(self, level, total_plates, stack_count, seed):
+        self.level = level # From 0, like the campaign's
+        self.total_plates = total_plates
+        self.stack_count = stack_count
+        self.seed = seed
+
+    def deal(self, stack_count=None):
+        # The layout, on fewer stacks if the screen cannot fit them all
+        return GameState.deal(self.total_plates, stack_count or self.stack_count, random.Random(self.seed))
+
+    def __repr__(self):
+        return f"EndlessLevel(level={self.level + 1}, plates={self.total_plates}, stacks={self.stack_count}, seed={self.seed})"
+
+def endless_levels(curve=ENDLESS_CURVE, start=0, rng=random):
+    # Levels start, start + 1, ... of a run, forever; nothing is kept once a level is handed out
+    level = start
+    while True:
+        total_plates, stack_count = curve.size(level)
+        yield EndlessLevel(level, total_plates, stack_count, level_seed(level, rng.randrange(SEEDS_PER_LEVEL)))
+        level += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Deal and rate the levels of an endless Stacking Plates run")
+    parser.add_argument("--levels", type=int, default=20, help="levels 1..N (default 20)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the run")
+    args = parser.parse_args()
+
+    print(f"Curve {ENDLESS_CURVE}")
+    run = endless_levels(rng=random.Random(args.seed))
+    for _ in range(args.levels):
+        level = next(run)
+        started = time.perf_counter()
+        state = level.deal()
+        dealt = time.perf_counter()
+        par, exact = estimate_par(state.stacks, state.total_plates)
+        rated = time.perf_counter()
+        print(f"Level {level.level + 1}: {level.total_plates} plates, {level.stack_count} stacks, "
+              f"par {par if par is not None else 'not found'}{'' if exact else ' (heuristic)'}, deal {(dealt - started) * 1000:.2f} ms, "
+              f"par {(rated - dealt) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import random
+
+from state_codec import StateCodec
+
+# --- Game Engine ---
+# The rules of one level with no pygame in sight, so solvers, bots and tools can
+# import it cheaply and play hundreds of thousands of moves per second. The
+# front-ends keep one GameState per level and only draw it.
+#
+# A stack is a list of plate numbers from the bottom up. A plate may move onto
+# an empty stack or onto a smaller plate; the level is won once a single stack
+# holds every plate in increasing order from the bottom.
+
+# --- Level Config ---
+BASE_TOTAL_PLATES = 4
+PLATES_INCREMENT = 2
+BASE_STACKS = 3
+
+def level_size(level):
+    # (plates, stacks) of a level, before a front-end clamps the stacks to its screen
+    return BASE_TOTAL_PLATES + PLATES_INCREMENT * level, BASE_STACKS + (level // 2)
+
+def level_time(level):
+    # Seconds allowed for a level
+    return 45 * (level + 1)
+
+def sorted_run(stack):
+    # How many plates from the bottom of a stack are in increasing order
+    run = 0
+    while run < len(stack) and (run == 0 or stack[run - 1] < stack[run]):
+        run += 1
+    return run
+
+def plate_bound(stacks):
+    # Fewest moves a win could take, counted plate by plate: plates on the bottom run 1, 2, 3 ...
+    # of the home stack stay put, every other plate moves at least once, and twice if a smaller
+    # plate is below it. GameState.min_to_go is the same number kept up to date move by move;
+    # this works it out from scratch for searches over plain stacks (solver.py --quick)
+    bound = 0
+    for stack in stacks:
+        run = 0
+        while run < len(stack) and stack[run] == run + 1:
+            run += 1
+        lowest = stack[0] if stack else 0
+        for plate in stack[run:]:
+            if lowest < plate:
+                bound += 2
+            else:
+                bound += 1
+                lowest = plate
+    return bound
+
+class GameState:
+    __slots__ = ("stacks", "total_plates", "sorted_runs", "history", "moves", "won", "codec", "packed", "zobrist",
+                 "floors", "settled", "home", "min_to_go")
+
+    def __init__(self, stacks, total_plates=None):
+        stacks = [list(stack) for stack in stacks]
+        self.total_plates = sum(map(len, stacks)) if total_plates is None else total_plates
+        self.stacks = [[] for _ in stacks]
+        self.floors = [0] * (self.total_plates + 1) # floors[p]: smallest plate from p down to the bottom of its stack
+        self.settled = 0 # Plates 1, 2, 3 ... already in place at the bottom of the home stack
+        self.home = None # Stack holding plate 1 at its bottom, if any
+        self.min_to_go = 0 # plate_bound() of the position; kept up to date by _push() and _pop() in O(1)
+        for i, stack in enumerate(stacks):
+            for plate in stack:
+                self._land(i, plate)
+                self.stacks[i].append(plate)
+        self.sorted_runs = [sorted_run(stack) for stack in self.stacks] # Kept up to date by _push() and _pop()
+        self.history = [] # (from, to, plate) of every move still on the undo stack
+        self.moves = 0 # What the player is scored on; undoing a move counts as one too
+        self.won = any(run == self.total_plates for run in self.sorted_runs)
+        self.codec = StateCodec.for_plates(self.total_plates)
+        self.packed = self.codec.encode(self.stacks) # Same for any order of the stacks; kept up to date by _push() and _pop()
+        self.zobrist = self.codec.zobrist(self.stacks)
+
+    @classmethod
+    def deal(cls, total_plates, stack_count, rng=random):
+        # Shuffled plates dealt round-robin over all stacks but the last, which starts empty
+        plates = list(range(1, total_plates + 1))
+        rng.shuffle(plates)
+        stacks = [[] for _ in range(stack_count)]
+        sel = 0
+        for plate in plates:
+            stacks[sel].append(plate)
+            sel = (sel + 1) % (stack_count - 1 if stack_count > 1 else stack_count)
+        return cls(stacks, total_plates)
+
+    @property
+    def stack_count(self):
+        return len(self.stacks)
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.stacks = [stack[:] for stack in self.stacks]
+        state.total_plates = self.total_plates
+        state.sorted_runs = self.sorted_runs[:]
+        state.history = self.history[:]
+        state.moves = self.moves
+        state.won = self.won
+        state.codec = self.codec
+        state.packed = self.packed
+        state.zobrist = self.zobrist
+        state.floors = self.floors[:]
+        state.settled = self.settled
+        state.home = self.home
+        state.min_to_go = self.min_to_go
+        return state
+
+    def key(self):
+        # Hashable snapshot of the position (stacks only, not history or moves)
+        return tuple(map(tuple, self.stacks))
+
+    def is_valid_move(self, f, t):
+        stacks = self.stacks
+        if not (0 <= f < len(stacks) and 0 <= t < len(stacks)): return False
+        if f == t: return False
+        if not stacks[f]: return False
+
+        return not stacks[t] or stacks[f][-1] > stacks[t][-1]
+
+    def legal_moves(self):
+        stacks = self.stacks
+        for f, src in enumerate(stacks):
+            if not src:
+                continue
+            top = src[-1]
+            for t, dst in enumerate(stacks):
+                if t != f and (not dst or top > dst[-1]):
+                    yield f, t
+
+    def _land(self, i, plate):
+        # Counts `plate` into min_to_go as it lands on stack i (before it is appended)
+        stack = self.stacks[i]
+        if len(stack) == self.settled and plate == self.settled + 1 and (not stack or i == self.home):
+            self.settled += 1
+            self.home = i
+            floor = 1
+        else:
+            floor = min(plate, self.floors[stack[-1]]) if stack else plate
+            self.min_to_go += 2 if floor < plate else 1 # Has to step aside for a smaller plate first
+        self.floors[plate] = floor
+
+    def _lift(self, i):
+        # Takes the top plate of stack i back out of min_to_go (before it is popped)
+        plate = self.stacks[i][-1]
+        if i == self.home and len(self.stacks[i]) == self.settled:
+            self.settled -= 1
+            if not self.settled:
+                self.home = None
+        else:
+            self.min_to_go -= 2 if self.floors[plate] < plate else 1
+
+    def _push(self, i, plate):
+        self._land(i, plate)
+        stack = self.stacks[i]
+        if self.sorted_runs[i] == len(stack) and (not stack or stack[-1] < plate):
+            self.sorted_runs[i] += 1
+        below = stack[-1] if stack else 0
+        self.packed ^= below << self.codec.shifts[plate]
+        self.zobrist ^= self.codec.zobrist_keys[plate][below]
+        stack.append(plate)
+
+    def _pop(self, i):
+        self._lift(i)
+        stack = self.stacks[i]
+        if self.sorted_runs[i] == len(stack):
+            self.sorted_runs[i] -= 1
+        plate = stack.pop()
+        below = stack[-1] if stack else 0
+        self.packed ^= below << self.codec.shifts[plate] # Same flip as in _push(): the entry goes back to 0 while the plate is in hand
+        self.zobrist ^= self.codec.zobrist_keys[plate][below]
+        return plate
+
+    def move(self, f, t):
+        # Returns False (and changes nothing) when the move breaks the rules
+        if not self.is_valid_move(f, t):
+            return False
+        plate = self._pop(f)
+        self._push(t, plate)
+        self.won = self.sorted_runs[t] == self.total_plates # Only the stack that just grew can have become complete
+        self.history.append((f, t, plate))
+        self.moves += 1
+        return True
+
+    def undo(self):
+        # Takes back the last move; returns it as (from, to, plate), or None with nothing to undo
+        if not self.history:
+            return None
+        f, t, plate = self.history.pop()
+        self._pop(t)
+        self._push(f, plate)
+        self.won = self.sorted_runs[f] == self.total_plates
+        self.moves += 1
+        return f, t, plate
+
+    def is_win(self):
+        return self.won
@@ -0,0 +1,254 @@
+import argparse
+import heapq
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from engine import GameState, level_size
+from solver import Solution, check_solution, lower_bound, replay, solve
+from state_codec import StateCodec
+
+# --- External-Memory Solver ---
+# Layered search that keeps its positions on disk instead of in a dict, for
+# levels whose visited set does not fit in RAM. Every layer (all positions first
+# reached after the same number of moves) is a file of packed codes, sorted and
+# written as fixed-width big-endian records, so byte order is numeric order.
+# Expanding a layer collects children in memory until the RAM cap is reached,
+# then sorts and writes them as a run; the runs are merged, with duplicates
+# dropped on the way and positions already in the visited file (the sorted
+# union of all earlier layers) filtered out by walking both files side by side.
+# Moves are not always reversible (a plate dealt onto a bigger one cannot go
+# back), so a child can turn up again any number of layers later, hence the
+# full visited file rather than just the last two layers.
+#
+# The same bound as parallel_solver.py keeps the layers small: children whose
+# moves so far plus lower_bound() exceed it are cut, and a bound without a win is
+# raised to the smallest cut value. No parents are stored; the solution line is
+# recovered by scanning each earlier layer for a position that leads to the
+# next one on the way back from the win.
+#
+#   python external_solver.py --plates 16 --stacks 6 --seed 3 --ram-mb 512 --workdir /mnt/scratch
+
+BYTES_PER_BUFFERED_CODE = 64 # A Python int in a list, plus room for sorting and the set used to dedup a run
+READ_CHUNK = 65536 # Records per file read
+
+def write_codes(path, codes, width):
+    # Streams sorted codes to a file; returns how many were written
+    count = 0
+    with open(path, "wb") as f:
+        batch = []
+        for code in codes:
+            batch.append(code.to_bytes(width, "big"))
+            if len(batch) == READ_CHUNK:
+                f.write(b"".join(batch))
+                count += len(batch)
+                batch = []
+        f.write(b"".join(batch))
+    return count + len(batch)
+
+def read_codes(path, width):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(width * READ_CHUNK)
+            if not chunk:
+                return
+            for i in range(0, len(chunk), width):
+                yield int.from_bytes(chunk[i:i + width], "big")
+
+def contains(path, code, width):
+    # Binary search of a sorted code file
+    with open(path, "rb") as f:
+        lo, hi = 0, os.path.getsize(path) // width
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(mid * width)
+            value = int.from_bytes(f.read(width), "big")
+            if value == code:
+                return True
+            if value < code:
+                lo = mid + 1
+            else:
+                hi = mid
+    return False
+
+def merge_unique(sources):
+    # Sorted union of sorted code streams
+    last = None
+    for code in heapq.merge(*sources):
+        if code != last:
+            yield code
+            last = code
+
+def difference(codes, excluded):
+    # Sorted codes that are not in the sorted stream `excluded`
+    excluded = iter(excluded)
+    other = next(excluded, None)
+    for code in codes:
+        while other is not None and other < code:
+            other = next(excluded, None)
+        if code != other:
+            yield code
+
+def children(code, codec, stack_count, home_runs):
+    # (child code, position) of every move worth trying, with the same pruning as solver.solve()
+    shifts = codec.shifts
+    position = [tuple(stack) for stack in codec.decode(code, stack_count)]
+    for f, src in enumerate(position):
+        if not src or src == home_runs[len(src)]:
+            continue
+        top = src[-1]
+        lifted = code ^ ((src[-2] if len(src) > 1 else 0) << shifts[top])
+        tried_empty = len(src) == 1
+        for t, dst in enumerate(position):
+            if t == f:
+                continue
+            if dst:
+                if top < dst[-1]:
+                    continue
+            elif tried_empty:
+                continue
+            else:
+                tried_empty = True
+            child = list(position)
+            child[f] = src[:-1]
+            child[t] = dst + (top,)
+            yield lifted ^ ((dst[-1] if dst else 0) << shifts[top]), child
+
+class LayerFiles:
+    # The layer and visited files of one bound, in a scratch directory
+    def __init__(self, workdir, width):
+        self.dir = tempfile.mkdtemp(prefix="plates-", dir=workdir)
+        self.width = width
+        self.layers = []
+        self.visited = None
+        self.runs = 0
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write_run(self, codes):
+        self.runs += 1
+        path = self.path(f"run{self.runs}.bin")
+        write_codes(path, sorted(set(codes)), self.width)
+        return path
+
+    def add_layer(self, codes):
+        # Writes the next layer from sorted unique codes and folds it into the visited file; returns its size
+        path = self.path(f"layer{len(self.layers)}.bin")
+        count = write_codes(path, codes, self.width)
+        self.layers.append(path)
+        merged = self.path(f"visited{len(self.layers)}.bin")
+        sources = [read_codes(path, self.width)] + ([read_codes(self.visited, self.width)] if self.visited else [])
+        write_codes(merged, merge_unique(sources), self.width)
+        if self.visited:
+            os.remove(self.visited)
+        self.visited = merged
+        return count
+
+    def disk_bytes(self):
+        return sum(os.path.getsize(self.path(name)) for name in os.listdir(self.dir))
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+def solve_external(stacks, total_plates=None, ram_bytes=256 * 1024 * 1024, workdir=None):
+    # Same par as solver.solve(); Solution.table_bytes is the peak disk use rather than RAM
+    started = time.perf_counter()
+    start = tuple(map(tuple, stacks))
+    if total_plates is None:
+        total_plates = sum(map(len, start))
+    stack_count = len(start)
+    codec = StateCodec.for_plates(total_plates)
+    width = -(-total_plates * codec.bits // 8)
+    home_runs = [tuple(range(1, i + 1)) for i in range(total_plates + 1)]
+    start_code = codec.encode(start)
+    goal = codec.encode([range(1, total_plates + 1)])
+    buffer_limit = max(1024, ram_bytes // BYTES_PER_BUFFERED_CODE)
+
+    expanded = generated = peak_disk = 0
+    bound = lower_bound(start)
+    while bound is not None:
+        files = LayerFiles(workdir, width)
+        try:
+            files.add_layer([start_code])
+            found = start_code == goal
+            next_bound = None
+            while not found:
+                depth = len(files.layers) - 1
+                runs = []
+                buffer = []
+                for code in read_codes(files.layers[-1], width):
+                    expanded += 1
+                    for child_code, child in children(code, codec, stack_count, home_runs):
+                        cost = depth + 1 + lower_bound(child)
+                        if cost > bound:
+                            if next_bound is None or cost < next_bound:
+                                next_bound = cost
+                            continue
+                        buffer.append(child_code)
+                        generated += 1
+                        if len(buffer) >= buffer_limit:
+                            runs.append(files.write_run(buffer))
+                            buffer = []
+                if buffer:
+                    runs.append(files.write_run(buffer))
+                new = difference(merge_unique([read_codes(run, width) for run in runs]), read_codes(files.visited, width))
+                count = files.add_layer(new)
+                peak_disk = max(peak_disk, files.disk_bytes())
+                for run in runs:
+                    os.remove(run)
+                if count == 0:
+                    break # No win within this bound
+                found = contains(files.layers[-1], goal, width)
+            if found:
+                keys = trace_back(files, goal, codec, stack_count, home_runs)
+                return Solution(replay(start, keys), expanded, generated, peak_disk, time.perf_counter() - started)
+            bound = next_bound
+        finally:
+            files.close()
+    return Solution(None, expanded, generated, peak_disk, time.perf_counter() - started)
+
+def trace_back(files, goal, codec, stack_count, home_runs):
+    # Codes from just after the start to the win: for each layer, going backwards,
+    # find a position in it with a move onto the one found in the layer after
+    keys = [goal]
+    for path in reversed(files.layers[:-1]):
+        target = keys[-1]
+        for code in read_codes(path, files.width):
+            if any(child_code == target for child_code, _ in children(code, codec, stack_count, home_runs)):
+                keys.append(code)
+                break
+    keys.reverse()
+    return keys[1:]
+
+def main():
+    parser = argparse.ArgumentParser(description="Par of huge Stacking Plates levels with the search kept on disk")
+    parser.add_argument("--level", type=int, default=None, help="0-based level to deal")
+    parser.add_argument("--plates", type=int, default=None, help="custom level: plate count")
+    parser.add_argument("--stacks", type=int, default=None, help="custom level: stack count")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ram-mb", type=int, default=256, help="memory for sorting children before they go to disk")
+    parser.add_argument("--workdir", default=None, help="where the layer files go (default: the system temp dir)")
+    parser.add_argument("--check", action="store_true", help="also run the in-memory solver and compare")
+    args = parser.parse_args()
+
+    if args.plates:
+        total_plates, stack_count = args.plates, args.stacks or level_size(0)[1]
+    else:
+        total_plates, stack_count = level_size(args.level or 0)
+    stacks = GameState.deal(total_plates, stack_count, random.Random(args.seed)).stacks
+    print(f"Layout:   {stacks}")
+    solution = solve_external(stacks, total_plates, args.ram_mb * 1024 * 1024, args.workdir)
+    print(f"External: {solution} (table = peak disk use)")
+    if solution.moves is not None:
+        print(f"Solution: {' '.join(f'{f + 1}>{t + 1}' for f, t in solution.moves)}")
+        print(f"Replays:  {check_solution(stacks, solution.moves)}")
+    if args.check:
+        single = solve(stacks, total_plates)
+        print(f"Single:   {single}")
+        print(f"Same par: {single.par == solution.par}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+# --- Frame Phase Profiler ---
+# Splits every main-loop iteration into phases (event handling, the timer
+# update, each drawing step, the flip) and keeps a rolling window of per-frame
+# timings. Times are exclusive: while a nested phase such as draw.gradient runs,
+# the enclosing draw phase is paused, so the phases of a frame add up to its total.
+PHASES = ("events", "timer", "dirty", "draw", "draw.gradient", "draw.box", "draw.stacks",
+          "draw.text", "draw.buttons", "present")
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, min(len(sorted_values) - 1, -(-len(sorted_values) * q // 100) - 1))]
+
+class RollingLog:
+    # One line per frame, as CSV or JSONL depending on the file extension. When the file
+    # grows past max_bytes it is moved to <path>.1 (replacing the previous one) and restarted.
+    def __init__(self, path, fields, max_bytes=5 * 1024 * 1024):
+        self.path = path
+        self.fields = fields
+        self.max_bytes = max_bytes
+        self.jsonl = path.endswith(".jsonl")
+        self.file = None
+        self.open()
+
+    def open(self):
+        self.file = open(self.path, "a", newline="")
+        self.writer = None if self.jsonl else csv.DictWriter(self.file, self.fields)
+        if self.writer and self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.jsonl:
+            self.file.write(json.dumps(record) + "\n")
+        else:
+            self.writer.writerow(record)
+        if self.file.tell() > self.max_bytes:
+            self.file.close()
+            os.replace(self.path, self.path + ".1")
+            self.open()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+class FrameProfiler:
+    def __init__(self, window=300, log_path=None, max_log_bytes=5 * 1024 * 1024, hud_refresh=0.5):
+        self.samples = deque(maxlen=window) # Per-frame {phase: ms, "frame": ms}
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.stack = []
+        self.mark = time.perf_counter()
+        self.log = RollingLog(log_path, ["time", "screen", "level", "plates", "frame"] + list(PHASES), max_log_bytes) if log_path else None
+        self.hud_visible = False
+        self.hud_refresh = hud_refresh
+        self.hud_lines = ()
+        self.hud_updated = 0.0
+        self.hud_surface = None
+        self.hud_rect = pygame.Rect(0, 0, 0, 0)
+        self.hud_font = None
+
+    # Timing
+    def begin_frame(self, phase):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.stack = [phase]
+        self.mark = time.perf_counter()
+
+    def switch(self, phase):
+        # Ends the current top-level phase and starts the next one
+        now = time.perf_counter()
+        if self.stack:
+            self.totals[self.stack[-1]] += now - self.mark
+        self.stack = [phase]
+        self.mark = now
+
+    def push(self, phase):
+        now = time.perf_counter()
+        if self.stack:
+            self.totals[self.stack[-1]] += now - self.mark
+        self.stack.append(phase)
+        self.mark = now
+
+    def pop(self):
+        now = time.perf_counter()
+        self.totals[self.stack.pop()] += now - self.mark
+        self.mark = now
+
+    def timed(self, phase):
+        # Decorator: time every call of a drawing helper as its own phase
+        def wrap(fn):
+            def timed_call(*args, **kwargs):
+                self.push(phase)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.pop()
+            return timed_call
+        return wrap
+
+    def end_frame(self, record=True, screen=None, level=None, plates=None):
+        # record=False drops iterations that neither handled an event nor drew anything
+        self.switch(None)
+        self.stack = []
+        if not record:
+            return
+        sample = {phase: seconds * 1000 for phase, seconds in self.totals.items()}
+        sample["frame"] = sum(sample.values())
+        self.samples.append(sample)
+        if self.log:
+            record = {key: round(ms, 4) for key, ms in sample.items()}
+            self.log.write(dict(record, time=round(time.time(), 3), screen=screen, level=level, plates=plates))
+
+    def percentiles(self, key="frame"):
+        values = sorted(sample[key] for sample in self.samples)
+        return percentile(values, 50), percentile(values, 95), percentile(values, 99)
+
+    def close(self):
+        if self.log:
+            self.log.close()
+
+    # HUD
+    def toggle_hud(self):
+        self.hud_visible = not self.hud_visible
+        self.hud_updated = 0.0
+
+    def current_hud_lines(self):
+        # Refreshed a few times a second so the numbers stay readable and the HUD is not redrawn every frame
+        now = time.perf_counter()
+        if now - self.hud_updated >= self.hud_refresh:
+            self.hud_updated = now
+            p50, p95, p99 = self.percentiles()
+            lines = [f"{'ms':<14}{'p50':>7}{'p95':>7}{'p99':>7}  n={len(self.samples)}",
+                     f"{'frame':<14}{p50:7.2f}{p95:7.2f}{p99:7.2f}"]
+            for phase in PHASES:
+                p50, p95, p99 = self.percentiles(phase)
+                if p99 > 0:
+                    lines.append(f"{phase:<14}{p50:7.2f}{p95:7.2f}{p99:7.2f}")
+            self.hud_lines = tuple(lines)
+        return self.hud_lines
+
+    def hud_region(self, screen_size):
+        # (rect, state) for the dirty-rect renderer; state is None while the HUD is hidden
+        if not self.hud_visible:
+            return self.hud_rect, None
+        lines = self.current_hud_lines()
+        if self.hud_surface is None or lines != self.hud_surface_lines:
+            self.hud_surface = self.compose_hud(lines)
+            self.hud_surface_lines = lines
+        self.hud_rect = self.hud_surface.get_rect(bottomleft=(10, screen_size[1] - 10))
+        return self.hud_rect, lines
+
+    def compose_hud(self, lines):
+        # Numbers change constantly, so these lines go straight to font.render instead of the shared text cache
+        if self.hud_font is None:
+            self.hud_font = pygame.font.SysFont("consolas,dejavusansmono,couriernew,monospace", 16)
+        rendered = [self.hud_font.render(line, True, (255, 255, 255)) for line in lines]
+        line_height = self.hud_font.get_linesize()
+        surface = pygame.Surface((max(r.get_width() for r in rendered) + 16, line_height * len(rendered) + 12), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 180))
+        for i, r in enumerate(rendered):
+            surface.blit(r, (8, 6 + i * line_height))
+        return surface
+
+    def draw_hud(self, surface):
+        if self.hud_visible and self.hud_surface is not None:
+            surface.blit(self.hud_surface, self.hud_rect)
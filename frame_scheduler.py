@@ -0,0 +1,47 @@
+import time
+
+import pygame
+
+# --- Idle Frame Scheduler ---
+# Replaces the fixed clock.tick(30) + event.get() at the top of the main loop.
+# When nothing on screen changes by itself the loop sleeps in event.wait()
+# until input arrives or the screen's next visible change is due (e.g. the
+# next second of the countdown), instead of spinning at 30 FPS.
+class IdleScheduler:
+    def __init__(self, fps=30, max_idle_ms=1000):
+        self.fps = fps
+        self.max_idle_ms = max_idle_ms # Upper bound on a single sleep, keeps the loop responsive to the OS
+        self.clock = pygame.time.Clock()
+        self.frames = self.idle_waits = 0
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def next_events(self, next_change_in):
+        # next_change_in: seconds until the screen changes without input, 0 while animating,
+        # None when only input can change it
+        self.clock.tick(self.fps) # Never loop faster than the old fixed frame rate
+        self.frames += 1
+        if next_change_in == 0:
+            return pygame.event.get()
+        timeout = self.max_idle_ms
+        if next_change_in is not None:
+            timeout = max(1, min(timeout, int(next_change_in * 1000) + 1))
+        self.idle_waits += 1
+        first = pygame.event.wait(timeout)
+        events = [] if first.type == pygame.NOEVENT else [first]
+        events.extend(pygame.event.get())
+        return events
+
+    def stats(self):
+        wall = max(time.perf_counter() - self.wall_start, 1e-9)
+        cpu = time.process_time() - self.cpu_start
+        busy_frames = int(wall * self.fps) # What the fixed 30 FPS loop would have run in the same time
+        return {"frames": self.frames, "idle_waits": self.idle_waits, "wall_seconds": wall, "cpu_seconds": cpu,
+                "cpu_percent": 100 * cpu / wall, "frames_avoided": max(0, busy_frames - self.frames),
+                "frame_reduction_percent": 100 * max(0, busy_frames - self.frames) / busy_frames if busy_frames else 0.0}
+
+    def summary(self):
+        s = self.stats()
+        return (f"Idle scheduler: {s['frames']} loop iterations in {s['wall_seconds']:.0f}s "
+                f"({s['frame_reduction_percent']:.0f}% fewer than a fixed {self.fps} FPS loop), "
+                f"CPU {s['cpu_percent']:.1f}%")
@@ -0,0 +1,550 @@
+import argparse
+import heapq
+import random
+import time
+from collections import Counter
+from functools import lru_cache
+from math import comb
+
+from engine import GameState, level_size
+from solver import check_solution, lower_bound, replay, solve
+from state_codec import StateCodec
+
+# --- Heuristic Solver ---
+# Exact search stops scaling after a few dozen plates. This one finds a winning
+# line for levels of any size, and improves it while time is left:
+#   1. A rollout plays the level the way a careful player would: dig out the
+#      next plate the home stack needs, parking whatever is on top of it (on an
+#      empty stack if possible, else where it will not be in the way soon), then
+#      put it home. A plate that fits nowhere gets room made for it: the plates
+#      on some stack that are bigger than it are stacked onto another one as a
+#      tower (Frame-Stewart, with every stack that can hold them on the way).
+#      Nothing is ever taken back. If a plate still is not home after PATIENCE
+#      moves per plate, or no room can be made, everything left is gathered onto
+#      the home stack (finish()): the smallest plates go on it a batch at a time,
+#      with the rest waiting aside as a tower, so a rollout always ends with a
+#      winning line. Every move checks the deadline (the budget or, with none,
+#      FIRST_LINE_SECONDS) and stop(); if either hits first, there is no line.
+#   2. Shortcutting drops detours: wherever a position on the line can reach a
+#      later one in a single move, the moves in between go.
+#   3. With a time budget, reshuffled rollouts and beam searches of growing width
+#      take turns looking for a shorter line. A beam keeps per layer the children
+#      with the smallest lower_bound(); one that never had to drop a child was a
+#      full search, so if it finds nothing shorter the line is optimal.
+# The result carries lower_bound() of the start, so the par it gives always comes
+# with how far from optimal it can be at most.
+#
+# With few stacks for the plates (3 stacks is Towers of Hanoi in disguise) even
+# the shortest winning lines grow exponentially with the plates per stack, and
+# the rollout's lines grow faster still: at 4 plates per stack they are within
+# about 1.3x of the lower bound, at 8-10 per stack 7-20x, at 25 per stack 60x,
+# and past that the line can take longer to find than the first-line limit.
+# The levels' own sizes add a stack every two levels, and stay near 4 per stack.
+#
+#   python heuristic_solver.py --plates 200 --stacks 52 --seed 1
+#   python heuristic_solver.py --level 4 --deals 50 --budget 0.5 --check
+
+PATIENCE = 4 # Moves per plate a rollout may spend parking before it gathers everything else out of the way
+LANDINGS = 3 # How many of a plate's next spots on a line shortcut() tries moving it to straight away
+FIRST_LINE_SECONDS = 2.0 # How long the first line may take when there is no budget
+
+class OutOfTime(Exception):
+    pass
+
+class Estimate:
+    __slots__ = ("moves", "lower", "method", "seconds")
+
+    def __init__(self, moves, lower, method, seconds):
+        self.moves = moves # [(from, to), ...] on the stacks as given, None if no line was found in time
+        self.lower = lower # No win takes fewer moves
+        self.method = method # What found the line: "rollout", "reshuffled rollout", "beam search" or "gave up"
+        self.seconds = seconds
+
+    @property
+    def par(self):
+        return None if self.moves is None else len(self.moves)
+
+    @property
+    def gap(self):
+        # Extra moves over the best possible line, at most
+        return None if self.moves is None else self.par - self.lower
+
+    def __repr__(self):
+        if self.moves is None:
+            return f"Estimate(no line, lower={self.lower}, {self.method}, {self.seconds * 1000:.1f} ms)"
+        ratio = self.gap / self.par if self.par else 0
+        return (f"Estimate(par={self.par}, lower={self.lower}, gap={self.gap} ({ratio:.0%}), "
+                f"{self.method}, {self.seconds * 1000:.1f} ms)")
+
+@lru_cache(maxsize=None)
+def tower_split(count, pegs):
+    # Frame-Stewart: how many of `count` plates (the biggest) to set aside using all `pegs`, so that the rest
+    # move with one peg fewer and the whole stays near the fewest moves a tower takes on that many pegs
+    r = pegs - 2
+    t = 1
+    while comb(t + r, r) < count:
+        t += 1
+    return comb(t - 2 + r, r) + min(count - comb(t - 1 + r, r), comb(t - 2 + r, r - 1))
+
+@lru_cache(maxsize=None)
+def tower_moves(count, pegs):
+    # Frame-Stewart moves for a tower of `count` plates on `pegs` stacks
+    moves = 0
+    while count > 1 and pegs > 3:
+        high = tower_split(count, pegs)
+        moves += 2 * tower_moves(high, pegs)
+        count -= high
+        pegs -= 1
+    return moves + (2 ** count - 1 if count > 1 else count)
+
+class Rollout:
+    # One play of a level the way a careful player would; run() returns its moves, or None if the deadline
+    # passes or stop() turns true first. With an rng, now and then a parking spot other than the best one
+    # is taken, for a different line.
+    def __init__(self, stacks, total_plates, rng=None, deadline=None, stop=None):
+        self.stacks = [list(stack) for stack in stacks]
+        self.total_plates = total_plates
+        self.where = {plate: i for i, stack in enumerate(self.stacks) for plate in stack}
+        self.depth = {plate: d for stack in self.stacks for d, plate in enumerate(stack)}
+        self.moves = []
+        self.rng = rng
+        self.deadline = deadline
+        self.stop = stop
+
+    def move(self, f, t):
+        if (self.stop and self.stop()) or (self.deadline is not None and time.perf_counter() > self.deadline):
+            raise OutOfTime
+        plate = self.stacks[f].pop()
+        self.depth[plate] = len(self.stacks[t])
+        self.stacks[t].append(plate)
+        self.where[plate] = t
+        self.moves.append((f, t))
+
+    def top(self, i):
+        return self.stacks[i][-1] if self.stacks[i] else 0
+
+    def destination(self, plate, src, avoid):
+        # Where to park the top plate of `src`: alone on an empty stack, from where it only has to move again to
+        # go home; else on a smaller top, of the stack whose smallest plate is needed last so it can stay there
+        # the longest.
+        tops = [i for i, stack in enumerate(self.stacks) if stack and stack[-1] < plate and i != src and i not in avoid]
+        tops.sort(key=lambda i: (min(self.stacks[i]), self.stacks[i][-1]), reverse=True)
+        if len(self.stacks[src]) > 1:
+            empty = next((i for i, stack in enumerate(self.stacks) if not stack and i != src and i not in avoid), None)
+            if empty is not None:
+                tops.insert(0, empty)
+        if self.rng and len(tops) > 1 and self.rng.random() < 0.3:
+            tops.insert(0, tops.pop(self.rng.randrange(len(tops))))
+        return tops[0] if tops else None
+
+    def clear(self, src, count, avoid):
+        # Moves the top `count` plates of `src` onto stacks outside `avoid`, a run in order at a time; False if
+        # some plate fits nowhere even after make_room()
+        while count:
+            stack = self.stacks[src]
+            run = 1
+            while run < count and stack[-run - 1] < stack[-run]:
+                run += 1
+            if not self.spread(src, run, avoid):
+                return False
+            count -= run
+        return True
+
+    def spread(self, src, count, avoid):
+        # Moves the top `count` plates of `src`, which are in order, onto other stacks outside `avoid`: the
+        # biggest go where destination() says, together with every other one bigger than that stack's top,
+        # as a tower (gather()), and so on down
+        stack = self.stacks[src]
+        plates = sorted(stack[-count:])
+        below = stack[-count - 1] if len(stack) > count else 0
+        while plates:
+            t = self.destination(plates[-1], src, avoid)
+            if t is None:
+                t = self.make_room(plates[-1], avoid | {src})
+                if t is None:
+                    return False
+            top = self.top(t)
+            portion = [p for p in plates if p > top]
+            while True:
+                rest = plates[:len(plates) - len(portion)]
+                pool = [i for i in range(len(self.stacks)) if i == t or (i != src and self.top(i) < portion[0])]
+                if (rest[-1] if rest else below) < portion[0]:
+                    pool.append(src) # What stays there is smaller, so it can hold them on the way too
+                if len(portion) < max(len(pool), 2):
+                    break
+                portion = portion[1:] # Only as many as there are stacks to spread them over, so each moves twice at most
+            plates = rest
+            self.gather(portion, t, pool)
+        return True
+
+    def make_room(self, plate, avoid):
+        # A stack outside `avoid` whose top is smaller than `plate`, after clearing the plates above its topmost
+        # such plate (all bigger) off the one with the fewest of them; None if that fails
+        best = None
+        for i, stack in enumerate(self.stacks):
+            if i in avoid:
+                continue
+            d = len(stack)
+            while d and stack[d - 1] > plate:
+                d -= 1
+            if best is None or len(stack) - d < best[0]:
+                best = len(stack) - d, i
+        if best is None or not self.clear(best[1], best[0], avoid):
+            return None
+        return best[1]
+
+    def gather(self, plates, target, pool, ordered=False):
+        # Stacks `plates` (ascending) in order on `target`. They have to be the top plates of the `pool` stacks,
+        # each pool stack's other plates smaller than all of them; those stay as they are, so any pool stack can
+        # hold plates on the way. When every pool stack has them in order (`ordered`), it is Frame-Stewart: the
+        # biggest go aside, the rest go on `target` with that stack left out, the biggest follow. Otherwise the
+        # smallest is uncovered (everything above it aside), put on `target` and the rest gathered on it.
+        while plates:
+            stack = self.stacks[target]
+            inside = set(plates)
+            base = len(stack)
+            while base and stack[base - 1] in inside:
+                base -= 1
+            done = 0
+            while done < len(plates) and base + done < len(stack) and stack[base + done] == plates[done]:
+                done += 1 # Already in place at the bottom
+            plates = plates[done:]
+            if len(plates) <= 1:
+                if plates:
+                    self.move(self.where[plates[0]], target)
+                return
+            inside.difference_update(stack[base:base + done])
+            held = Counter(self.where[p] for p in plates)
+            if not ordered:
+                ordered = all(self.depth[p] == 0 or self.stacks[self.where[p]][self.depth[p] - 1] not in inside
+                              or self.stacks[self.where[p]][self.depth[p] - 1] < p for p in plates)
+            if ordered:
+                split = len(plates) - tower_split(len(plates), len(pool))
+                low, high = plates[:split], plates[split:]
+                holding = {self.where[p] for p in low}
+                aside = [i for i in pool if i != target and i not in holding]
+                if aside:
+                    aside = max(aside, key=held.__getitem__)
+                    self.gather(high, aside, pool, True)
+                    self.gather(low, target, [i for i in pool if i != aside], True)
+                    plates = high
+                    continue
+            split = self.split(plates, inside, target, pool)
+            if split:
+                count, aside, lower, keep = split
+                self.gather([p for p in plates[count:] if self.depth[p] > keep[self.where[p]]], aside, pool)
+                self.gather(plates[:count], target, lower)
+                plates = plates[count:]
+                ordered = False
+                continue
+            least = plates[0]
+            src = self.where[least]
+            stack = self.stacks[src]
+            under = set()
+            d = self.depth[least] - 1
+            while d >= 0 and stack[d] in inside:
+                under.add(stack[d])
+                d -= 1
+            rest = [p for p in plates[1:] if p not in under]
+            aside = max((i for i in pool if i != src and i != target), key=held.__getitem__)
+            self.gather(rest, aside, pool)
+            if src == target: # The smallest has some of the others under it on `target`: it waits on a third stack
+                self.move(target, next(i for i in pool if i != target and i != aside))
+                continue
+            self.move(src, target)
+            plates = plates[1:]
+            ordered = False
+
+    def split(self, plates, inside, target, pool):
+        # For gather(): how many of the smallest `plates` to put on `target` first. The others above them go aside
+        # as a tower, then the smallest are gathered with the stacks that hold none of the others under them,
+        # and the others follow. That needs none of the others between two of the smallest, `target` among those
+        # stacks and at least three of them. Of the counts that work, the one with the fewest tower moves per
+        # plate wins. Returns the count, the aside stack, those stacks and per stack the depth of its topmost
+        # smallest plate (-1 for none), or None.
+        segments = {}
+        for p in plates:
+            segments.setdefault(self.where[p], []).append(self.depth[p])
+        bottom = {i: min(depths) for i, depths in segments.items()}
+        low = {} # Per stack: how many of the smallest so far, and the depths of the lowest and topmost one
+        broken = 0 # Stacks with one of the others between two of the smallest
+        mixed = set() # Stacks with one of the others under the smallest
+        free = sorted((i for i in pool if i != target), key=lambda i: len(segments.get(i, ())), reverse=True)
+        best = None
+        for count in range(1, min(len(plates), len(pool) ** 2 + 1)):
+            p = plates[count - 1]
+            i, d = self.where[p], self.depth[p]
+            n, first, last = low.get(i, (0, d, d))
+            if n:
+                broken -= last - first >= n
+            n, first, last = n + 1, min(first, d), max(last, d)
+            low[i] = n, first, last
+            broken += last - first >= n
+            if first > bottom[i] and i in pool:
+                mixed.add(i)
+            else:
+                mixed.discard(i)
+            while free and free[0] in low:
+                free.pop(0)
+            if count < 2 or broken or target in mixed or not free:
+                continue
+            lower = len(pool) - len(mixed) - 1
+            if lower >= 3 and count <= lower ** 2:
+                cost = (tower_moves(len(plates) - count, len(pool)) + 2 * tower_moves(count, lower)) / count
+                if best is None or cost < best[0]:
+                    best = cost, count, free[0], set(mixed)
+        if best is None:
+            return None
+        _, count, aside, mixed = best
+        keep = {i: -1 for i in segments}
+        for p in plates[:count]:
+            keep[self.where[p]] = max(keep[self.where[p]], self.depth[p])
+        return count, aside, [i for i in pool if i != aside and i not in mixed], keep
+
+    def finish(self, plate, home):
+        # The sure way home for everything left: gather() it all onto the home stack's run
+        self.gather(list(range(plate, self.total_plates + 1)), home, list(range(len(self.stacks))))
+
+    def run(self):
+        # Brings plate after plate home: what is on top of the next one and anything parked on the home stack
+        # is cleared off to other stacks (see spread()), making room where it fits nowhere. If a plate takes more than
+        # PATIENCE moves per plate that way, or no room can be made, finish() takes everything home for certain.
+        stacks = self.stacks
+        try:
+            home = next((i for i, stack in enumerate(stacks) if stack and stack[0] == 1), None)
+            if home is None: # Plate 1 needs an empty stack: the one with the fewest plates to move off
+                src = self.where[1]
+                home = min((i for i in range(len(stacks)) if i != src), key=lambda i: len(stacks[i]))
+            settled = 0
+            while settled < len(stacks[home]) and stacks[home][settled] == settled + 1:
+                settled += 1
+            since = len(self.moves)
+            while settled < self.total_plates:
+                plate = settled + 1
+                src = self.where[plate]
+                if not settled: # Until plate 1 is down any stack can be home, so the emptiest one is
+                    home = min((i for i in range(len(stacks)) if i != src), key=lambda i: len(stacks[i]))
+                ready = src != home and len(stacks[home]) == settled and stacks[src][-1] == plate
+                if not ready and len(self.moves) - since > PATIENCE * self.total_plates:
+                    break
+                if src == home: # Parked on the home stack earlier and now needed from under that
+                    parked = self.clear(home, len(stacks[home]) - self.depth[plate], {home})
+                elif len(stacks[home]) > settled:
+                    parked = self.clear(home, len(stacks[home]) - settled, {src})
+                elif stacks[src][-1] != plate:
+                    parked = self.clear(src, len(stacks[src]) - self.depth[plate] - 1, {home} if settled else set())
+                else:
+                    self.move(src, home)
+                    settled += 1
+                    since = len(self.moves)
+                    continue
+                if not parked:
+                    break
+            else:
+                return self.moves
+            self.finish(settled + 1, home)
+            return self.moves
+        except OutOfTime:
+            return None
+
+def successors(position, code, shifts, home_runs):
+    # (child code, child position) of every move worth trying, with the same pruning as solver.solve()
+    for f, src in enumerate(position):
+        if not src or src == home_runs[len(src)]:
+            continue
+        top = src[-1]
+        lifted = code ^ ((src[-2] if len(src) > 1 else 0) << shifts[top])
+        tried_empty = len(src) == 1
+        for t, dst in enumerate(position):
+            if t == f:
+                continue
+            if dst:
+                if top < dst[-1]:
+                    continue
+            elif tried_empty:
+                continue
+            else:
+                tried_empty = True
+            child = list(position)
+            child[f] = src[:-1]
+            child[t] = dst + (top,)
+            yield lifted ^ ((dst[-1] if dst else 0) << shifts[top]), tuple(child)
+
+def shortcut(start, moves, deadline=None, stop=None):
+    # The line with its detours dropped: from each position, move straight to the latest one on the line
+    # that a single move reaches. Only moves of a top plate onto one of its next LANDINGS spots on the line
+    # are tried, which finds nearly all of them for a scan of the stacks per step. Codes ignore stack order,
+    # so the moves are worked out on the board as it stands rather than taken from the line. If the deadline
+    # passes or stop() turns true first, the rest of the line is kept as it is.
+    state = GameState(start)
+    shifts = state.codec.shifts
+    last = {state.packed: 0}
+    landings = {} # plate: (move number, plate it lands on) of each of its moves
+    for i, (f, t) in enumerate(moves, 1):
+        landings.setdefault(state.stacks[f][-1], []).append((i, state.stacks[t][-1] if state.stacks[t] else 0))
+        state.move(f, t)
+        last[state.packed] = i # Later visits win, so loops are cut too
+    ahead = dict.fromkeys(landings, 0) # Per plate, its first landing past the current position
+    position = [list(stack) for stack in start]
+    code = state.codec.encode(position)
+    i = last[code]
+    line = []
+    while i < len(moves):
+        if (stop and stop()) or (deadline is not None and time.perf_counter() > deadline):
+            board = [list(stack) for stack in start] # The rest of the line as it is, on the stacks as they stand
+            for f, t in moves[:i]:
+                board[t].append(board[f].pop())
+            spots = {}
+            for t, stack in enumerate(position):
+                spots.setdefault(tuple(stack), []).append(t)
+            order = [spots[tuple(stack)].pop() for stack in board]
+            return line + [(order[f], order[t]) for f, t in moves[i:]]
+        tops = {(stack[-1] if stack else 0): t for t, stack in enumerate(position)}
+        best = None
+        for f, src in enumerate(position):
+            if not src or src[-1] not in landings:
+                continue
+            top = src[-1]
+            spots = landings[top]
+            k = ahead[top]
+            while k < len(spots) and spots[k][0] <= i:
+                k += 1
+            ahead[top] = k
+            lifted = code ^ ((src[-2] if len(src) > 1 else 0) << shifts[top])
+            for _, under in spots[k:k + LANDINGS]:
+                t = tops.get(under)
+                if t is not None and t != f and under < top:
+                    child = lifted ^ (under << shifts[top])
+                    j = last.get(child, -1)
+                    if best is None or j > best[0]:
+                        best = (j, f, t, child)
+        i, f, t, code = best
+        position[t].append(position[f].pop())
+        line.append((f, t))
+    return line
+
+def beam_search(start, total_plates, width, deadline=None, cutoff=None, stop=None):
+    # (moves or None, whether no child was ever dropped). Only lines shorter than `cutoff` count; a search that
+    # dropped nothing and found none proves there is none. Gives up at `deadline` or once stop() is true.
+    codec = StateCodec.for_plates(total_plates)
+    home_runs = [tuple(range(1, i + 1)) for i in range(total_plates + 1)]
+    start_code = codec.encode(start)
+    goal = codec.encode([range(1, total_plates + 1)])
+    parents = {start_code: None}
+    layer = [(lower_bound(start), start_code, start)]
+    depth = 0
+    complete = True
+    while layer:
+        depth += 1
+        children = []
+        for _, code, position in layer:
+            if (deadline is not None and time.perf_counter() > deadline) or (stop and stop()):
+                return None, False
+            for child_code, child in successors(position, code, codec.shifts, home_runs):
+                if child_code in parents:
+                    continue
+                parents[child_code] = code
+                if child_code == goal:
+                    keys = []
+                    while child_code != start_code:
+                        keys.append(child_code)
+                        child_code = parents[child_code]
+                    keys.reverse()
+                    return replay(start, keys), complete
+                h = lower_bound(child)
+                if cutoff is None or depth + h < cutoff:
+                    children.append((h, child_code, child))
+        if len(children) > width:
+            complete = False
+            children = heapq.nsmallest(width, children, key=lambda c: c[0])
+        layer = children
+    return None, complete
+
+def solve_heuristic(stacks, total_plates=None, budget=0.0, stop=None, progress=None):
+    # A winning line for `stacks` and how good it is; `budget` seconds are spent looking for a shorter one,
+    # unless stop() turns true first. progress(estimate) hears of the first line and of every improvement.
+    # The first line gets the budget too (FIRST_LINE_SECONDS without one); if none is found by then, or
+    # stop() turns true first, the estimate has moves None.
+    started = time.perf_counter()
+    start = tuple(map(tuple, stacks))
+    if total_plates is None:
+        total_plates = sum(map(len, start))
+    lower = lower_bound(start)
+    method = "rollout"
+    first = started + (budget or FIRST_LINE_SECONDS)
+    moves = Rollout(start, total_plates, deadline=first, stop=stop).run()
+    if moves is None:
+        return Estimate(None, lower, "gave up", time.perf_counter() - started)
+    moves = shortcut(start, moves, first, stop)
+    if progress:
+        progress(Estimate(moves, lower, method, time.perf_counter() - started))
+    deadline = started + budget
+    width = 4
+    attempt = 0
+    while budget and len(moves) > lower and time.perf_counter() < deadline and not (stop and stop()):
+        attempt += 1
+        best = len(moves), lower
+        found = Rollout(start, total_plates, random.Random(attempt), deadline, stop).run()
+        if found is not None:
+            found = shortcut(start, found, deadline, stop)
+            if len(found) < len(moves):
+                moves, method = found, "reshuffled rollout"
+        found, complete = beam_search(start, total_plates, width, deadline, len(moves), stop)
+        if found is not None:
+            moves, method = shortcut(start, found, deadline, stop), "beam search"
+        elif complete:
+            lower = len(moves) # Nothing shorter exists
+        if progress and (len(moves), lower) != best:
+            progress(Estimate(moves, lower, method, time.perf_counter() - started))
+        width *= 4
+    return Estimate(moves, lower, method, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Quick par for Stacking Plates levels of any size, with its gap to a lower bound")
+    parser.add_argument("--level", type=int, default=None, help="0-based level to deal")
+    parser.add_argument("--plates", type=int, default=None, help="custom level: plate count")
+    parser.add_argument("--stacks", type=int, default=None, help="custom level: stack count")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--deals", type=int, default=1, help="average over this many deals")
+    parser.add_argument("--budget", type=float, default=0.0, help="seconds per deal to spend improving the line")
+    parser.add_argument("--check", action="store_true", help="also run the exact solver and compare")
+    args = parser.parse_args()
+
+    if args.plates:
+        total_plates, stack_count = args.plates, args.stacks or level_size(0)[1]
+    else:
+        total_plates, stack_count = level_size(args.level or 0)
+    rng = random.Random(args.seed)
+    results = []
+    gave_up = 0
+    for _ in range(args.deals):
+        stacks = GameState.deal(total_plates, stack_count, rng).stacks
+        estimate = solve_heuristic(stacks, total_plates, args.budget)
+        if estimate.moves is None:
+            print(f"No line within {args.budget or FIRST_LINE_SECONDS:g}s for {stacks}: {estimate}")
+            gave_up += 1
+            continue
+        if not check_solution(stacks, estimate.moves):
+            raise SystemExit(f"Line does not win {stacks}")
+        exact = solve(stacks, total_plates).par if args.check else None
+        results.append((estimate, exact))
+        if args.deals == 1:
+            print(f"Layout:    {stacks}")
+            print(f"Heuristic: {estimate}")
+            print(f"Solution:  {' '.join(f'{f + 1}>{t + 1}' for f, t in estimate.moves)}")
+            if exact is not None:
+                print(f"Exact par: {exact}")
+    if args.deals > 1 and results:
+        n = len(results)
+        print(f"{total_plates} plates / {stack_count} stacks, {n} deals" + (f" ({gave_up} more with no line found)" if gave_up else ""))
+        print(f"  mean par {sum(e.par for e, _ in results) / n:.1f}, mean lower bound {sum(e.lower for e, _ in results) / n:.1f}, "
+              f"mean gap {sum(e.gap for e, _ in results) / n:.1f} moves")
+        print(f"  mean {sum(e.seconds for e, _ in results) / n * 1000:.1f} ms, slowest {max(e.seconds for e, _ in results) * 1000:.1f} ms")
+        methods = Counter(e.method for e, _ in results)
+        print(f"  found by {', '.join(f'{method} {count}' for method, count in methods.most_common())}")
+        if args.check:
+            print(f"  mean exact par {sum(x for _, x in results) / n:.1f}, "
+                  f"optimal on {sum(e.par == x for e, x in results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import os
+import sqlite3
+import time
+
+# --- Hint Cache ---
+# Hints found by the search (hints.py) kept on disk, so a position only has to be
+# searched once: across restarts, and across photo.py, new1.py and background.py,
+# which all use the same SQLite file next to the game. Rows are keyed by plate count
+# and packed position code (state_codec.py), which is the same for any order of the
+# stacks; for the same reason the move is stored as (plate, plate it lands on or 0).
+#
+# Each row remembers when it was last used. Once the rows take up more than
+# max_bytes, the least recently used quarter is dropped; SQLite reuses the freed
+# pages, so the file stops growing at about that size.
+#
+#   python hint_cache.py            rows, size and limit of the cache
+#   python hint_cache.py --clear    empty it
+
+HINT_CACHE_PATH = os.environ.get("STACKING_PLATES_HINT_CACHE") or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "hints.sqlite")
+MAX_BYTES = 32 * 1024 * 1024
+
+def position_key(code):
+    return code.to_bytes((code.bit_length() + 7) // 8, "big")
+
+class HintCache:
+    def __init__(self, path=HINT_CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.db = None # Opened on first use, by the thread that uses it (the hint worker in the game)
+        self.evictions = 0
+
+    def _open(self):
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL") # Other games keep reading while one writes
+            self.db.execute("CREATE TABLE IF NOT EXISTS hints (plates INTEGER, position BLOB, plate INTEGER, onto INTEGER, "
+                            "togo INTEGER, exact INTEGER, used REAL, PRIMARY KEY (plates, position)) WITHOUT ROWID")
+            self.db.execute("CREATE INDEX IF NOT EXISTS hints_used ON hints (used)")
+            self.db.commit()
+        return self.db
+
+    def get(self, total_plates, code):
+        # (plate, onto, moves to go, exact) for the position, or None
+        db = self._open()
+        key = position_key(code)
+        row = db.execute("SELECT plate, onto, togo, exact FROM hints WHERE plates = ? AND position = ?",
+                         (total_plates, key)).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE hints SET used = ? WHERE plates = ? AND position = ?", (time.time(), total_plates, key))
+        db.commit()
+        return row[0], row[1], row[2], bool(row[3])
+
+    def put(self, total_plates, entries):
+        # entries: (code, (plate, onto, moves to go, exact)); a row is only replaced by a shorter or proven line
+        db = self._open()
+        now = time.time()
+        db.executemany("INSERT INTO hints VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (plates, position) DO UPDATE SET "
+                       "plate = excluded.plate, onto = excluded.onto, togo = excluded.togo, exact = excluded.exact, "
+                       "used = excluded.used WHERE excluded.togo < hints.togo OR (excluded.exact AND NOT hints.exact)",
+                       [(total_plates, position_key(code), plate, onto, togo, int(exact), now)
+                        for code, (plate, onto, togo, exact) in entries])
+        if self.size() > self.max_bytes:
+            rows = db.execute("SELECT COUNT(*) FROM hints").fetchone()[0]
+            db.execute("DELETE FROM hints WHERE used <= (SELECT used FROM hints ORDER BY used LIMIT 1 OFFSET ?)",
+                       (rows // 4,))
+            self.evictions += 1
+        db.commit()
+
+    def size(self):
+        # Bytes in pages that hold rows (freed pages are not counted; they get reused)
+        db = self._open()
+        page_size = db.execute("PRAGMA page_size").fetchone()[0]
+        pages = db.execute("PRAGMA page_count").fetchone()[0] - db.execute("PRAGMA freelist_count").fetchone()[0]
+        return pages * page_size
+
+    def stats(self):
+        rows = self._open().execute("SELECT COUNT(*) FROM hints").fetchone()[0]
+        return {"rows": rows, "bytes": self.size(), "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+    def clear(self):
+        db = self._open()
+        db.execute("DELETE FROM hints")
+        db.commit()
+        db.execute("VACUUM")
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+def main():
+    parser = argparse.ArgumentParser(description="The on-disk hint cache shared by the Stacking Plates front-ends")
+    parser.add_argument("--path", default=HINT_CACHE_PATH)
+    parser.add_argument("--clear", action="store_true", help="delete every cached hint")
+    args = parser.parse_args()
+
+    cache = HintCache(args.path)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{args.path}: {stats['rows']} positions, {stats['bytes'] / 1024:.0f} KiB of {stats['max_bytes'] / 1024 / 1024:.0f} MiB")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
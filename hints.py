@@ -0,0 +1,179 @@
+import threading
+from collections import OrderedDict
+
+from engine import GameState
+from heuristic_solver import solve_heuristic
+
+# --- Hint Engine ---
+# Finds a good next move for the player without ever holding up the main loop.
+# The search (heuristic_solver.py's anytime solver) runs on one worker thread:
+# its first line is posted at once and every shorter one as it is found, so a
+# hint shows up quickly and gets better while the budget lasts. The main loop
+# takes up what was posted with poll(), once per frame, so the hint never
+# changes between working out what to redraw and drawing it. A move, an undo
+# or a new level cancels the search: the search checks stop() on every move it
+# plays and every position it expands, so the worker is idle again within a few
+# milliseconds, and anything it still posts for an old position is dropped.
+# A search that finds no line within the budget posts "no hint" (gave_up).
+#
+# A finished search gives a hint for every position along its line (the rest of a
+# shortest line is a shortest line too). They are memoized per position hash
+# (GameState.zobrist) in a bounded LRU, so following the hint or undoing back to a
+# position costs nothing, and handed to the optional on-disk HintCache
+# (hint_cache.py), which the worker checks before searching. The hash ignores the
+# order of the stacks, so a move is remembered as (plate, what it lands on) and
+# matched back to stack numbers when it is used.
+
+HINT_BUDGET = 2.0 # Seconds of search per hint
+MEMO_SIZE = 4096 # Positions remembered; the least recently used are dropped first
+
+class Hint:
+    __slots__ = ("move", "togo", "exact")
+
+    def __init__(self, move, togo, exact):
+        self.move = move # (from, to) on the stacks the hint was asked for
+        self.togo = togo # Moves left to win along the hinted line
+        self.exact = exact # The line is proven shortest
+
+    def __repr__(self):
+        return f"Hint({self.move[0] + 1}>{self.move[1] + 1}, togo={self.togo}{', exact' if self.exact else ''})"
+
+def plates_of(stacks, move):
+    # (plate moved, plate it lands on or 0 for an empty stack): the same move whatever the stack order
+    f, t = move
+    return stacks[f][-1], stacks[t][-1] if stacks[t] else 0
+
+def move_of(stacks, plate, onto):
+    # Back from plates_of() to (from, to) on these stacks
+    f = next(i for i, stack in enumerate(stacks) if stack and stack[-1] == plate)
+    t = next(i for i, stack in enumerate(stacks) if i != f and (stack[-1] if stack else 0) == onto)
+    return f, t
+
+def hint_of(estimate):
+    return Hint(estimate.moves[0], estimate.par, estimate.gap == 0)
+
+def line_entries(stacks, total_plates, estimate):
+    # (position hash, position code, (plate, onto, moves to go, exact)) for each position along the line
+    state = GameState(stacks, total_plates)
+    exact = estimate.gap == 0
+    entries = []
+    for done, move in enumerate(estimate.moves):
+        entries.append((state.zobrist, state.packed, (*plates_of(state.stacks, move), estimate.par - done, exact)))
+        state.move(*move)
+    return entries
+
+class HintEngine:
+    def __init__(self, budget=HINT_BUDGET, memo_size=MEMO_SIZE, on_update=None, store=None):
+        self.budget = budget
+        self.memo_size = memo_size
+        self.store = store # HintCache shared with other sessions; only the worker thread touches it
+        self.on_update = on_update # Called from the worker thread after posting, e.g. to wake an idle main loop
+        self.memo = OrderedDict() # Position hash -> (plate, onto, moves to go, exact), oldest use first
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.generation = 0 # Bumped by every request and cancel; results for older ones are dropped
+        self.job = None # (generation, stacks, total plates, position hash, position code) waiting for the worker
+        self.worker = None # Started on the first search
+        self.busy = False # The worker is on a job, current or not
+        self.posted = None # (hint, still searching) from the worker, waiting for poll()
+        self.hint = None # Hint for the position last asked about, None until one is known
+        self.searching = False
+        self.gave_up = False # The search for the position last asked about found no line in time
+        self.hits = self.misses = 0
+
+    def request(self, state, tablebase=None):
+        # Hint for `state`: at once if memoized or in the level's tablebase, otherwise from the worker
+        with self.lock:
+            self.generation += 1
+            self.job = None
+            self.posted = None
+            self.hint = None
+            self.searching = False
+            self.gave_up = False
+            if state.won:
+                return
+            entry = self.memo.get(state.zobrist)
+            if entry is not None:
+                self.memo.move_to_end(state.zobrist)
+                self.hits += 1
+            elif tablebase:
+                best, togo = tablebase.advice(state)
+                entry = (*plates_of(state.stacks, best), togo, True)
+                self._remember(state.zobrist, entry)
+            if entry is not None:
+                self.hint = Hint(move_of(state.stacks, entry[0], entry[1]), entry[2], entry[3])
+                return
+            self.misses += 1
+            self.job = (self.generation, [stack[:] for stack in state.stacks], state.total_plates, state.zobrist, state.packed)
+            self.searching = True
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._work, name="hints", daemon=True)
+                self.worker.start()
+            self.wake.notify()
+
+    def cancel(self):
+        # The position changed: forget the shown hint and stop any search for it
+        with self.lock:
+            self.generation += 1
+            self.job = None
+            self.posted = None
+            self.hint = None
+            self.searching = False
+            self.gave_up = False
+
+    def poll(self):
+        # Takes up the worker's latest hint; True if hint or searching changed
+        with self.lock:
+            if self.posted is None:
+                return False
+            self.hint, self.searching = self.posted
+            self.gave_up = self.hint is None and not self.searching
+            self.posted = None
+            return True
+
+    def _remember(self, position, entry):
+        self.memo[position] = entry
+        self.memo.move_to_end(position)
+        while len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+
+    def _work(self):
+        while True:
+            with self.lock:
+                self.busy = False
+                while self.job is None:
+                    self.wake.wait()
+                generation, stacks, total_plates, position, code = self.job
+                self.job = None
+                self.busy = True
+            stored = self.store.get(total_plates, code) if self.store else None
+            if stored is not None:
+                plate, onto, togo, exact = stored
+                self._post(generation, Hint(move_of(stacks, plate, onto), togo, exact), False, [(position, stored)])
+                continue
+            estimate = solve_heuristic(stacks, total_plates, self.budget,
+                                       stop=lambda: self.generation != generation,
+                                       progress=lambda found: self._post(generation, hint_of(found), True))
+            if estimate.moves is None:
+                self._post(generation, None, False) # Dropped anyway if it was cancelled
+                continue
+            if self.generation != generation:
+                continue # Cancelled while it was finishing; its line is not worth going through
+            line = line_entries(stacks, total_plates, estimate)
+            if self._post(generation, hint_of(estimate), False, [(zobrist, entry) for zobrist, _, entry in line]) and self.store:
+                self.store.put(total_plates, [(code, entry) for _, code, entry in line])
+
+    def _post(self, generation, hint, searching, remember=()):
+        # Hands a hint to poll(); False (and nothing posted) if another position was asked about since
+        with self.lock:
+            if generation != self.generation:
+                return False
+            self.posted = hint, searching
+            for position, entry in remember:
+                self._remember(position, entry)
+        if self.on_update:
+            self.on_update()
+        return True
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.memo)}
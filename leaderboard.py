@@ -0,0 +1,67 @@
+import os
+
+# --- Leaderboard ---
+# Best results, kept in leaderboard.txt and shared by the three front-ends. Each
+# play of a level gets one of its catalog deals (level_catalog.py), and some
+# deals need far more moves than others, so results are only ranked against
+# results on the same deal: an entry is (name, mode, level, deal, moves,
+# seconds), the board is ordered by mode, level, deal, then moves and time, and a
+# player keeps one entry per deal, their best. Endless runs (endless.py) are
+# their own mode, so their levels never mix with the campaign's; they show as
+# "E<level>", and each mode keeps its own LEADERBOARD_SIZE best, so the ten rows
+# the front-ends show always have room for both. Lines written before deals or
+# modes were recorded load as campaign results, with deal 0 shown as "-".
+LEADERBOARD_PATH = "leaderboard.txt"
+LEADERBOARD_SIZE = 5 # Entries kept per mode
+CAMPAIGN = "campaign"
+ENDLESS = "endless"
+
+def rank_key(entry):
+    name, mode, level, deal, moves, seconds = entry
+    return mode != CAMPAIGN, level, deal, moves, seconds
+
+def load_results(path=LEADERBOARD_PATH):
+    entries = []
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                fields = line.strip().split(",")
+                if len(fields) == 4: # name,level,moves,time from before deals were recorded
+                    fields.insert(2, "0")
+                if len(fields) == 5: # name,level,deal,moves,time from before modes were recorded
+                    fields.insert(1, CAMPAIGN)
+                if len(fields) == 6:
+                    name, mode, level, deal, moves, seconds = fields
+                    entries.append((name, mode, int(level), int(deal), int(moves), int(seconds)))
+    return entries
+
+def save_results(entries, path=LEADERBOARD_PATH):
+    with open(path, "w") as f:
+        for name, mode, level, deal, moves, seconds in entries:
+            f.write(f"{name},{mode},{level},{deal},{moves},{seconds}\n")
+
+def record_result(entries, name, mode, level, deal, moves, seconds, path=LEADERBOARD_PATH):
+    # Adds a win to `entries` (in place) unless the player already did as well on this deal; True if it changed
+    entry = (name, mode, level, deal, moves, seconds)
+    for i, old in enumerate(entries):
+        if old[:4] == entry[:4]:
+            if rank_key(entry) >= rank_key(old):
+                return False
+            del entries[i]
+            break
+    entries.append(entry)
+    counts = {} # mode -> entries kept so far
+    kept = []
+    for old in sorted(entries, key=rank_key):
+        counts[old[1]] = counts.get(old[1], 0) + 1
+        if counts[old[1]] <= LEADERBOARD_SIZE:
+            kept.append(old)
+    entries[:] = kept
+    save_results(entries, path)
+    return True
+
+def level_label(mode, level):
+    return f"E{level}" if mode == ENDLESS else str(level)
+
+def deal_label(deal):
+    return f"#{deal}" if deal else "-"
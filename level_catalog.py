@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import random
+import time
+
+from engine import GameState, level_size
+from heuristic_solver import solve_heuristic
+from solver import lower_bound, solve
+
+# --- Level Catalog ---
+# Every level is dealt from a seed, so a seed names the same layout for every
+# player and leaderboard times on it can be compared. The catalog file lists a set
+# of seeds per level, each with its layout, par and difficulty, worked out once
+# when the catalog is built; the game picks from it in O(1) and never solves.
+#
+# Difficulty within a level: the seeds are ranked by par (then by how far par is
+# above the per-plate minimum, engine.plate_bound()) and split into equal thirds,
+# the bands easy / medium / hard. The game deals from all of them alike; the
+# bands describe the catalog (--show) and the leaderboard ranks results per deal.
+#
+#   python level_catalog.py                          build levels.json: levels 1-5, 64 seeds each
+#   python level_catalog.py --levels 10 --seeds 16   more levels (par from the heuristic solver past EXACT_PLATES)
+#   python level_catalog.py --show                   par and band counts per level
+LEVEL_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels.json")
+CATALOG_LEVELS = 5
+SEEDS_PER_LEVEL = 64
+EXACT_PLATES = 12 # Bigger levels get their par from heuristic_solver.py instead of the exact search
+PAR_SECONDS = 2.0 # Longest estimate_par() looks for a par before it settles for none
+BANDS = ("easy", "medium", "hard")
+VERSION = 1
+
+def level_seed(level, index):
+    # The index-th seed of a level; the same numbers whether or not a catalog was built
+    return level << 20 | index
+
+def deal_number(seed):
+    # What the game shows for a seed: its index within the level, from 1
+    return (seed & (1 << 20) - 1) + 1
+
+def deal_level(level, seed, stack_count=None):
+    total_plates, default_stacks = level_size(level)
+    return GameState.deal(total_plates, stack_count or default_stacks, random.Random(seed))
+
+class CatalogLevel:
+    __slots__ = ("level", "seed", "stacks", "par", "exact", "lower", "detours", "band")
+
+    def __init__(self, level, seed, stacks, par, exact, lower, detours, band=None):
+        self.level = level
+        self.seed = seed
+        self.stacks = stacks # Layout as dealt, bottom plate first
+        self.par = par
+        self.exact = exact # par is proven shortest (False past EXACT_PLATES)
+        self.lower = lower # solver.lower_bound() of the layout
+        self.detours = detours # Moves par needs beyond engine.plate_bound()
+        self.band = band # Index into BANDS
+
+    def to_json(self):
+        return {"seed": self.seed, "stacks": self.stacks, "par": self.par, "exact": self.exact,
+                "lower": self.lower, "detours": self.detours, "band": self.band}
+
+    def __repr__(self):
+        return f"CatalogLevel(level={self.level + 1}, seed={self.seed}, par={self.par}, {BANDS[self.band]})"
+
+def estimate_par(stacks, total_plates, budget=PAR_SECONDS, stop=None):
+    # (par, proven shortest): exact search up to EXACT_PLATES, the heuristic solver's first line past it or
+    # if the exact search takes half the budget. (None, False) once `budget` seconds have passed or stop()
+    # turns true with no line found; budget None lets the exact search take as long as it needs.
+    started = time.perf_counter()
+    if total_plates <= EXACT_PLATES:
+        par = solve(stacks, total_plates, deadline=None if budget is None else started + budget / 2, stop=stop).par
+        if par is not None:
+            return par, True
+
+    def give_up():
+        return (stop is not None and stop()) or (budget is not None and time.perf_counter() > started + budget)
+
+    estimate = solve_heuristic(stacks, total_plates, stop=give_up)
+    return estimate.par, estimate.gap == 0
+
+def rate(level, seed, stack_count=None):
+    # Deals a seed and works out its par and difficulty (band is set once the whole level is rated)
+    state = deal_level(level, seed, stack_count)
+    par, exact = estimate_par(state.stacks, state.total_plates, budget=None)
+    return CatalogLevel(level, seed, state.stacks, par, exact, lower_bound(state.stacks), par - state.min_to_go)
+
+def assign_bands(entries):
+    ranked = sorted(entries, key=lambda entry: (entry.par, entry.detours, entry.seed))
+    for rank, entry in enumerate(ranked):
+        entry.band = rank * len(BANDS) // len(ranked)
+
+class LevelCatalog:
+    _open = {} # path -> loaded catalog, shared by everyone who asks for the same file
+
+    def __init__(self, entries):
+        self.entries = entries
+        # (level, stack count) -> its entries; built once at load
+        self.index = {}
+        for entry in entries:
+            self.index.setdefault((entry.level, len(entry.stacks)), []).append(entry)
+
+    @classmethod
+    def load(cls, path=LEVEL_CATALOG_PATH):
+        # The catalog at `path`, or None if it has not been built
+        if path in cls._open:
+            return cls._open[path]
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != VERSION:
+            return None
+        entries = [CatalogLevel(int(level), item["seed"], item["stacks"], item["par"], item["exact"],
+                                item["lower"], item["detours"], item["band"])
+                   for level, items in data["levels"].items() for item in items]
+        catalog = cls._open[path] = cls(entries)
+        return catalog
+
+    def pick(self, level, stack_count, rng=random):
+        # A random seed of the level, or None if the catalog has none for it
+        choices = self.index.get((level, stack_count))
+        return rng.choice(choices) if choices else None
+
+    def save(self, path=LEVEL_CATALOG_PATH):
+        levels = {}
+        for entry in sorted(self.entries, key=lambda entry: (entry.level, entry.seed)):
+            levels.setdefault(str(entry.level), []).append(entry.to_json())
+        with open(path + ".tmp", "w") as f:
+            json.dump({"version": VERSION, "levels": levels}, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+def build(levels, seeds, path=LEVEL_CATALOG_PATH):
+    entries = []
+    for level in levels:
+        rated = [rate(level, level_seed(level, index)) for index in range(seeds)]
+        assign_bands(rated)
+        entries.extend(rated)
+    catalog = LevelCatalog(entries)
+    catalog.save(path)
+    LevelCatalog._open[path] = catalog
+    return catalog
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the catalog of seeded Stacking Plates levels")
+    parser.add_argument("--levels", type=int, default=CATALOG_LEVELS, help=f"levels 1..N (default {CATALOG_LEVELS})")
+    parser.add_argument("--seeds", type=int, default=SEEDS_PER_LEVEL, help=f"seeds per level (default {SEEDS_PER_LEVEL})")
+    parser.add_argument("--path", default=LEVEL_CATALOG_PATH)
+    parser.add_argument("--show", action="store_true", help="describe the existing catalog instead of building one")
+    args = parser.parse_args()
+
+    if args.show:
+        catalog = LevelCatalog.load(args.path)
+        if catalog is None:
+            raise SystemExit(f"No catalog at {args.path}")
+    else:
+        started = time.perf_counter()
+        catalog = build(range(args.levels), args.seeds, args.path)
+        print(f"{len(catalog.entries)} levels in {time.perf_counter() - started:.1f}s -> {args.path}")
+    for (level, stack_count), entries in sorted(catalog.index.items()):
+        total_plates = sum(map(len, entries[0].stacks))
+        bands = [[entry for entry in entries if entry.band == i] for i in range(len(BANDS))]
+        counts = ", ".join(f"{name} {len(bands[i])} (par {min(e.par for e in bands[i])}-{max(e.par for e in bands[i])})"
+                           for i, name in enumerate(BANDS) if bands[i])
+        print(f"Level {level + 1} ({total_plates} plates, {stack_count} stacks): {counts}")
+
+if __name__ == "__main__":
+    main()
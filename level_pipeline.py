@@ -0,0 +1,156 @@
+import threading
+import traceback
+
+# --- Level Pipeline ---
+# Gets the next level ready on a worker thread while the current one is played:
+# the deal, its par and the plate sprites, everything init_game() would otherwise
+# do between the click on "Next Level" and the first frame. The front-end passes
+# its own prepare(level, stop) and asks for the levels it expects next; take() hands
+# over a finished one without waiting, or None if it is not ready (or was never
+# asked for), in which case the front-end prepares it itself as before.
+#
+# At most `depth` levels are queued or kept ready. Asking for other levels drops
+# the ones no longer wanted, and cancel() (going home) drops everything. stop()
+# turns true as soon as the level being prepared is no longer wanted, so its par
+# search ends there, and whatever the worker still makes of it is thrown away.
+
+PREFETCH_DEPTH = 1
+
+class PreparedLevel:
+    __slots__ = ("level", "resolution", "total_plates", "stack_count", "game", "seed", "par", "tablebase",
+                 "plate_height", "stack_width", "atlas")
+
+    def __init__(self, level, resolution, total_plates, stack_count, game, seed, par, tablebase,
+                 plate_height, stack_width, atlas):
+        self.level = level
+        self.resolution = resolution # (WIDTH, HEIGHT) the sizes and sprites were made for
+        self.total_plates = total_plates
+        self.stack_count = stack_count
+        self.game = game
+        self.seed = seed
+        self.par = par # None if the front-end is left to solve it (ParSolver)
+        self.tablebase = tablebase
+        self.plate_height = plate_height
+        self.stack_width = stack_width
+        self.atlas = atlas
+
+class LevelPipeline:
+    def __init__(self, prepare, depth=PREFETCH_DEPTH):
+        self.prepare = prepare # (level (whatever the front-end uses to name one), stop) -> PreparedLevel; runs on the worker thread
+        self.depth = depth
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.wanted = [] # Levels still to prepare, next first
+        self.ready = {} # level -> PreparedLevel
+        self.worker = None # Started on the first prefetch
+        self.hits = self.misses = 0
+
+    def prefetch(self, levels):
+        # Prepare these levels next (at most `depth` of them); anything else queued or ready is dropped
+        with self.lock:
+            levels = list(levels)[:self.depth]
+            self.ready = {level: prepared for level, prepared in self.ready.items() if level in levels}
+            self.wanted = [level for level in levels if level not in self.ready]
+            if self.wanted and self.worker is None:
+                self.worker = threading.Thread(target=self._work, name="level-prefetch", daemon=True)
+                self.worker.start()
+            self.wake.notify()
+
+    def take(self, level):
+        # The prepared level, or None if it is not ready; never waits for the worker
+        with self.lock:
+            prepared = self.ready.pop(level, None)
+            if level in self.wanted:
+                self.wanted.remove(level) # Being prepared right now; the front-end does it itself instead
+            if prepared is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return prepared
+
+    def cancel(self):
+        with self.lock:
+            self.wanted = []
+            self.ready = {}
+
+    def _work(self):
+        while True:
+            with self.lock:
+                while not self.wanted:
+                    self.wake.wait()
+                level = self.wanted[0]
+            try:
+                prepared = self.prepare(level, lambda: self.wanted[:1] != [level])
+            except Exception:
+                traceback.print_exc() # The front-end will prepare the level itself when it gets there
+                prepared = None
+            with self.lock:
+                if self.wanted and self.wanted[0] == level:
+                    self.wanted.pop(0)
+                    if prepared is not None:
+                        self.ready[level] = prepared
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "ready": list(self.ready), "wanted": list(self.wanted)}
+
+# --- Par Solver ---
+# A level that neither the catalog nor the prefetch gave a par still needs one for
+# the win screen, and solving it can take seconds on the big levels. The front-end
+# starts the solve here when the level starts; the worker runs one at a time, a
+# newer start() or known() stops the older solve (its stop() turns true) and drops
+# its result, and on_done (called on the worker thread) tells the front-end to
+# redraw. result() never waits: until the solve is done the win screen shows a
+# placeholder instead.
+
+class ParSolver:
+    def __init__(self, on_done=None):
+        self.on_done = on_done
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.generation = 0 # Bumped by start() and known(); a result from an older one is dropped
+        self.job = None # (generation, solve) waiting for the worker
+        self.done = True
+        self.par = None
+        self.worker = None # Started on the first start()
+
+    def known(self, par):
+        # The level came with its par, so nothing is solved
+        with self.lock:
+            self.generation += 1
+            self.job = None
+            self.done, self.par = True, par
+
+    def start(self, solve):
+        # solve(stop) -> par (or None if none was found or stop() turned true); runs on the worker thread
+        with self.lock:
+            self.generation += 1
+            self.job = (self.generation, solve)
+            self.done, self.par = False, None
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._work, name="par-solver", daemon=True)
+                self.worker.start()
+            self.wake.notify()
+
+    def result(self):
+        # (done, par); par is None while solving or when no line was found
+        with self.lock:
+            return self.done, self.par
+
+    def _work(self):
+        while True:
+            with self.lock:
+                while self.job is None:
+                    self.wake.wait()
+                generation, solve = self.job
+                self.job = None
+            try:
+                par = solve(lambda: self.generation != generation)
+            except Exception:
+                traceback.print_exc()
+                par = None
+            with self.lock:
+                if generation != self.generation:
+                    continue
+                self.done, self.par = True, par
+            if self.on_done:
+                self.on_done()
@@ -0,0 +1,213 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from engine import GameState, level_size
+from solver import Solution, check_solution, lower_bound, replay, solve
+from state_codec import StateCodec, deep_size
+
+# --- Parallel Solver ---
+# Breadth-first iterative deepening spread over worker processes, for levels too
+# big for one core. Every position belongs to the worker its Zobrist hash points
+# at; that worker alone remembers it (and its parent) and expands it. Each round
+# expands one layer: every worker sends the children it generates straight to
+# their owners' inboxes, one batch per owner, and the owners drop the ones they
+# have already seen. The coordinating process only passes small commands and
+# counts around. Children whose moves so far plus lower_bound()
+# exceed the current bound are cut; if a bound runs dry it is raised to the
+# smallest cut value and the search starts over. The first layer that holds the
+# win is the par, the same one solver.solve() finds.
+#
+#   python parallel_solver.py --level 4 --seed 7 --workers 8
+#   python parallel_solver.py --plates 16 --stacks 6 --seed 3 --workers 16 --check
+
+def expand(frontier, depth, bound, codec, stack_count, workers, home_runs):
+    # Children of a layer, bucketed by owner, plus the smallest f that was cut
+    shifts = codec.shifts
+    keys = codec.zobrist_keys
+    buckets = [[] for _ in range(workers)]
+    next_bound = None
+    generated = 0
+    for packed, zobrist in frontier:
+        position = [tuple(stack) for stack in codec.decode(packed, stack_count)]
+        for f, src in enumerate(position):
+            if not src or src == home_runs[len(src)]:
+                continue
+            top = src[-1]
+            below = src[-2] if len(src) > 1 else 0
+            lifted = packed ^ (below << shifts[top])
+            lifted_zobrist = zobrist ^ keys[top][below]
+            tried_empty = len(src) == 1 # Same pruning as solver.solve()
+            for t, dst in enumerate(position):
+                if t == f:
+                    continue
+                if dst:
+                    if top < dst[-1]:
+                        continue
+                elif tried_empty:
+                    continue
+                else:
+                    tried_empty = True
+                child = list(position)
+                child[f] = src[:-1]
+                child[t] = dst + (top,)
+                cost = depth + 1 + lower_bound(child)
+                if cost > bound:
+                    if next_bound is None or cost < next_bound:
+                        next_bound = cost
+                    continue
+                onto = dst[-1] if dst else 0
+                child_zobrist = lifted_zobrist ^ keys[top][onto]
+                buckets[child_zobrist % workers].append((lifted ^ (onto << shifts[top]), child_zobrist, packed, zobrist))
+                generated += 1
+    return buckets, next_bound, generated
+
+def worker_main(conn, inboxes, index, total_plates, stack_count):
+    # Runs in each worker process; answers the coordinator's commands until "stop"
+    workers = len(inboxes)
+    codec = StateCodec.for_plates(total_plates)
+    home_runs = [tuple(range(1, i + 1)) for i in range(total_plates + 1)]
+    goal = codec.encode([range(1, total_plates + 1)])
+    seen = {} # packed code -> (parent code, parent zobrist) of every position this worker owns
+    frontier = []
+    while True:
+        command, arg = conn.recv()
+        if command == "reset":
+            seen = {}
+            frontier = []
+            conn.send(None)
+        elif command == "add":
+            # Keep the children not seen before as the next layer: the given ones, or one batch from every worker
+            batches = [arg] if arg is not None else [inboxes[index].get() for _ in range(workers)]
+            frontier = []
+            found = False
+            for batch in batches:
+                for packed, zobrist, parent, parent_zobrist in batch:
+                    if packed in seen:
+                        continue
+                    seen[packed] = (parent, parent_zobrist)
+                    frontier.append((packed, zobrist))
+                    found = found or packed == goal
+            conn.send((len(frontier), found))
+        elif command == "expand":
+            depth, bound = arg
+            buckets, cut, generated = expand(frontier, depth, bound, codec, stack_count, workers, home_runs)
+            for inbox, bucket in zip(inboxes, buckets):
+                inbox.put(bucket)
+            conn.send((cut, generated, len(frontier)))
+        elif command == "parent":
+            conn.send(seen[arg])
+        elif command == "size":
+            conn.send(sys.getsizeof(seen) + sum(deep_size(key) + sys.getsizeof(entry) for key, entry in seen.items()))
+        elif command == "stop":
+            conn.close()
+            return
+
+class WorkerPool:
+    def __init__(self, workers, total_plates, stack_count):
+        self.workers = workers
+        self.conns = []
+        self.processes = []
+        inboxes = [multiprocessing.Queue() for _ in range(workers)]
+        for index in range(workers):
+            parent_end, child_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=worker_main, args=(child_end, inboxes, index, total_plates, stack_count), daemon=True)
+            process.start()
+            self.conns.append(parent_end)
+            self.processes.append(process)
+
+    def ask_all(self, command, args):
+        # Send one command to every worker (args[i] to worker i), then collect the replies in order
+        for conn, arg in zip(self.conns, args):
+            conn.send((command, arg))
+        return [conn.recv() for conn in self.conns]
+
+    def ask(self, worker, command, arg=None):
+        self.conns[worker].send((command, arg))
+        return self.conns[worker].recv()
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(("stop", None))
+        for process in self.processes:
+            process.join()
+
+def solve_parallel(stacks, total_plates=None, workers=None):
+    # Same par as solver.solve(); the move line is a shortest one, not necessarily the same one
+    started = time.perf_counter()
+    start = tuple(map(tuple, stacks))
+    if total_plates is None:
+        total_plates = sum(map(len, start))
+    workers = workers or os.cpu_count() or 1
+    codec = StateCodec.for_plates(total_plates)
+    start_code, start_zobrist = codec.encode(start), codec.zobrist(start)
+    goal = codec.encode([range(1, total_plates + 1)])
+
+    pool = WorkerPool(workers, total_plates, len(start))
+    expanded = generated = 0
+    try:
+        bound = lower_bound(start)
+        while bound is not None:
+            pool.ask_all("reset", [None] * workers)
+            incoming = [[] for _ in range(workers)] # Only the first layer comes from here, the rest through the inboxes
+            incoming[start_zobrist % workers].append((start_code, start_zobrist, None, None))
+            depth = 0
+            next_bound = None
+            while True:
+                replies = pool.ask_all("add", incoming)
+                if any(found for _, found in replies):
+                    keys = [goal]
+                    owner = codec.zobrist([range(1, total_plates + 1)]) % workers
+                    while keys[-1] != start_code:
+                        parent, parent_zobrist = pool.ask(owner, "parent", keys[-1])
+                        keys.append(parent)
+                        owner = parent_zobrist % workers
+                    keys.reverse()
+                    seconds = time.perf_counter() - started
+                    table_bytes = sum(pool.ask_all("size", [None] * workers))
+                    return Solution(replay(start, keys[1:]), expanded, generated, table_bytes, seconds)
+                if not any(count for count, _ in replies):
+                    break # This bound has no win; try the smallest cut one
+                incoming = [None] * workers
+                for cut, made, layer in pool.ask_all("expand", [(depth, bound)] * workers):
+                    if cut is not None and (next_bound is None or cut < next_bound):
+                        next_bound = cut
+                    generated += made
+                    expanded += layer
+                depth += 1
+            bound = next_bound
+        return Solution(None, expanded, generated, sum(pool.ask_all("size", [None] * workers)), time.perf_counter() - started)
+    finally:
+        pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Par of large Stacking Plates levels on several cores")
+    parser.add_argument("--level", type=int, default=None, help="0-based level to deal")
+    parser.add_argument("--plates", type=int, default=None, help="custom level: plate count")
+    parser.add_argument("--stacks", type=int, default=None, help="custom level: stack count")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--check", action="store_true", help="also run the single-core solver and compare")
+    args = parser.parse_args()
+
+    if args.plates:
+        total_plates, stack_count = args.plates, args.stacks or level_size(0)[1]
+    else:
+        total_plates, stack_count = level_size(args.level or 0)
+    stacks = GameState.deal(total_plates, stack_count, random.Random(args.seed)).stacks
+    print(f"Layout:   {stacks}")
+    solution = solve_parallel(stacks, total_plates, args.workers)
+    print(f"Parallel: {solution}")
+    if solution.moves is not None:
+        print(f"Solution: {' '.join(f'{f + 1}>{t + 1}' for f, t in solution.moves)}")
+        print(f"Replays:  {check_solution(stacks, solution.moves)}")
+    if args.check:
+        single = solve(stacks, total_plates)
+        print(f"Single:   {single}")
+        print(f"Same par: {single.par == solution.par}")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,46 @@
 import pygame
-import random
 import sys
 import time
 import os
+import random
+
+from dirty_rects import DirtyRectRenderer
+from engine import BASE_STACKS, GameState, level_size, level_time
+from frame_profiler import FrameProfiler
+from frame_scheduler import IdleScheduler
+from hint_cache import HintCache
+from hints import HintEngine
+from leaderboard import CAMPAIGN, ENDLESS, deal_label, level_label, load_results, record_result, save_results
+from level_catalog import SEEDS_PER_LEVEL, LevelCatalog, deal_number, estimate_par, level_seed
+from level_pipeline import LevelPipeline, ParSolver, PreparedLevel
+from endless import EndlessLevel, endless_levels
+from render_cache import GradientCache, PlateAtlas, TextCache
+from board_view import BOARD_KEYS, BoardView
+from tablebase import Tablebase
+from widgets import RetainedSurface, compose_labels, compose_panel
+
+# STACKING_PLATES_HEADLESS=1 draws through SDL's dummy video driver: no window, no sound (benchmarks, CI)
+HEADLESS = os.environ.get("STACKING_PLATES_HEADLESS") == "1"
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
 
 pygame.init()
-pygame.mixer.init()
 
 # --- Constants ---
 infoObject = pygame.display.Info()
-WIDTH, HEIGHT = infoObject.current_w, infoObject.current_h
-
-# Dynamic scaling factor based on screen height for overall neatness
-SCALE_FACTOR = HEIGHT / 900 # Base this on a comfortable reference height (e.g., 900p)
+# STACKING_PLATES_WINDOWED=1 runs in a resizable window instead of fullscreen
+WINDOWED = os.environ.get("STACKING_PLATES_WINDOWED") == "1"
+if HEADLESS:
+    # STACKING_PLATES_SIZE=WxH picks the off-screen resolution
+    WIDTH, HEIGHT = map(int, os.environ.get("STACKING_PLATES_SIZE", "1920x1080").split("x"))
+    DISPLAY_FLAGS = 0
+elif WINDOWED:
+    WIDTH, HEIGHT = int(infoObject.current_w * 0.75), int(infoObject.current_h * 0.75)
+    DISPLAY_FLAGS = pygame.RESIZABLE
+else:
+    WIDTH, HEIGHT = infoObject.current_w, infoObject.current_h
+    DISPLAY_FLAGS = pygame.FULLSCREEN
 
 WHITE = (255,255,255)
 BLACK = (0,0,0)
@@ -21,43 +49,41 @@ BLUE = (70,130,255)
 YELLOW = (255,215,0)
 GREEN = (0,200,0)
 RED = (255,0,0)
+ORANGE = (255,140,0)
+PURPLE = (150,60,220)
 
-# Adjust font sizes using the scaling factor
-FONT = pygame.font.SysFont("Segoe UI Emoji", int(28 * SCALE_FACTOR))
-BIG_FONT = pygame.font.SysFont("Segoe UI Emoji", int(50 * SCALE_FACTOR))
-SMALL_FONT = pygame.font.SysFont("Segoe UI Emoji", int(20 * SCALE_FACTOR))
-# New, larger font for win/timeout messages
-HUGE_FONT = pygame.font.SysFont("Segoe UI Emoji", int(70 * SCALE_FACTOR)) # Increased font size
+text_cache = TextCache() # Shared by every text render below
 
-screen = pygame.display.set_mode((WIDTH,HEIGHT), pygame.FULLSCREEN)
-pygame.display.set_caption("Stacking Plates Game")
-clock = pygame.time.Clock()
+screen = None # Created by open_display()
+scheduler = IdleScheduler(fps=30) # Sleeps between events instead of redrawing at a fixed 30 FPS
+# F3 toggles the frame-time HUD; STACKING_PLATES_PROFILE_LOG=frames.csv (or .jsonl) logs every frame to disk
+profiler = FrameProfiler(log_path=os.environ.get("STACKING_PLATES_PROFILE_LOG"))
 
 # --- Game States ---
 current_screen = "start_screen" # Changed initial screen
 selected_level = 0
-start_time = elapsed_time = score = 0
+start_time = elapsed_time = 0
+game = GameState([], 0) # The level being played, replaced by init_game()
+dealt_layout = () # The level's starting position, for working out its par
+dealt_seed = 0 # Seed the level was dealt from; the same seed is the same layout for every player
+catalog = LevelCatalog.load() # Seeds per level with their par, if levels.json has been built (python level_catalog.py)
+# Fewest moves that win dealt_layout; solved on a worker thread when the level came without it
+par_solver = ParSolver(on_done=lambda: pygame.event.post(pygame.event.Event(pygame.USEREVENT)))
+tablebase = None # Moves-to-win table of the level's size, if one has been built (python tablebase.py)
+last_move_cost = None # Moves the last move or undo added to the shortest win, from the tablebase
+# Hints are kept in hints.sqlite, shared with the other front-ends; the event wakes the idle loop to draw a new one
+hints = HintEngine(on_update=lambda: pygame.event.post(pygame.event.Event(pygame.USEREVENT)), store=HintCache())
 max_time_per_level = 300
 
-# Base CONTENT_RECT - this will be modified for specific screens if needed
-base_content_rect_padding_x = WIDTH * 0.05
-base_content_rect_padding_y = HEIGHT * 0.08
-BASE_CONTENT_RECT = pygame.Rect(base_content_rect_padding_x, base_content_rect_padding_y,
-                                 WIDTH - (2 * base_content_rect_padding_x), HEIGHT - (2 * base_content_rect_padding_y))
-
 STACK_COUNT = 3
 PLATE_HEIGHT, STACK_WIDTH = 0, 0 # Initialized to 0, set in init_game()
+board_view = None # Scrolling, zoom and culling of the loaded level's board, made in init_game()
+plate_atlas = None
 
-move_history = []
 paused = False
 pause_start_time = 0
 
 # --- Name Prompt Input State ---
-input_box_width = int(WIDTH * 0.3)
-input_box_height = int(55 * SCALE_FACTOR)
-name_input_box = pygame.Rect(BASE_CONTENT_RECT.centerx - input_box_width // 2,
-                             BASE_CONTENT_RECT.centery - input_box_height // 2,
-                             input_box_width, input_box_height)
 input_active = True
 input_text = ""
 input_error = ""
@@ -67,33 +93,31 @@ player_name = ""
 leaderboard_data = []
 
 # --- Audio ---
-try:
-    pygame.mixer.music.load('background.mp3')
-    pygame.mixer.music.set_volume(0.3)
-    pygame.mixer.music.play(-1)
-    sound_move = pygame.mixer.Sound('move.wav'); sound_move.set_volume(0.5)
-    sound_win = pygame.mixer.Sound('win.wav'); sound_win.set_volume(0.7)
-    sound_timeout = pygame.mixer.Sound('timeout.wav'); sound_timeout.set_volume(0.7)
-
-except pygame.error:
-    print("Warning: Audio files not found or mixer error. Game will run without sound.")
-    sound_move = sound_win = sound_timeout = None
+sound_move = sound_win = sound_timeout = None # Loaded by load_audio() when the game starts
+
+def load_audio():
+    global sound_move, sound_win, sound_timeout
+    try:
+        pygame.mixer.init()
+        pygame.mixer.music.load('background.mp3')
+        pygame.mixer.music.set_volume(0.3)
+        pygame.mixer.music.play(-1)
+        sound_move = pygame.mixer.Sound('move.wav'); sound_move.set_volume(0.5)
+        sound_win = pygame.mixer.Sound('win.wav'); sound_win.set_volume(0.7)
+        sound_timeout = pygame.mixer.Sound('timeout.wav'); sound_timeout.set_volume(0.7)
+
+    except pygame.error:
+        print("Warning: Audio files not found or mixer error. Game will run without sound.")
+        sound_move = sound_win = sound_timeout = None
 
 # --- Images ---
-try:
-    start_screen_image = pygame.image.load('Screenshot 2025-06-19 212608.png').convert_alpha()
-    start_screen_image = pygame.transform.scale(start_screen_image, (WIDTH, HEIGHT))
-except pygame.error as e:
-    print(f"Warning: Could not load start screen image: {e}. Falling back to solid color.")
-    start_screen_image = None
+start_screen_source = None # Loaded by open_display(), converting it needs a display
 
 
 # --- Level Config ---
-base_total_plates = 4
-plates_increment = 2
-base_stacks = 3
 MAX_LEVELS = 5
 completed_levels = [True] + [False]*(MAX_LEVELS-1)
+LEVEL_BUTTON_LABELS = {f"Level {i+1}" for i in range(MAX_LEVELS)} # Their numbers are drawn in draw_screens
 
 # --- Button Class ---
 class Button:
@@ -103,263 +127,518 @@ class Button:
         self.enabled = enabled
         self.border_radius = int(8 * SCALE_FACTOR)
         self.border_thickness = int(2 * SCALE_FACTOR)
+        self.retained = RetainedSurface()
 
+    @profiler.timed("draw.buttons")
     def draw(self, s):
+        # Only recomposed when the label, enabled state or size changes
+        self.retained.draw(s, self.rect.topleft, (self.text, self.enabled, self.rect.size), self.compose)
+
+    def compose(self):
         clr = BLUE if self.enabled else GRAY
-        pygame.draw.rect(s, clr, self.rect, border_radius=self.border_radius)
-        pygame.draw.rect(s, BLACK, self.rect, self.border_thickness, border_radius=self.border_radius)
+        labels = []
         # We handle text drawing for level buttons and some others outside this method for centering
         # For other buttons, draw text normally
-        if self.text not in [f"Level {i+1}" for i in range(MAX_LEVELS)]: # Exclude level buttons
-            t = FONT.render(self.text, True, BLACK)
-            s.blit(t, (self.rect.centerx - t.get_width()//2, self.rect.centery - t.get_height()//2))
+        if self.text not in LEVEL_BUTTON_LABELS: # Exclude level buttons
+            t = text_cache.render(FONT, self.text, True, BLACK)
+            labels.append((t, (self.rect.width // 2 - t.get_width()//2, self.rect.height // 2 - t.get_height()//2)))
+        return compose_panel(self.rect.size, clr, BLACK, self.border_thickness, self.border_radius, labels)
 
     def is_clicked(self, pos):
         return self.enabled and self.rect.collidepoint(pos)
 
-# --- Buttons (initialization based on BASE_CONTENT_RECT, will adjust for home screen later) ---
-# Button dimensions and spacing scaled for home screen
-# These will be dynamically adjusted within draw_screens for the home menu
-button_width_main = int(BASE_CONTENT_RECT.width * 0.35)
-button_height_main = int(60 * SCALE_FACTOR)
-button_spacing_main = int(25 * SCALE_FACTOR)
-
-home_buttons = [] # Will be populated dynamically in draw_screens for precise positioning
-
-level_button_width = int(180 * SCALE_FACTOR)
-level_button_height = int(60 * SCALE_FACTOR)
-level_button_x_spacing = int(20 * SCALE_FACTOR)
-level_button_y_spacing = int(20 * SCALE_FACTOR)
-
-level_buttons = [] # Will be populated dynamically in draw_screens for precise positioning
-
-# Back button (top-left)
-back_button = Button((int(WIDTH * 0.02), int(HEIGHT * 0.02), int(140 * SCALE_FACTOR), int(40 * SCALE_FACTOR)), "← Back")
-
-# Win/Timeout screen buttons (bottom of CONTENT_RECT)
-win_timeout_btn_width = int(180 * SCALE_FACTOR)
-win_timeout_btn_height = int(50 * SCALE_FACTOR)
-win_timeout_btn_spacing = int(40 * SCALE_FACTOR)
-
-win_back_button = Button((BASE_CONTENT_RECT.centerx - win_timeout_btn_width - win_timeout_btn_spacing // 2,
-                          BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
-                          win_timeout_btn_width, win_timeout_btn_height), "Back to Home")
-win_next_button = Button((BASE_CONTENT_RECT.centerx + win_timeout_btn_spacing // 2,
-                          BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
-                          win_timeout_btn_width, win_timeout_btn_height), "Next Level")
-
-timeout_retry_button = Button((BASE_CONTENT_RECT.centerx - win_timeout_btn_width - win_timeout_btn_spacing // 2,
-                                BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
-                                win_timeout_btn_width, win_timeout_btn_height), "Retry")
-timeout_exit_button = Button((BASE_CONTENT_RECT.centerx + win_timeout_btn_spacing // 2,
-                              BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
-                              win_timeout_btn_width, win_timeout_btn_height), "Exit")
+# --- Resolution Dependent Layout ---
+home_buttons = [] # Taken from the cached home layout in draw_screens
+level_buttons = [] # Taken from the cached levels layout in draw_screens
+layout_cache = {} # (screen, WIDTH, HEIGHT) -> (content_rect, buttons)
+
+def apply_resolution(w, h):
+    # Fonts, content rect and fixed buttons all scale with the window. Runs once at start-up
+    # and again on every window resize; nothing in here is recomputed per frame.
+    global WIDTH, HEIGHT, SCALE_FACTOR, FONT, BIG_FONT, SMALL_FONT, HUGE_FONT
+    global BASE_CONTENT_RECT, name_input_box, start_screen_image
+    global button_width_main, button_height_main, button_spacing_main
+    global level_button_width, level_button_height, level_button_x_spacing, level_button_y_spacing
+    global back_button, win_back_button, win_next_button, timeout_retry_button, timeout_exit_button
+    global clear_lb_button, pause_button, hint_button, start_game_button
+    WIDTH, HEIGHT = w, h
+
+    # Dynamic scaling factor based on screen height for overall neatness
+    SCALE_FACTOR = HEIGHT / 900 # Base this on a comfortable reference height (e.g., 900p)
+
+    # Adjust font sizes using the scaling factor
+    FONT = pygame.font.SysFont("Segoe UI Emoji", int(28 * SCALE_FACTOR))
+    BIG_FONT = pygame.font.SysFont("Segoe UI Emoji", int(50 * SCALE_FACTOR))
+    SMALL_FONT = pygame.font.SysFont("Segoe UI Emoji", int(20 * SCALE_FACTOR))
+    # New, larger font for win/timeout messages
+    HUGE_FONT = pygame.font.SysFont("Segoe UI Emoji", int(70 * SCALE_FACTOR)) # Increased font size
+    text_cache.clear() # Every cached surface was rendered with the old fonts
+
+    # Base CONTENT_RECT - this will be modified for specific screens if needed
+    base_content_rect_padding_x = WIDTH * 0.05
+    base_content_rect_padding_y = HEIGHT * 0.08
+    BASE_CONTENT_RECT = pygame.Rect(base_content_rect_padding_x, base_content_rect_padding_y,
+                                     WIDTH - (2 * base_content_rect_padding_x), HEIGHT - (2 * base_content_rect_padding_y))
+
+    input_box_width = int(WIDTH * 0.3)
+    input_box_height = int(55 * SCALE_FACTOR)
+    name_input_box = pygame.Rect(BASE_CONTENT_RECT.centerx - input_box_width // 2,
+                                 BASE_CONTENT_RECT.centery - input_box_height // 2,
+                                 input_box_width, input_box_height)
+
+    if start_screen_source:
+        start_screen_image = pygame.transform.scale(start_screen_source, (WIDTH, HEIGHT))
+    else:
+        start_screen_image = None
+
+    # Button dimensions and spacing scaled for home screen
+    button_width_main = int(BASE_CONTENT_RECT.width * 0.35)
+    button_height_main = int(60 * SCALE_FACTOR)
+    button_spacing_main = int(25 * SCALE_FACTOR)
 
-# Clear Leaderboard button
-clear_lb_button = Button((BASE_CONTENT_RECT.centerx - int(240 * SCALE_FACTOR) // 2,
-                          BASE_CONTENT_RECT.bottom - int(60 * SCALE_FACTOR) - int(20 * SCALE_FACTOR),
-                          int(240 * SCALE_FACTOR), int(60 * SCALE_FACTOR)), "Clear Leaderboard")
+    level_button_width = int(180 * SCALE_FACTOR)
+    level_button_height = int(60 * SCALE_FACTOR)
+    level_button_x_spacing = int(20 * SCALE_FACTOR)
+    level_button_y_spacing = int(20 * SCALE_FACTOR)
 
-# Pause button (top-right)
-pause_button = Button((WIDTH - int(150 * SCALE_FACTOR), int(HEIGHT * 0.02),
-                        int(140 * SCALE_FACTOR), int(40 * SCALE_FACTOR)), "⏸️")
+    # Back button (top-left)
+    back_button = Button((int(WIDTH * 0.02), int(HEIGHT * 0.02), int(140 * SCALE_FACTOR), int(40 * SCALE_FACTOR)), "← Back")
 
-# --- Start Screen Button ---
-start_game_button_width = int(300 * SCALE_FACTOR)
-start_game_button_height = int(70 * SCALE_FACTOR)
-start_game_button = Button((WIDTH // 2 - start_game_button_width // 2,
-                            HEIGHT - int(150 * SCALE_FACTOR), # Position it lower on the screen
-                            start_game_button_width, start_game_button_height), "Start Game")
+    # Win/Timeout screen buttons (bottom of CONTENT_RECT)
+    win_timeout_btn_width = int(180 * SCALE_FACTOR)
+    win_timeout_btn_height = int(50 * SCALE_FACTOR)
+    win_timeout_btn_spacing = int(40 * SCALE_FACTOR)
 
+    win_back_button = Button((BASE_CONTENT_RECT.centerx - win_timeout_btn_width - win_timeout_btn_spacing // 2,
+                              BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
+                              win_timeout_btn_width, win_timeout_btn_height), "Back to Home")
+    win_next_button = Button((BASE_CONTENT_RECT.centerx + win_timeout_btn_spacing // 2,
+                              BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
+                              win_timeout_btn_width, win_timeout_btn_height), "Next Level")
+
+    timeout_retry_button = Button((BASE_CONTENT_RECT.centerx - win_timeout_btn_width - win_timeout_btn_spacing // 2,
+                                    BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
+                                    win_timeout_btn_width, win_timeout_btn_height), "Retry")
+    timeout_exit_button = Button((BASE_CONTENT_RECT.centerx + win_timeout_btn_spacing // 2,
+                                  BASE_CONTENT_RECT.bottom - win_timeout_btn_height - int(20 * SCALE_FACTOR),
+                                  win_timeout_btn_width, win_timeout_btn_height), "Exit")
+
+    # Clear Leaderboard button
+    clear_lb_button = Button((BASE_CONTENT_RECT.centerx - int(240 * SCALE_FACTOR) // 2,
+                              BASE_CONTENT_RECT.bottom - int(60 * SCALE_FACTOR) - int(20 * SCALE_FACTOR),
+                              int(240 * SCALE_FACTOR), int(60 * SCALE_FACTOR)), "Clear Leaderboard")
+
+    # Pause button (top-right)
+    pause_button = Button((WIDTH - int(150 * SCALE_FACTOR), int(HEIGHT * 0.02),
+                            int(140 * SCALE_FACTOR), int(40 * SCALE_FACTOR)), "⏸️")
+    # Hint button (left of the pause button)
+    hint_button = Button((WIDTH - int(300 * SCALE_FACTOR), int(HEIGHT * 0.02),
+                          int(140 * SCALE_FACTOR), int(40 * SCALE_FACTOR)), "Hint")
+
+    # --- Start Screen Button ---
+    start_game_button_width = int(300 * SCALE_FACTOR)
+    start_game_button_height = int(70 * SCALE_FACTOR)
+    start_game_button = Button((WIDTH // 2 - start_game_button_width // 2,
+                                HEIGHT - int(150 * SCALE_FACTOR), # Position it lower on the screen
+                                start_game_button_width, start_game_button_height), "Start Game")
+
+    layout_cache.clear()
+    if plate_atlas is not None: # A level is loaded, resize its plates to the new board
+        layout_level()
+
+def get_screen_layout(name):
+    # Content rect and buttons of a screen, computed once per (screen, resolution)
+    key = (name, WIDTH, HEIGHT)
+    layout = layout_cache.get(key)
+    if layout is None:
+        if name == "home":
+            layout = build_home_layout()
+        elif name == "levels":
+            layout = build_levels_layout()
+        else:
+            layout = (BASE_CONTENT_RECT, [])
+        layout_cache[key] = layout
+    return layout
+
+def build_home_layout():
+    # Make CONTENT_RECT slightly smaller for home screen
+    home_rect_padding_y = HEIGHT * 0.12 # More vertical padding
+    content_rect = pygame.Rect(BASE_CONTENT_RECT.left, home_rect_padding_y,
+                               BASE_CONTENT_RECT.width, HEIGHT - (2 * home_rect_padding_y))
+
+    button_names = ["Play", "Levels", "Endless", "Help", "Quit", "Leaderboard"]
+
+    # Calculate total required height for buttons and spacing
+    num_buttons = len(button_names)
+    # Use available height for buttons, leaving some margin at top/bottom
+    available_height_for_buttons = content_rect.height * 0.7 # Approx 70% of box height
+
+    # Calculate optimal button height and spacing to fill the space
+    # This will distribute buttons evenly
+    total_spacing_height = available_height_for_buttons * 0.2 # 20% of available height for spacing
+    button_height_calculated = (available_height_for_buttons - total_spacing_height) / num_buttons
+
+    # Ensure button height is within reasonable bounds
+    button_height_calculated = max(int(50 * SCALE_FACTOR), min(int(80 * SCALE_FACTOR), button_height_calculated))
+    button_spacing_calculated = (available_height_for_buttons - (button_height_calculated * num_buttons)) / (num_buttons - 1) if num_buttons > 1 else 0
+    button_spacing_calculated = max(int(10 * SCALE_FACTOR), button_spacing_calculated) # Min spacing
+
+    buttons = []
+    for i, text in enumerate(button_names):
+        btn_y = content_rect.top + content_rect.height * 0.15 + i * (button_height_calculated + button_spacing_calculated)
+        buttons.append(Button((content_rect.centerx - button_width_main // 2,
+                               btn_y,
+                               button_width_main, button_height_calculated), text))
+    return content_rect, buttons
+
+def build_levels_layout():
+    content_rect = BASE_CONTENT_RECT
+    # Calculate dynamic start X for level buttons to center them within CONTENT_RECT
+    total_levels_row_width = (3 * level_button_width) + (2 * level_button_x_spacing)
+    start_x_levels = content_rect.centerx - total_levels_row_width // 2
+
+    buttons = []
+    for i in range(MAX_LEVELS):
+        row = i // 3
+        col = i % 3
+        btn_x = start_x_levels + col * (level_button_width + level_button_x_spacing)
+        btn_y = content_rect.top + content_rect.height * 0.15 + row * (level_button_height + level_button_y_spacing)
+        buttons.append(Button((btn_x, btn_y, level_button_width, level_button_height),
+                              f"Level {i+1}", enabled=completed_levels[i]))
+    return content_rect, buttons
+
+def open_display():
+    # The window (an off-screen surface when headless) and everything laid out for it
+    global screen, start_screen_source
+    screen = pygame.display.set_mode((WIDTH,HEIGHT), DISPLAY_FLAGS)
+    pygame.display.set_caption("Stacking Plates Game")
+    try:
+        start_screen_source = pygame.image.load('Screenshot 2025-06-19 212608.png').convert_alpha()
+    except (pygame.error, FileNotFoundError) as e: # Missing files raise FileNotFoundError, not pygame.error
+        print(f"Warning: Could not load start screen image: {e}. Falling back to solid color.")
+        start_screen_source = None
+    apply_resolution(WIDTH, HEIGHT)
+
+# --- Backgrounds ---
+bg_colors = {
+    "start_screen": ((0, 0, 0), (0, 0, 0)), # Dark background for image
+    "home": ((10, 100, 150), (60, 180, 200)),
+    "levels": ((40, 20, 60), (130, 50, 150)),
+    "help": ((60, 60, 60), (180, 180, 180)),
+    "game": ((30, 30, 60), (80, 120, 180)),
+    "win": ((0, 70, 0), (80, 180, 80)),
+    "timeout": ((100, 0, 0), (180, 50, 50)),
+    "name_prompt": ((40, 40, 80), (100, 100, 180)),
+    "leaderboard": ((30, 30, 30), (90, 90, 90))
+}
+gradient_cache = GradientCache()
+renderer = DirtyRectRenderer()
+info_box = RetainedSurface() # Time Left / Moves / moves-to-go panel, recomposed when any of them changes
+coach_box = RetainedSurface() # Best move / moves to go, when the level has a tablebase
+leaderboard_table = RetainedSurface()
 
 # --- Utility Functions ---
+@profiler.timed("draw.text")
 def draw_text_center(txt, font, color, y):
-    t = font.render(txt, True, color)
+    t = text_cache.render(font, txt, True, color)
     screen.blit(t, (WIDTH // 2 - t.get_width() // 2, y))
 
+@profiler.timed("draw.box")
 def draw_box(rect_to_draw):
     pygame.draw.rect(screen, (230,230,250), rect_to_draw, border_radius=int(12 * SCALE_FACTOR))
     pygame.draw.rect(screen, BLACK, rect_to_draw, int(3 * SCALE_FACTOR), border_radius=int(12 * SCALE_FACTOR))
 
-def draw_gradient(s, top, bottom):
-    for y in range(HEIGHT):
-        t = y / HEIGHT
-        r = int(top[0]*(1-t)+bottom[0]*t)
-        g = int(top[1]*(1-t)+bottom[1]*t)
-        b = int(top[2]*(1-t)+bottom[2]*t)
-        pygame.draw.line(s, (r,g,b), (0,y), (WIDTH,y))
+@profiler.timed("draw.gradient")
+def draw_gradient(s, name, top, bottom):
+    s.blit(gradient_cache.get(name, top, bottom, (WIDTH, HEIGHT)), (0, 0))
 
-def init_game(level):
-    global stacks, total_plates, STACK_COUNT, plates, selected_stack
-    global start_time, elapsed_time, score, move_history, max_time_per_level, paused, pause_start_time
-    global PLATE_HEIGHT, STACK_WIDTH
-
-    total_plates = base_total_plates + plates_increment * level
-    STACK_COUNT = base_stacks + (level // 2)
+def prepare_level(level, solve_par=False, stop=None):
+    # Deal, par and plate sprites of a level: everything init_game() needs that does not depend on play.
+    # `level` is a campaign level number or an endless.EndlessLevel. Runs on the prefetch worker too,
+    # so it only reads the globals it uses; there stop() ends the par search once the level is not wanted.
+    endless = isinstance(level, EndlessLevel)
+    total_plates, STACK_COUNT = (level.total_plates, level.stack_count) if endless else level_size(level)
     
     min_plate_visual_width = int(30 * SCALE_FACTOR)
     spacing_between_poles = int(10 * SCALE_FACTOR)
     max_possible_stacks = int(BASE_CONTENT_RECT.width / (min_plate_visual_width + spacing_between_poles))
-    if STACK_COUNT > max_possible_stacks and max_possible_stacks >= base_stacks:
+    if STACK_COUNT > max_possible_stacks and max_possible_stacks >= BASE_STACKS:
         STACK_COUNT = max_possible_stacks
-    elif STACK_COUNT > max_possible_stacks and max_possible_stacks < base_stacks:
-        STACK_COUNT = base_stacks
+    elif STACK_COUNT > max_possible_stacks and max_possible_stacks < BASE_STACKS:
+        STACK_COUNT = BASE_STACKS
 
-    plates = list(range(1, total_plates + 1))
-    random.shuffle(plates)
-    stacks = [[] for _ in range(STACK_COUNT)]
-    
-    sel = 0
-    for plate in plates:
-        stacks[sel].append(plate)
-        sel = (sel + 1) % (STACK_COUNT - 1 if STACK_COUNT > 1 else STACK_COUNT)
+    picked = catalog.pick(level, STACK_COUNT) if catalog and not endless else None
+    if picked:
+        seed = picked.seed
+        state = GameState(picked.stacks, total_plates)
+    else:
+        seed = level.seed if endless else level_seed(level, random.randrange(SEEDS_PER_LEVEL))
+        state = GameState.deal(total_plates, STACK_COUNT, random.Random(seed))
+    table = Tablebase.load(total_plates, STACK_COUNT)
+    par = picked.par if picked else None # Without a catalog it is solved in the background during play ...
+    if par is None and solve_par: # ... unless there is time to spare now
+        par = table.distance(state.key()) if table else estimate_par(state.stacks, total_plates, stop=stop)[0]
+    plate_height, stack_width = level_geometry(total_plates, STACK_COUNT)
+    atlas = build_plate_atlas(total_plates, STACK_COUNT, plate_height, stack_width)
+    return PreparedLevel(level, (WIDTH, HEIGHT), total_plates, STACK_COUNT, state, seed, par, table,
+                         plate_height, stack_width, atlas)
+
+level_pipeline = LevelPipeline(lambda level, stop: prepare_level(level, solve_par=True, stop=stop)) # Gets the next level ready during play
+endless_run = None # endless_levels() of the endless run being played
+endless_level = None # EndlessLevel being played, None in the campaign
+endless_next = None # The one after it, which level_pipeline is preparing
+
+def init_game(level):
+    global game, dealt_layout, dealt_seed, tablebase, last_move_cost, total_plates, STACK_COUNT, selected_stack
+    global start_time, elapsed_time, max_time_per_level, paused, pause_start_time
+    global PLATE_HEIGHT, STACK_WIDTH, plate_atlas, board_view, endless_level, endless_next
+
+    endless_level = level if isinstance(level, EndlessLevel) else None
+    number = endless_level.level if endless_level else level
+    prepared = level_pipeline.take(level)
+    if prepared is None or prepared.resolution != (WIDTH, HEIGHT):
+        prepared = prepare_level(level)
+    total_plates, STACK_COUNT = prepared.total_plates, prepared.stack_count
+    game = prepared.game
+    dealt_seed = prepared.seed
+    dealt_layout = game.key()
+    tablebase = prepared.tablebase
+    if prepared.par is not None:
+        par_solver.known(prepared.par)
+    else: # Neither the catalog nor the prefetch had it
+        par_solver.start(lambda stop, stacks=dealt_layout, table=tablebase, plates=total_plates:
+                         table.distance(stacks) if table else estimate_par(stacks, plates, stop=stop)[0])
+    PLATE_HEIGHT, STACK_WIDTH, plate_atlas = prepared.plate_height, prepared.stack_width, prepared.atlas
+    board_view = make_board_view()
+    last_move_cost = None
+    hints.cancel()
 
     selected_stack = None
     start_time = time.time()
-    elapsed_time = score = 0
-    move_history = []
+    elapsed_time = 0
     paused = False
     pause_start_time = 0
 
-    max_time_per_level = 45 * (level + 1)
-
+    max_time_per_level = level_time(number)
+    if endless_level:
+        if endless_next is None or endless_next.level != number + 1: # Kept when the level is retried
+            endless_next = next(endless_run)
+        level_pipeline.prefetch([endless_next])
+    elif level + 1 < MAX_LEVELS:
+        level_pipeline.prefetch([level + 1])
+
+def start_endless():
+    # A new endless run from level 1; levels are dealt as they are reached, with no end
+    global endless_run, endless_next
+    endless_run = endless_levels()
+    endless_next = None
+    init_game(next(endless_run))
+
+def layout_level():
+    # Plate and pole sizes for the loaded level at the current resolution
+    global PLATE_HEIGHT, STACK_WIDTH, plate_atlas, board_view
+    PLATE_HEIGHT, STACK_WIDTH = level_geometry(total_plates, STACK_COUNT)
+    plate_atlas = build_plate_atlas(total_plates, STACK_COUNT, PLATE_HEIGHT, STACK_WIDTH)
+    board_view = make_board_view()
+
+def level_geometry(total_plates, stack_count):
+    # (plate height, pole width) for a level at the current resolution
     pole_area_height = BASE_CONTENT_RECT.height * 0.7
-    PLATE_HEIGHT = min(int(30 * SCALE_FACTOR), int(pole_area_height / (total_plates + 2)))
-    PLATE_HEIGHT = max(PLATE_HEIGHT, int(15 * SCALE_FACTOR))
-
-    width_per_stack_column = BASE_CONTENT_RECT.width / STACK_COUNT
-    STACK_WIDTH = int(width_per_stack_column * 0.6)
-    STACK_WIDTH = max(STACK_WIDTH, int(30 * SCALE_FACTOR))
-
-def is_valid_move(f, t):
-    if not (0 <= f < STACK_COUNT and 0 <= t < STACK_COUNT): return False
-    if f == t: return False
-    if not stacks[f]: return False
-    
-    return not stacks[t] or stacks[f][-1] > stacks[t][-1]
+    plate_height = min(int(30 * SCALE_FACTOR), int(pole_area_height / (total_plates + 2)))
+    plate_height = max(plate_height, int(15 * SCALE_FACTOR))
+
+    width_per_stack_column = BASE_CONTENT_RECT.width / stack_count
+    stack_width = int(width_per_stack_column * 0.6)
+    stack_width = max(stack_width, int(30 * SCALE_FACTOR))
+    return plate_height, stack_width
+
+def build_plate_atlas(total_plates, stack_count, plate_height, stack_width):
+    # Plate sizes only depend on the level layout, so they are worked out (and rendered) once here
+    width_each_column = BASE_CONTENT_RECT.width / stack_count
+    plate_widths = {}
+    for p in range(1, total_plates + 1):
+        plate_width_dynamic = int(stack_width * 0.5 + p * (stack_width * 0.4 / total_plates))
+        plate_width = min(plate_width_dynamic, int(width_each_column * 0.9))
+        plate_widths[p] = max(plate_width, int(30 * SCALE_FACTOR))
+    return PlateAtlas(plate_widths, plate_height, FONT, int(2 * SCALE_FACTOR), {False: BLUE, True: YELLOW})
 
 def move_plate(f, t):
-    global score
-    if is_valid_move(f, t):
-        plate = stacks[f].pop()
-        stacks[t].append(plate)
-        move_history.append((f, t, plate))
-        score += 1
+    global last_move_cost
+    before = moves_to_go()
+    if game.move(f, t):
+        hints.cancel()
         if sound_move: sound_move.play()
+        if before is not None:
+            last_move_cost = moves_to_go() + 1 - before
         return True
     return False
 
 def undo_move():
-    global score
-    if move_history:
-        f, t, plate = move_history.pop()
-        if stacks[t] and stacks[t][-1] == plate:
-            stacks[t].pop()
-            stacks[f].append(plate)
-            score += 1
-            if sound_move:
-                sound_move.play()
-        else:
-            print("Warning: Undo operation attempted on a mismatched plate. Game state might be inconsistent.")
-            stacks[f].append(plate)
+    global last_move_cost
+    before = moves_to_go()
+    if game.undo():
+        hints.cancel()
+        if sound_move: sound_move.play()
+        if before is not None:
+            last_move_cost = moves_to_go() + 1 - before # Undo counts as a move too
+
+def hint_colors():
+    # Pole colours for the hint on show: orange for the stack to move from, purple for the one to move to
+    hint = hints.hint
+    return {hint.move[0]: ORANGE, hint.move[1]: PURPLE} if hint else {}
+
+def hint_label():
+    return "Thinking..." if hints.searching else "No hint" if hints.gave_up else "Hint"
 
 def is_win():
-    for s in stacks:
-        if len(s) == total_plates:
-            if all(s[i] < s[i+1] for i in range(len(s)-1)):
-                return True
-    return False
+    return game.won # Kept up to date by the engine on every move and undo
 
-def get_clicked_stack(pos):
-    x, y = pos
-    # Use BASE_CONTENT_RECT for general game area, even if a modified rect is used for drawing
-    if not BASE_CONTENT_RECT.collidepoint(pos): return None
-    
-    width_each_column = BASE_CONTENT_RECT.width / STACK_COUNT
-    
-    y_base_draw = BASE_CONTENT_RECT.bottom - int(20 * SCALE_FACTOR)
-    pole_area_height = BASE_CONTENT_RECT.height * 0.7
-    pole_height_draw = max(pole_area_height, (total_plates + 2) * PLATE_HEIGHT)
-    
-    clickable_y_start = y_base_draw - pole_height_draw
-    clickable_y_end = y_base_draw + int(10 * SCALE_FACTOR)
+def moves_to_go():
+    # Fewest moves still needed to win, None if the level has no tablebase
+    return tablebase.lookup(game.packed) if tablebase else None
 
-    if not (clickable_y_start <= y <= clickable_y_end):
-        return None
+def par_label():
+    done, par = par_solver.result()
+    return par if par is not None else "unknown" if done else "..."
 
-    for i in range(STACK_COUNT):
-        column_left = BASE_CONTENT_RECT.left + i * width_each_column
-        column_right = column_left + width_each_column
-        
-        if column_left <= x < column_right:
-            return i
-    return None
+def get_clicked_stack(pos):
+    # Same columns, scroll position and zoom draw_stacks() uses: the column under pos, from the top
+    # of the pole (or the highest plate) down to just below the base
+    return board_view.stack_at(pos)
 
 def save_leaderboard():
-    with open("leaderboard.txt", "w") as f:
-        for name, level, moves, t in leaderboard_data:
-            f.write(f"{name},{level},{moves},{t}\n")
+    save_results(leaderboard_data)
 
 def load_leaderboard():
     global leaderboard_data
-    if os.path.exists("leaderboard.txt"):
-        with open("leaderboard.txt", "r") as f:
-            leaderboard_data = [line.strip().split(",") for line in f.readlines()]
-            leaderboard_data = [(n, int(lv), int(mv), int(t)) for n, lv, mv, t in leaderboard_data]
-    else:
-        leaderboard_data = []
+    leaderboard_data = load_results()
 
-def add_to_leaderboard(name, level, moves, t):
-    leaderboard_data.append((name, level, moves, t))
-    leaderboard_data.sort(key=lambda x: (x[1], x[2], x[3]))
-    leaderboard_data[:] = leaderboard_data[:8]
-    save_leaderboard()
+def make_board_view():
+    # Poles fill 70% of the board at least, with two spare plates of room above a full stack
+    return BoardView(BASE_CONTENT_RECT, STACK_COUNT, total_plates, BASE_CONTENT_RECT.width / STACK_COUNT,
+                     int(20 * SCALE_FACTOR), int(2 * SCALE_FACTOR), BASE_CONTENT_RECT.height * 0.7, 2, plate_atlas)
 
+@profiler.timed("draw.stacks")
 def draw_stacks():
-    y_base = BASE_CONTENT_RECT.bottom - int(20 * SCALE_FACTOR)
-    
-    pole_area_height = BASE_CONTENT_RECT.height * 0.7
-    pole_height = max(pole_area_height, (total_plates + 2) * PLATE_HEIGHT)
-    
-    width_each_column = BASE_CONTENT_RECT.width / STACK_COUNT
+    pole_top, pole_height = board_view.pole()
+    hinted = hint_colors()
+    clip = screen.get_clip()
+    screen.set_clip(clip.clip(board_view.rect)) # Whatever is scrolled off the board is not drawn
 
     for i in range(STACK_COUNT):
-        x_center = BASE_CONTENT_RECT.left + i * width_each_column + width_each_column // 2
+        x_center = board_view.center_x(i)
         
-        rc = GREEN if is_win() and len(stacks[i]) == total_plates else GRAY
-        pygame.draw.rect(screen, rc, (x_center - STACK_WIDTH // 2, y_base - pole_height, STACK_WIDTH, pole_height),
-                         int(5 * SCALE_FACTOR) if rc == GREEN else int(3 * SCALE_FACTOR))
+        rc = GREEN if game.won and len(game.stacks[i]) == total_plates else hinted.get(i, GRAY)
+        pygame.draw.rect(screen, rc, (x_center - STACK_WIDTH // 2, pole_top, STACK_WIDTH, pole_height),
+                         int(5 * SCALE_FACTOR) if rc != GRAY else int(3 * SCALE_FACTOR))
         
-        current_y = y_base
-        for p in reversed(stacks[i]):
-            plate_width_dynamic = int(STACK_WIDTH * 0.5 + p * (STACK_WIDTH * 0.4 / total_plates))
-            plate_width = min(plate_width_dynamic, int(width_each_column * 0.9))
-            plate_width = max(plate_width, int(30 * SCALE_FACTOR))
-            
-            rect = pygame.Rect(x_center - plate_width // 2, current_y - PLATE_HEIGHT, plate_width, PLATE_HEIGHT)
-            clr = YELLOW if i == selected_stack else BLUE
-            pygame.draw.rect(screen, clr, rect)
-            pygame.draw.rect(screen, BLACK, rect, int(2 * SCALE_FACTOR))
-            
-            t = FONT.render(str(p), True, BLACK)
-            text_rect = t.get_rect(center=rect.center)
-            screen.blit(t, text_rect)
-            current_y -= (PLATE_HEIGHT + int(2 * SCALE_FACTOR))
+        board_view.draw_stack(screen, game.stacks[i], int(x_center), i == selected_stack)
+    screen.set_clip(clip)
+
+def get_stack_column_rect(i):
+    # Screen area owned by stack i: its column, from the top of the pole down to the base
+    return board_view.column_rect(i)
+
+def get_info_box_rect(content_rect):
+    info_box_width = int(200 * SCALE_FACTOR)
+    info_box_height = int(100 * SCALE_FACTOR) # Adjusted height for 3 lines
+    info_box_x = content_rect.right - info_box_width - int(10 * SCALE_FACTOR)
+    info_box_y = content_rect.top + int(10 * SCALE_FACTOR)
+    return pygame.Rect(info_box_x, info_box_y, info_box_width, info_box_height)
+
+def get_coach_box_rect(content_rect):
+    # Under the info box, wider so the advice fits
+    info_rect = get_info_box_rect(content_rect)
+    width = int(300 * SCALE_FACTOR)
+    return pygame.Rect(info_rect.right - width, info_rect.bottom + int(8 * SCALE_FACTOR), width, int(70 * SCALE_FACTOR))
+
+def seconds_until_next_change():
+    # The countdown is the only thing that changes without input; every other screen can sleep until an event
+    if current_screen == "game" and not paused:
+        return 1 - (time.time() - start_time) % 1
+    return None
+
+def track_dirty_regions():
+    # Anything that changes the whole picture is part of the scene key and forces a full repaint
+    renderer.begin_frame((current_screen, paused, board_view.state() if current_screen == "game" else None))
+    if current_screen == "name_prompt":
+        renderer.track("name_input", BASE_CONTENT_RECT, (input_text, input_error))
+    elif current_screen == "levels":
+        renderer.track("level_grid", BASE_CONTENT_RECT, tuple(completed_levels))
+    elif current_screen == "win":
+        renderer.track("par", BASE_CONTENT_RECT, par_label()) # Redrawn when a background solve finishes
+    elif current_screen == "leaderboard":
+        renderer.track("leaderboard", BASE_CONTENT_RECT, tuple(leaderboard_data))
+    elif current_screen == "game":
+        win = is_win()
+        hinted = hint_colors()
+        for i in range(STACK_COUNT):
+            renderer.track(("stack", i), get_stack_column_rect(i), (tuple(game.stacks[i]), i == selected_stack, win, hinted.get(i)))
+        renderer.track("hint_button", hint_button.rect, hint_label())
+        info_rect = get_info_box_rect(BASE_CONTENT_RECT)
+        renderer.track("time_left", info_rect, max(0, max_time_per_level - elapsed_time))
+        renderer.track("moves", info_rect, (game.moves, game.min_to_go))
+        if tablebase:
+            renderer.track("coach", get_coach_box_rect(BASE_CONTENT_RECT), coach_lines())
+    renderer.track("profiler_hud", *profiler.hud_region((WIDTH, HEIGHT)))
+
+def compose_info_box(size, tleft):
+    text_padding_x = int(10 * SCALE_FACTOR)
+    text_line_height = SMALL_FONT.get_height() + int(2 * SCALE_FACTOR)
+    labels = [(text_cache.render(SMALL_FONT, f"Time Left: {tleft}s", True, BLACK), (text_padding_x, text_line_height * 0.5)),
+              (text_cache.render(SMALL_FONT, f"Moves: {game.moves}", True, BLACK), (text_padding_x, text_line_height * 1.5)),
+              (text_cache.render(SMALL_FONT, f"At least {game.min_to_go} to go", True, BLACK), (text_padding_x, text_line_height * 2.5))]
+    return compose_panel(size, (255, 255, 200), BLACK, int(2 * SCALE_FACTOR), int(6 * SCALE_FACTOR), labels)
+
+def coach_lines():
+    # Tablebase advice for the current position, as the coach panel shows it
+    best, togo = tablebase.advice(game)
+    first = f"Best: {best[0] + 1} → {best[1] + 1} | {togo} to go" if best else "Solved!"
+    if last_move_cost is None:
+        return first, ""
+    return first, "Perfect move!" if last_move_cost == 0 else f"That move cost you {last_move_cost}"
+
+def compose_coach_box(size, lines):
+    text_padding_x = int(10 * SCALE_FACTOR)
+    text_line_height = SMALL_FONT.get_height() + int(2 * SCALE_FACTOR)
+    labels = [(text_cache.render(SMALL_FONT, line, True, BLACK), (text_padding_x, text_line_height * (0.5 + i)))
+              for i, line in enumerate(lines) if line]
+    return compose_panel(size, (220, 240, 255), BLACK, int(2 * SCALE_FACTOR), int(6 * SCALE_FACTOR), labels)
+
+def compose_leaderboard_table(content_rect):
+    # Header and rows as one surface; positions are worked out on screen and made relative to content_rect
+    labels = []
+    headers = ["Name", "Level", "Deal", "Moves", "Time"]
+    header_y = content_rect.top + content_rect.height * 0.15
+    row_start_y = content_rect.top + content_rect.height * 0.22
+
+    col_widths = [0.25, 0.15, 0.15, 0.15, 0.15]
+
+    current_x_offset = content_rect.left + content_rect.width * 0.05
+
+    for i, h in enumerate(headers):
+        labels.append((text_cache.render(FONT, h, True, BLACK), (int(current_x_offset) - content_rect.left, int(header_y) - content_rect.top)))
+        if i < len(col_widths):
+            current_x_offset += content_rect.width * col_widths[i]
+        else:
+            current_x_offset += content_rect.width * (0.75 / len(headers))
+
+    current_x_offset_data_row = content_rect.left + content_rect.width * 0.05
+
+    for i, (n, mode, lv, deal, mv, t) in enumerate(leaderboard_data[:10]):
+        temp_x_offset = current_x_offset_data_row
+        for j, val in enumerate([n, level_label(mode, lv), deal_label(deal), str(mv), str(t)]):
+            row_y = row_start_y + i * (SMALL_FONT.get_height() + int(5 * SCALE_FACTOR))
+            labels.append((text_cache.render(SMALL_FONT, val, True, RED), (int(temp_x_offset) - content_rect.left, int(row_y) - content_rect.top)))
+            if j < len(col_widths):
+                temp_x_offset += content_rect.width * col_widths[j]
+            else:
+                temp_x_offset += content_rect.width * (0.75 / len(headers))
+    return compose_labels(labels)
 
 def draw_screens():
     global elapsed_time, current_screen, home_buttons, level_buttons
-    bg_colors = {
-        "start_screen": ((0, 0, 0), (0, 0, 0)), # Dark background for image
-        "home": ((10, 100, 150), (60, 180, 200)),
-        "levels": ((40, 20, 60), (130, 50, 150)),
-        "help": ((60, 60, 60), (180, 180, 180)),
-        "game": ((30, 30, 60), (80, 120, 180)),
-        "win": ((0, 70, 0), (80, 180, 80)),
-        "timeout": ((100, 0, 0), (180, 50, 50)),
-        "name_prompt": ((40, 40, 80), (100, 100, 180)),
-        "leaderboard": ((30, 30, 30), (90, 90, 90))
-    }
-    draw_gradient(screen, *bg_colors[current_screen])
+    draw_gradient(screen, current_screen, *bg_colors[current_screen])
 
     if current_screen == "start_screen":
         if start_screen_image:
@@ -370,14 +649,8 @@ def draw_screens():
         start_game_button.draw(screen) # Draw the "Start Game" button
 
     else: # All other screens, draw the content box
-        # Determine which CONTENT_RECT to use based on the current screen
-        if current_screen == "home":
-            # Make CONTENT_RECT slightly smaller for home screen
-            home_rect_padding_y = HEIGHT * 0.12 # More vertical padding
-            current_content_rect = pygame.Rect(BASE_CONTENT_RECT.left, home_rect_padding_y,
-                                                BASE_CONTENT_RECT.width, HEIGHT - (2 * home_rect_padding_y))
-        else:
-            current_content_rect = BASE_CONTENT_RECT
+        # Content rect (smaller on the home screen) and buttons come from the per-resolution layout cache
+        current_content_rect, screen_buttons = get_screen_layout(current_screen)
         
         draw_box(current_content_rect) # Draw the box using the determined rect
 
@@ -388,71 +661,34 @@ def draw_screens():
             name_input_box.centery = BASE_CONTENT_RECT.centery - int(40 * SCALE_FACTOR) # Adjust for title
             pygame.draw.rect(screen, WHITE, name_input_box, 0, border_radius=int(10 * SCALE_FACTOR))
             pygame.draw.rect(screen, BLACK, name_input_box, int(2 * SCALE_FACTOR), border_radius=int(10 * SCALE_FACTOR))
-            name_surface = FONT.render(input_text, True, BLACK)
+            name_surface = text_cache.render(FONT, input_text, True, BLACK)
             screen.blit(name_surface, (name_input_box.x + int(10 * SCALE_FACTOR),
                                         name_input_box.y + name_input_box.height // 2 - name_surface.get_height() // 2))
             if input_error:
-                err_surface = SMALL_FONT.render(input_error, True, RED)
+                err_surface = text_cache.render(SMALL_FONT, input_error, True, RED)
                 screen.blit(err_surface, (current_content_rect.centerx - err_surface.get_width()//2, name_input_box.bottom + int(10 * SCALE_FACTOR)))
             draw_text_center("Press Enter (alphabets only, min 2 chars) to Continue", SMALL_FONT, BLACK, current_content_rect.bottom - current_content_rect.height * 0.1)
 
         elif current_screen == "home":
             draw_text_center("Stacking Plates Game", BIG_FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.05)
             
-            # Recalculate home button positions and sizes for the adjusted content_rect
-            button_names = ["Play", "Levels", "Help", "Quit", "Leaderboard"]
-            
-            # Calculate total required height for buttons and spacing
-            num_buttons = len(button_names)
-            # Use available height for buttons, leaving some margin at top/bottom
-            available_height_for_buttons = current_content_rect.height * 0.7 # Approx 70% of box height
-            
-            # Calculate optimal button height and spacing to fill the space
-            # This will distribute buttons evenly
-            total_spacing_height = available_height_for_buttons * 0.2 # 20% of available height for spacing
-            button_height_calculated = (available_height_for_buttons - total_spacing_height) / num_buttons
-            
-            # Ensure button height is within reasonable bounds
-            button_height_calculated = max(int(50 * SCALE_FACTOR), min(int(80 * SCALE_FACTOR), button_height_calculated))
-            button_spacing_calculated = (available_height_for_buttons - (button_height_calculated * num_buttons)) / (num_buttons - 1) if num_buttons > 1 else 0
-            button_spacing_calculated = max(int(10 * SCALE_FACTOR), button_spacing_calculated) # Min spacing
-
-            # Recreate home buttons with dynamic dimensions for the current_content_rect
-            home_buttons = []
-            for i, text in enumerate(button_names):
-                btn_y = current_content_rect.top + current_content_rect.height * 0.15 + i * (button_height_calculated + button_spacing_calculated)
-                home_buttons.append(Button((current_content_rect.centerx - button_width_main // 2,
-                                            btn_y,
-                                            button_width_main, button_height_calculated), text))
-
+            home_buttons = screen_buttons
             for b in home_buttons: b.draw(screen)
 
         elif current_screen == "levels":
             draw_text_center("Select Level", BIG_FONT, WHITE, current_content_rect.top + current_content_rect.height * 0.05)
             
-            # Calculate dynamic start X for level buttons to center them within CONTENT_RECT
-            total_levels_row_width = (3 * level_button_width) + (2 * level_button_x_spacing)
-            start_x_levels = current_content_rect.centerx - total_levels_row_width // 2
-
-            level_buttons = []
-            for i in range(MAX_LEVELS):
-                row = i // 3
-                col = i % 3
-                btn_x = start_x_levels + col * (level_button_width + level_button_x_spacing)
-                btn_y = current_content_rect.top + current_content_rect.height * 0.15 + row * (level_button_height + level_button_y_spacing)
-                level_buttons.append(Button((btn_x, btn_y, level_button_width, level_button_height),
-                                             f"Level {i+1}", enabled=completed_levels[i]))
-
-
+            level_buttons = screen_buttons
             for i, b in enumerate(level_buttons):
+                b.enabled = completed_levels[i]
                 b.draw(screen)
                 
-                level_text_surface = FONT.render(f"{i+1}", True, BLACK) # Just the number
+                level_text_surface = text_cache.render(FONT, f"{i+1}", True, BLACK) # Just the number
                 level_text_rect = level_text_surface.get_rect(center=b.rect.center)
                 screen.blit(level_text_surface, level_text_rect)
 
                 if not b.enabled:
-                    l_icon = FONT.render("\U0001F512", True, RED)
+                    l_icon = text_cache.render(FONT, "\U0001F512", True, RED)
                     screen.blit(l_icon, (b.rect.right - int(b.rect.width * 0.2) + int(5 * SCALE_FACTOR),
                                          b.rect.top + int(b.rect.height * 0.15)))
             back_button.draw(screen)
@@ -469,12 +705,15 @@ def draw_screens():
                 "- Click stacks to move.",
                 "- Use ← Back to go back.",
                 "- Press Z to undo last move.",
-                "- Starts at 45 secs and increments 45 secs for every level."
+                "- Press H or click Hint: move from the orange stack to the purple one.",
+                "- Big levels: wheel scrolls, Ctrl+wheel or +/- zooms, 0 shows the whole board.",
+                "- Starts at 45 secs and increments 45 secs for every level.",
+                "- Endless: the levels keep coming, each bigger than the last."
             ]
             line_height = FONT.get_height() + int(8 * SCALE_FACTOR)
             start_y_help = current_content_rect.top + current_content_rect.height * 0.15
             for i, ln in enumerate(lines):
-                screen.blit(FONT.render(ln, True, BLACK), (current_content_rect.left + current_content_rect.width * 0.03, start_y_help + i * line_height))
+                screen.blit(text_cache.render(FONT, ln, True, BLACK), (current_content_rect.left + current_content_rect.width * 0.03, start_y_help + i * line_height))
             back_button.draw(screen)
 
         elif current_screen == "game":
@@ -484,31 +723,25 @@ def draw_screens():
             tleft = max(0, max_time_per_level - elapsed_time)
             
             # Level number in the middle top of the game area
-            level_num_text = FONT.render(f"Level: {selected_level + 1}", True, BLACK)
+            level_num_text = text_cache.render(FONT, f"Level: {selected_level + 1}", True, BLACK)
             level_num_rect = level_num_text.get_rect(centerx=current_content_rect.centerx,
                                                      top=current_content_rect.top + int(20 * SCALE_FACTOR))
             screen.blit(level_num_text, level_num_rect)
 
             # Info box for Time, Moves (top-right of CONTENT_RECT)
-            info_box_width = int(200 * SCALE_FACTOR)
-            info_box_height = int(70 * SCALE_FACTOR) # Adjusted height for 2 lines
-            info_box_x = current_content_rect.right - info_box_width - int(10 * SCALE_FACTOR)
-            info_box_y = current_content_rect.top + int(10 * SCALE_FACTOR)
-            
-            sb = pygame.Rect(info_box_x, info_box_y, info_box_width, info_box_height)
-            pygame.draw.rect(screen, (255, 255, 200), sb, border_radius=int(6 * SCALE_FACTOR))
-            pygame.draw.rect(screen, BLACK, sb, int(2 * SCALE_FACTOR), border_radius=int(6 * SCALE_FACTOR))
-            
-            text_padding_x = int(10 * SCALE_FACTOR)
-            text_line_height = SMALL_FONT.get_height() + int(2 * SCALE_FACTOR)
-
-            screen.blit(SMALL_FONT.render(f"Time Left: {tleft}s", True, BLACK), (sb.left + text_padding_x, sb.top + text_line_height * 0.5))
-            screen.blit(SMALL_FONT.render(f"Moves: {score}", True, BLACK), (sb.left + text_padding_x, sb.top + text_line_height * 1.5))
+            sb = get_info_box_rect(current_content_rect)
+            info_box.draw(screen, sb.topleft, (tleft, game.moves, game.min_to_go, sb.size), lambda: compose_info_box(sb.size, tleft))
+            if tablebase:
+                cb = get_coach_box_rect(current_content_rect)
+                lines = coach_lines()
+                coach_box.draw(screen, cb.topleft, (lines, cb.size), lambda: compose_coach_box(cb.size, lines))
             
             back_button.draw(screen)
             
             pause_button.text = "▶️" if paused else "⏸️"
             pause_button.draw(screen)
+            hint_button.text = hint_label()
+            hint_button.draw(screen)
 
             if paused:
                 overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
@@ -520,202 +753,225 @@ def draw_screens():
 
         elif current_screen == "win":
             draw_text_center("\U0001F389 CONGRATULATIONS!", HUGE_FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.1)
-            draw_text_center(f"Level {selected_level+1} Completed", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.25)
-            draw_text_center(f"Moves: {score} | Time: {elapsed_time}s", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.35)
+            draw_text_center(f"{'Endless level' if endless_level else 'Level'} {selected_level+1} (deal #{deal_number(dealt_seed)}) Completed", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.25)
+            draw_text_center(f"Moves: {game.moves} vs. par {par_label()} | Time: {elapsed_time}s", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.35)
             win_back_button.draw(screen)
-            win_next_button.enabled = (selected_level + 1 < MAX_LEVELS)
+            win_next_button.enabled = endless_level is not None or selected_level + 1 < MAX_LEVELS
             win_next_button.draw(screen)
 
         elif current_screen == "timeout":
             draw_text_center("⏰ TIME'S UP!", HUGE_FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.1)
-            draw_text_center(f"Level {selected_level+1} failed", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.25)
-            draw_text_center(f"Moves: {score} | Time: {elapsed_time}s", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.35)
+            draw_text_center(f"{'Endless level' if endless_level else 'Level'} {selected_level+1} failed", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.25)
+            draw_text_center(f"Moves: {game.moves} | Time: {elapsed_time}s", FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.35)
             timeout_retry_button.draw(screen)
             timeout_exit_button.draw(screen)
 
         elif current_screen == "leaderboard":
             draw_text_center("Leaderboard", BIG_FONT, BLACK, current_content_rect.top + current_content_rect.height * 0.05)
-            headers = ["Name", "Level", "Moves", "Time"]
-            header_y = current_content_rect.top + current_content_rect.height * 0.15
-            row_start_y = current_content_rect.top + current_content_rect.height * 0.22
-            
-            col_widths = [0.25, 0.15, 0.15, 0.15]
-            
-            current_x_offset = current_content_rect.left + current_content_rect.width * 0.05
-
-            for i, h in enumerate(headers):
-                screen.blit(FONT.render(h, True, BLACK), (current_x_offset, header_y))
-                if i < len(col_widths):
-                    current_x_offset += current_content_rect.width * col_widths[i]
-                else:
-                    current_x_offset += current_content_rect.width * (0.75 / len(headers))
-
-            current_x_offset_data_row = current_content_rect.left + current_content_rect.width * 0.05
-            
-            for i, (n, lv, mv, t) in enumerate(leaderboard_data[:10]):
-                temp_x_offset = current_x_offset_data_row
-                for j, val in enumerate([n, str(lv), str(mv), str(t)]):
-                    screen.blit(SMALL_FONT.render(val, True, RED), (temp_x_offset, row_start_y + i * (SMALL_FONT.get_height() + int(5 * SCALE_FACTOR))))
-                    if j < len(col_widths):
-                        temp_x_offset += current_content_rect.width * col_widths[j]
-                    else:
-                        temp_x_offset += current_content_rect.width * (0.75 / len(headers))
+            leaderboard_table.draw(screen, current_content_rect.topleft, (tuple(leaderboard_data[:10]), tuple(current_content_rect)),
+                                   lambda: compose_leaderboard_table(current_content_rect))
             
             back_button.draw(screen)
             clear_lb_button.draw(screen)
 
 # --- Main loop ---
-running = True
-selected_stack = None
-load_leaderboard()
-
-while running:
-    clock.tick(30)
-    pos = pygame.mouse.get_pos()
-
-    for e in pygame.event.get():
-        if e.type == pygame.QUIT:
-            running = False
-        
-        if e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE:
-            running = False
-
-        if current_screen == "start_screen":
-            if e.type == pygame.MOUSEBUTTONDOWN:
-                if start_game_button.is_clicked(pos):
-                    current_screen = "name_prompt" # Transition to name prompt after start screen
-        
-        elif current_screen == "name_prompt":
-            if e.type == pygame.KEYDOWN:
-                if input_active:
-                    if e.key == pygame.K_RETURN:
-                        if len(input_text.strip()) >= 2 and input_text.strip().isalpha():
-                            player_name = input_text.strip()
-                            current_screen = "home"
+def main():
+    global screen, current_screen, selected_level, selected_stack, player_name, input_text, input_error
+    global start_time, elapsed_time, paused, pause_start_time
+    open_display()
+    load_audio()
+    running = True
+    selected_stack = None
+    load_leaderboard()
+
+    while running:
+        events = scheduler.next_events(seconds_until_next_change())
+        profiler.begin_frame("events")
+        pos = pygame.mouse.get_pos()
+
+        for e in events:
+            if e.type == pygame.QUIT:
+                running = False
+
+            if e.type == pygame.KEYDOWN and e.key == pygame.K_F3:
+                profiler.toggle_hud()
+
+            if e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE:
+                running = False
+
+            if e.type == pygame.VIDEORESIZE and WINDOWED:
+                screen = pygame.display.set_mode((e.w, e.h), DISPLAY_FLAGS)
+                apply_resolution(e.w, e.h)
+                renderer.invalidate()
+
+            if current_screen == "start_screen":
+                if e.type == pygame.MOUSEBUTTONDOWN:
+                    if start_game_button.is_clicked(pos):
+                        current_screen = "name_prompt" # Transition to name prompt after start screen
+
+            elif current_screen == "name_prompt":
+                if e.type == pygame.KEYDOWN:
+                    if input_active:
+                        if e.key == pygame.K_RETURN:
+                            if len(input_text.strip()) >= 2 and input_text.strip().isalpha():
+                                player_name = input_text.strip()
+                                current_screen = "home"
+                                input_error = ""
+                            else:
+                                input_error = "Name must be at least 2 alphabetic characters."
+                        elif e.key == pygame.K_BACKSPACE:
+                            input_text = input_text[:-1]
                             input_error = ""
                         else:
-                            input_error = "Name must be at least 2 alphabetic characters."
-                    elif e.key == pygame.K_BACKSPACE:
-                        input_text = input_text[:-1]
-                        input_error = ""
-                    else:
-                        if len(input_text) < 20 and e.unicode.isalpha():
-                            input_text += e.unicode
-                            input_error = ""
-                        elif e.unicode.strip() and not e.unicode.isalpha():
-                             input_error = "Only alphabetic characters allowed."
-
-        elif e.type == pygame.MOUSEBUTTONDOWN:
-            if current_screen == "home":
-                for b in home_buttons: # Use the dynamically populated home_buttons
-                    if b.is_clicked(pos):
-                        if b.text == "Play":
-                            selected_level = 0
-                            init_game(0)
-                            current_screen = "game"
-                        elif b.text == "Levels":
-                            current_screen = "levels"
-                        elif b.text == "Help":
-                            current_screen = "help"
-                        elif b.text == "Quit":
-                            running = False
-                        elif b.text == "Leaderboard":
-                            current_screen = "leaderboard"
-
-            elif current_screen == "levels":
-                if back_button.is_clicked(pos):
-                    current_screen = "home"
-                else:
-                    for i, b in enumerate(level_buttons):
-                        if b.is_clicked(pos) and b.enabled:
-                            selected_level = i
-                            init_game(i)
-                            current_screen = "game"
-
-            elif current_screen == "help" and back_button.is_clicked(pos):
-                current_screen = "home"
-
-            elif current_screen == "game":
-                if pause_button.is_clicked(pos):
-                    if not paused:
-                        paused = True
-                        pause_start_time = time.time()
-                        pygame.mixer.music.pause()
-                    else:
-                        paused = False
-                        start_time += (time.time() - pause_start_time)
-                        pygame.mixer.music.unpause()
-                elif not paused:
+                            if len(input_text) < 20 and e.unicode.isalpha():
+                                input_text += e.unicode
+                                input_error = ""
+                            elif e.unicode.strip() and not e.unicode.isalpha():
+                                 input_error = "Only alphabetic characters allowed."
+
+            elif e.type == pygame.MOUSEBUTTONDOWN and e.button not in (4, 5): # The wheel scrolls the board (MOUSEWHEEL)
+                if current_screen == "home":
+                    for b in home_buttons: # Use the dynamically populated home_buttons
+                        if b.is_clicked(pos):
+                            if b.text == "Play":
+                                selected_level = 0
+                                init_game(0)
+                                current_screen = "game"
+                            elif b.text == "Levels":
+                                current_screen = "levels"
+                            elif b.text == "Endless":
+                                selected_level = 0
+                                start_endless()
+                                current_screen = "game"
+                            elif b.text == "Help":
+                                current_screen = "help"
+                            elif b.text == "Quit":
+                                running = False
+                            elif b.text == "Leaderboard":
+                                current_screen = "leaderboard"
+
+                elif current_screen == "levels":
                     if back_button.is_clicked(pos):
                         current_screen = "home"
                     else:
-                        cs = get_clicked_stack(pos)
-                        if cs is not None:
-                            if selected_stack is None and stacks[cs]:
-                                selected_stack = cs
-                            elif selected_stack is not None:
-                                move_success = move_plate(selected_stack, cs)
-                                selected_stack = None
-                                
-            if current_screen == "game" and not paused and is_win():
-                completed_levels[selected_level] = True 
-                if selected_level + 1 < MAX_LEVELS:
-                    completed_levels[selected_level + 1] = True
-                
-                if sound_win: sound_win.play()
-                
-                entry_exists = False
-                for idx, (name, level_lb, moves_lb, time_lb) in enumerate(leaderboard_data):
-                    if name == player_name and level_lb == selected_level + 1:
-                        entry_exists = True
-                        if moves_lb > score or (moves_lb == score and time_lb > elapsed_time):
-                            leaderboard_data[idx] = (player_name, selected_level + 1, score, elapsed_time)
-                            save_leaderboard()
-                        break
-                
-                if not entry_exists:
-                    add_to_leaderboard(player_name, selected_level + 1, score, elapsed_time)
-                
-                current_screen = "win"
-                pygame.mixer.music.play(-1)
-
-            elif current_screen == "win":
-                if win_back_button.is_clicked(pos):
-                    current_screen = "home"
-                elif win_next_button.is_clicked(pos) and win_next_button.enabled:
-                    selected_level += 1
-                    init_game(selected_level)
-                    current_screen = "game"
-
-            elif current_screen == "timeout":
-                if timeout_retry_button.is_clicked(pos):
-                    init_game(selected_level)
-                    current_screen = "game"
-                    pygame.mixer.music.play(-1)
-                elif timeout_exit_button.is_clicked(pos):
-                    current_screen = "home"
+                        for i, b in enumerate(level_buttons):
+                            if b.is_clicked(pos) and b.enabled:
+                                selected_level = i
+                                init_game(i)
+                                current_screen = "game"
 
-            elif current_screen == "leaderboard":
-                if back_button.is_clicked(pos):
+                elif current_screen == "help" and back_button.is_clicked(pos):
                     current_screen = "home"
-                elif clear_lb_button.is_clicked(pos):
-                    leaderboard_data.clear()
-                    save_leaderboard()
-
-        elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key == pygame.K_z:
-            if not paused:
-                undo_move()
-
-    if current_screen == "game" and not paused:
-        elapsed_time = int(time.time() - start_time)
-        if elapsed_time >= max_time_per_level:
-            current_screen = "timeout"
-            pygame.mixer.music.stop()
-            if sound_timeout: sound_timeout.play()
 
+                elif current_screen == "game":
+                    if pause_button.is_clicked(pos):
+                        if not paused:
+                            paused = True
+                            pause_start_time = time.time()
+                            pygame.mixer.music.pause()
+                        else:
+                            paused = False
+                            start_time += (time.time() - pause_start_time)
+                            pygame.mixer.music.unpause()
+                    elif not paused and hint_button.is_clicked(pos):
+                        hints.request(game, tablebase)
+                    elif not paused:
+                        if back_button.is_clicked(pos):
+                            current_screen = "home"
+                            hints.cancel()
+                            level_pipeline.cancel()
+                        else:
+                            cs = get_clicked_stack(pos)
+                            if cs is not None:
+                                if selected_stack is None and game.stacks[cs]:
+                                    selected_stack = cs
+                                elif selected_stack is not None:
+                                    move_success = move_plate(selected_stack, cs)
+                                    selected_stack = None
+
+                if current_screen == "game" and not paused and is_win():
+                    if not endless_level: # Endless wins do not unlock campaign levels
+                        completed_levels[selected_level] = True
+                        if selected_level + 1 < MAX_LEVELS:
+                            completed_levels[selected_level + 1] = True
+
+                    if sound_win: sound_win.play()
+
+                    record_result(leaderboard_data, player_name, ENDLESS if endless_level else CAMPAIGN, selected_level + 1,
+                                  deal_number(dealt_seed), game.moves, elapsed_time)
+
+                    current_screen = "win"
+                    pygame.mixer.music.play(-1)
 
-    draw_screens()
-    pygame.display.flip()
+                elif current_screen == "win":
+                    if win_back_button.is_clicked(pos):
+                        current_screen = "home"
+                        level_pipeline.cancel()
+                    elif win_next_button.is_clicked(pos) and win_next_button.enabled:
+                        selected_level += 1
+                        init_game(endless_next if endless_level else selected_level)
+                        current_screen = "game"
+
+                elif current_screen == "timeout":
+                    if timeout_retry_button.is_clicked(pos):
+                        init_game(endless_level or selected_level)
+                        current_screen = "game"
+                        pygame.mixer.music.play(-1)
+                    elif timeout_exit_button.is_clicked(pos):
+                        current_screen = "home"
+                        level_pipeline.cancel()
 
-pygame.quit()
-sys.exit()
\ No newline at end of file
+                elif current_screen == "leaderboard":
+                    if back_button.is_clicked(pos):
+                        current_screen = "home"
+                    elif clear_lb_button.is_clicked(pos):
+                        leaderboard_data.clear()
+                        save_leaderboard()
+
+            elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key == pygame.K_z:
+                if not paused:
+                    undo_move()
+
+            elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key == pygame.K_h:
+                if not paused:
+                    hints.request(game, tablebase)
+
+            elif e.type == pygame.KEYDOWN and current_screen == "game" and e.key in BOARD_KEYS:
+                if not paused:
+                    board_view.press(e.key)
+
+            elif e.type == pygame.MOUSEWHEEL and current_screen == "game":
+                if not paused:
+                    board_view.wheel(e.y, zoom=bool(pygame.key.get_mods() & pygame.KMOD_CTRL))
+
+        profiler.switch("timer")
+        hints.poll() # Take up what the hint worker found since the last frame
+        if current_screen == "game" and not paused:
+            elapsed_time = int(time.time() - start_time)
+            if elapsed_time >= max_time_per_level:
+                current_screen = "timeout"
+                pygame.mixer.music.stop()
+                if sound_timeout: sound_timeout.play()
+
+
+        profiler.switch("dirty")
+        track_dirty_regions()
+        drawn = renderer.needs_redraw()
+        if drawn:
+            profiler.switch("draw")
+            screen.set_clip(renderer.clip_rect()) # Repaint only what changed since the last frame
+            draw_screens()
+            profiler.draw_hud(screen)
+            screen.set_clip(None)
+            profiler.switch("present")
+            renderer.present()
+        profiler.end_frame(record=bool(events) or drawn, screen=current_screen, level=selected_level + 1,
+                           plates=total_plates if current_screen == "game" else None)
+
+    profiler.close()
+    print(scheduler.summary())
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
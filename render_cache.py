@@ -0,0 +1,143 @@
+from collections import OrderedDict
+
+import pygame
+
+# --- Gradient Cache ---
+# Background gradients never change for a given screen and resolution, so each
+# one is rendered once into a full-screen surface and simply blitted per frame.
+def build_gradient(top, bottom, size):
+    width, height = size
+    # A two-pixel ramp from top to bottom, smoothscaled into a one pixel wide column (within 1 of the
+    # per-row colors draw_gradient() used to produce), then stretched horizontally: two C-level scales
+    # instead of HEIGHT draw.line or set_at calls.
+    ramp = pygame.Surface((1, 2), 0, 32)
+    ramp.set_at((0, 0), top)
+    ramp.set_at((0, 1), bottom)
+    column = pygame.transform.smoothscale(ramp, (1, height))
+    surface = pygame.transform.scale(column, (width, height))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    return surface
+
+class GradientCache:
+    def __init__(self):
+        self.size = None
+        self.surfaces = {} # screen name -> (top, bottom, surface)
+
+    def get(self, name, top, bottom, size):
+        size = (int(size[0]), int(size[1]))
+        if size != self.size: # Resolution changed, every cached gradient is stale
+            self.surfaces.clear()
+            self.size = size
+        entry = self.surfaces.get(name)
+        if entry is None or entry[0] != top or entry[1] != bottom:
+            entry = (top, bottom, build_gradient(top, bottom, size))
+            self.surfaces[name] = entry
+        return entry[2]
+
+    def warm(self, colors, size):
+        for name, (top, bottom) in colors.items():
+            self.get(name, top, bottom, size)
+
+    def memory_bytes(self):
+        return sum(surface_bytes(s) for _, _, s in self.surfaces.values())
+
+# --- Text Cache ---
+# Most strings on screen (plate numbers, button labels, headers) are identical
+# from frame to frame. Rendered surfaces are kept in LRU order and evicted once
+# their combined pixel memory goes over the byte budget.
+class TextCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = self.misses = self.evictions = 0
+        self.entries = OrderedDict() # (font, text, color, antialias) -> surface
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, tuple(color), antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        self.bytes_used += surface_bytes(surface)
+        while self.bytes_used > self.max_bytes and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            self.bytes_used -= surface_bytes(old)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes_used = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self.entries), "bytes": self.bytes_used}
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+# --- Plate Atlas ---
+# Every plate of a level is pre-rendered once, in both its normal and selected
+# colors, so drawing a stack is a single Surface.blits() submission.
+class PlateAtlas:
+    def __init__(self, plate_widths, plate_height, font, border, colors, text_color=(0, 0, 0), labels=True):
+        self.plate_widths = plate_widths
+        self.plate_height = plate_height
+        self.font = font
+        self.border = border
+        self.colors = colors
+        self.text_color = text_color
+        self.labels = labels # False leaves the numbers off, for plates too thin to read them
+        # sprites[style][p] -> (surface, x offset from the stack center, y offset from the plate top)
+        self.sprites = {style: {p: render_plate(p, w, plate_height, font if labels else None, border, color, text_color)
+                                for p, w in plate_widths.items()}
+                        for style, color in colors.items()}
+        # How far a number can stick out above or below its plate
+        self.overhang = max((-dy for sprites in self.sprites.values() for _, _, dy in sprites.values()), default=0)
+
+    def resized(self, plate_height, labels=True):
+        # The same plates at another height (board_view.py zooming)
+        return PlateAtlas(self.plate_widths, plate_height, self.font, min(self.border, max(1, plate_height // 4)),
+                          self.colors, self.text_color, labels)
+
+    def stack_blits(self, stack, x_center, y_base, step, style, lo=0, hi=None):
+        # Same placement draw_stacks() always used: the last plate of the list at the base, going up.
+        # Only plates lo .. hi - 1 counted up from the base are drawn (all of them by default)
+        sprites = self.sprites[style]
+        hi = len(stack) if hi is None else min(hi, len(stack))
+        y = y_base - self.plate_height - lo * step
+        seq = []
+        for k in range(lo, hi):
+            surface, dx, dy = sprites[stack[-1 - k]]
+            seq.append((surface, (x_center + dx, y + dy)))
+            y -= step
+        return seq
+
+    def memory_bytes(self):
+        return sum(surface_bytes(s) for sprites in self.sprites.values() for s, _, _ in sprites.values())
+
+def render_plate(p, width, height, font, border, color, text_color):
+    if font is None:
+        text, tw, th = None, 0, 0
+    else:
+        text = font.render(str(p), True, text_color)
+        tw, th = text.get_size()
+    text_x, text_y = width // 2 - tw // 2, height // 2 - th // 2
+    # The number may stick out of thin plates; grow the sprite (transparent margin) so nothing is cut off
+    ox, oy = min(0, text_x), min(0, text_y)
+    size = (max(width, text_x + tw) - ox, max(height, text_y + th) - oy)
+    padded = size != (width, height)
+    surface = pygame.Surface(size, pygame.SRCALPHA if padded else 0)
+    plate_rect = pygame.Rect(-ox, -oy, width, height)
+    pygame.draw.rect(surface, color, plate_rect)
+    pygame.draw.rect(surface, (0, 0, 0), plate_rect, border)
+    if text is not None:
+        surface.blit(text, (text_x - ox, text_y - oy))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha() if padded else surface.convert()
+    return surface, -(width // 2) + ox, oy
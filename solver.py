@@ -0,0 +1,217 @@
+import argparse
+import heapq
+import random
+import sys
+import time
+
+from engine import GameState, level_size, plate_bound
+from state_codec import StateCodec, deep_size
+
+# --- Optimal Solver ---
+# A* over positions under the engine's rules, with a transposition table keyed by
+# the packed position code (see state_codec.py), which ignores the order of the
+# stacks since that does not matter for the distance to a win. Children get their
+# code from the parent's in O(1). The heuristic never overestimates, so the first win
+# taken off the heap is a shortest solution; its length is the level's par.
+#
+#   python solver.py --level 4 --seed 7       par, solution line and search stats of one deal
+#   python solver.py --level 3 --deals 50     the same over many deals, plus the slowest
+#   python solver.py --level 2 --bfs          plain breadth-first search, to check the heuristic
+#   python solver.py --level 3 --quick        A* on the engine's cheaper plate_bound() instead
+
+def lower_bound(stacks):
+    # Never more moves than a win takes:
+    # - Plates on the bottom run 1, 2, 3 ... of the home stack never have to move. Every other
+    #   plate moves at least once, and twice if a smaller plate is below it (its first move
+    #   cannot be its last, since that smaller plate has to go home first). This part alone is
+    #   engine.plate_bound(), which the game keeps up to date on every move.
+    # - Such a plate gets away with two moves only if it waits alone on an empty stack. When
+    #   plate p goes home, every plate above p that now sits on something no bigger than p is
+    #   still waiting, and the stacks they can wait on alone are limited: not the home stack,
+    #   not the one p leaves from, and only stacks that are empty or have a bottom plate below
+    #   p (emptying any other one costs its bottom plate an extra move as well). Each waiting
+    #   plate beyond that moves at least three times.
+    total = 0
+    settled = 0
+    home = None
+    for i, stack in enumerate(stacks):
+        total += len(stack)
+        if stack and stack[0] == 1:
+            home = i
+            while settled < len(stack) and stack[settled] == settled + 1:
+                settled += 1
+    bound = 0
+    waiting = [0] * (total + 2) # waiting[p]: change in the plates still waiting when p goes home
+    bottoms = [0] * (total + 2) # bottoms[b]: stacks (not home) with bottom plate b, 0 for empty
+    parked = [False] * (total + 2) # Plate has a smaller one below it
+    for i, stack in enumerate(stacks):
+        if i == home:
+            start = settled
+        else:
+            start = 0
+            bottoms[stack[0] if stack else 0] += 1
+        lowest = stack[0] if stack else 0
+        for plate in stack[start:]:
+            if lowest < plate:
+                bound += 2
+                parked[plate] = True
+                waiting[lowest if lowest > settled else settled + 1] += 1
+                waiting[plate] -= 1
+            else:
+                bound += 1
+                lowest = plate
+    extra = 0
+    still_waiting = 0
+    spare = -1 if home is None else 0 # Plate 1 needs an empty stack to start the home stack on
+    cap = len(stacks) - 2
+    for p in range(1, total + 1):
+        still_waiting += waiting[p]
+        spare += bottoms[p - 1]
+        if p > settled:
+            alone = spare - parked[p] # p needs one of them itself if it has to move off a smaller plate first
+            if alone > cap:
+                alone = cap
+            if still_waiting - alone > extra:
+                extra = still_waiting - alone
+    return bound + extra
+
+def is_solved(stacks, total_plates):
+    for stack in stacks:
+        if len(stack) == total_plates:
+            return all(stack[i] < stack[i + 1] for i in range(total_plates - 1))
+    return False
+
+class Solution:
+    __slots__ = ("moves", "nodes_expanded", "nodes_generated", "table_bytes", "seconds")
+
+    def __init__(self, moves, nodes_expanded, nodes_generated, table_bytes, seconds):
+        self.moves = moves # [(from, to), ...] on the stacks as given, None if there is no solution or the search gave up
+        self.nodes_expanded = nodes_expanded
+        self.nodes_generated = nodes_generated
+        self.table_bytes = table_bytes # Approximate size of the transposition table
+        self.seconds = seconds
+
+    @property
+    def par(self):
+        return None if self.moves is None else len(self.moves)
+
+    def __repr__(self):
+        return (f"Solution(par={self.par}, expanded={self.nodes_expanded}, generated={self.nodes_generated}, "
+                f"table={self.table_bytes / 1024:.0f} KiB, {self.seconds * 1000:.1f} ms)")
+
+def table_size(table):
+    # Bytes held by the table: the dict itself plus its keys and entries (parent keys are shared with the keys)
+    return sys.getsizeof(table) + sum(deep_size(key) + sys.getsizeof(entry) for key, entry in table.items())
+
+def replay(start, keys):
+    # Turns a chain of position codes back into (from, to) moves on the stacks as given
+    state = GameState(start)
+    moves = []
+    for key in keys:
+        for f, t in list(state.legal_moves()):
+            state.move(f, t)
+            if state.packed == key:
+                moves.append((f, t))
+                break
+            state.undo()
+    return moves
+
+def solve(stacks, total_plates=None, heuristic=lower_bound, deadline=None, stop=None):
+    # Shortest move sequence from `stacks` to a win; heuristic=None turns A* into plain breadth-first search.
+    # Gives up (moves None) once time.perf_counter() passes `deadline` or stop() turns true
+    started = time.perf_counter()
+    start = tuple(map(tuple, stacks))
+    if total_plates is None:
+        total_plates = sum(map(len, start))
+    h = heuristic or (lambda s: 0)
+    home_runs = [tuple(range(1, i + 1)) for i in range(total_plates + 1)]
+    shifts = StateCodec.for_plates(total_plates).shifts
+
+    start_key = StateCodec.for_plates(total_plates).encode(start)
+    table = {start_key: (0, None)} # position code -> (moves from start, parent code)
+    heap = [(h(start), 0, 0, start, start_key)] # (f, -g, tie-break, position, key)
+    counter = 1
+    expanded = 0
+    count = len(start)
+    while heap:
+        _, neg_g, _, position, key = heapq.heappop(heap)
+        g = -neg_g
+        if table[key][0] < g:
+            continue # Reached more cheaply since this entry was pushed
+        if is_solved(position, total_plates):
+            keys = []
+            while key != start_key:
+                keys.append(key)
+                key = table[key][1]
+            keys.reverse()
+            seconds = time.perf_counter() - started
+            return Solution(replay(start, keys), expanded, counter, table_size(table), seconds)
+        expanded += 1
+        if (deadline is not None and time.perf_counter() > deadline) or (stop and stop()):
+            break
+        for f in range(count):
+            src = position[f]
+            if not src or src == home_runs[len(src)]:
+                continue # Nothing to move, or the start of the winning stack
+            top = src[-1]
+            lifted = key ^ ((src[-2] if len(src) > 1 else 0) << shifts[top])
+            tried_empty = len(src) == 1 # Every empty stack is the same move, and a lone plate gains nothing from one
+            for t in range(count):
+                dst = position[t]
+                if t == f:
+                    continue
+                if dst:
+                    if top < dst[-1]:
+                        continue
+                elif tried_empty:
+                    continue
+                else:
+                    tried_empty = True
+                child = list(position)
+                child[f] = src[:-1]
+                child[t] = dst + (top,)
+                child_key = lifted ^ ((dst[-1] if dst else 0) << shifts[top])
+                seen = table.get(child_key)
+                if seen is not None and seen[0] <= g + 1:
+                    continue
+                table[child_key] = (g + 1, key)
+                heapq.heappush(heap, (g + 1 + h(child), -(g + 1), counter, tuple(child), child_key))
+                counter += 1
+    return Solution(None, expanded, counter, table_size(table), time.perf_counter() - started)
+
+def check_solution(stacks, moves):
+    # Replays a move list through the engine; True if every move is legal and it ends in a win
+    state = GameState(stacks)
+    return all(state.move(f, t) for f, t in moves) and state.is_win()
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimal solutions for Stacking Plates levels")
+    parser.add_argument("--level", type=int, default=0, help="0-based, as in the game (default 0)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for dealing the level")
+    parser.add_argument("--deals", type=int, default=1, help="solve this many deals in a row")
+    parser.add_argument("--bfs", action="store_true", help="breadth-first search instead of A*")
+    parser.add_argument("--quick", action="store_true", help="A* on plate_bound() instead of lower_bound()")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    total_plates, stack_count = level_size(args.level)
+    slowest = None
+    for _ in range(args.deals):
+        stacks = GameState.deal(total_plates, stack_count, rng).stacks
+        solution = solve(stacks, total_plates, heuristic=None if args.bfs else plate_bound if args.quick else lower_bound)
+        if args.deals == 1:
+            print(f"Layout:   {stacks}")
+            print(f"Par:      {solution.par} (lower bound {lower_bound(stacks)})")
+            print(f"Solution: {' '.join(f'{f + 1}>{t + 1}' for f, t in solution.moves)}")
+            print(f"Search:   {solution.nodes_expanded} expanded, {solution.nodes_generated} generated, "
+                  f"{solution.table_bytes / 1024:.0f} KiB table, {solution.seconds * 1000:.1f} ms")
+            print(f"Replays:  {check_solution(stacks, solution.moves)}")
+        else:
+            print(f"{stacks}: {solution}")
+            if slowest is None or solution.seconds > slowest[1].seconds:
+                slowest = (stacks, solution)
+    if slowest:
+        print(f"Slowest: {slowest[0]}: {slowest[1]}")
+
+if __name__ == "__main__":
+    main()
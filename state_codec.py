@@ -0,0 +1,88 @@
+import random
+import sys
+from collections import OrderedDict
+
+# --- Compact Position Encoding ---
+# A position is described by what every plate sits on: another plate, or the
+# floor (0). That says nothing about which stack is which, so positions that
+# only differ by the order of their stacks (including where the empty ones are)
+# get the same code, and a move only ever changes the entry of the plate that
+# moved. Two forms are kept:
+#   packed   one int, plate p's entry in bits (p-1)*bits .. p*bits-1; exact and
+#            reversible (given the stack count), so it can key a transposition table
+#   zobrist  64-bit XOR of a random key per (plate, what it sits on); fixed width,
+#            for hashing into caches and partitioning work
+# Both are updated in O(1) when a plate is lifted or placed.
+ZOBRIST_SEED = 0x5EED5EED # Fixed so hashes stay the same across runs and processes
+CODEC_CACHE_SIZE = 4 # Plate counts whose codecs are kept; an endless run would otherwise keep one per level
+
+class StateCodec:
+    __slots__ = ("total_plates", "bits", "shifts", "zobrist_keys")
+    _cache = OrderedDict() # Plate count -> codec, least recently used first
+
+    def __init__(self, total_plates):
+        self.total_plates = total_plates
+        self.bits = max(1, total_plates.bit_length()) # Enough for 0 (floor) .. total_plates
+        self.shifts = [(plate - 1) * self.bits for plate in range(total_plates + 1)] # shifts[0] is unused
+        rng = random.Random(ZOBRIST_SEED)
+        self.zobrist_keys = [[rng.getrandbits(64) for _ in range(total_plates + 1)] for _ in range(total_plates + 1)]
+
+    @classmethod
+    def for_plates(cls, total_plates):
+        # One shared codec per plate count (states keep theirs, so dropping one from the cache is safe)
+        codec = cls._cache.get(total_plates)
+        if codec is None:
+            codec = cls._cache[total_plates] = cls(total_plates)
+            while len(cls._cache) > CODEC_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        else:
+            cls._cache.move_to_end(total_plates)
+        return codec
+
+    def encode(self, stacks):
+        packed = 0
+        shifts = self.shifts
+        for stack in stacks:
+            below = 0
+            for plate in stack:
+                packed |= below << shifts[plate]
+                below = plate
+        return packed
+
+    def zobrist(self, stacks):
+        h = 0
+        keys = self.zobrist_keys
+        for stack in stacks:
+            below = 0
+            for plate in stack:
+                h ^= keys[plate][below]
+                below = plate
+        return h
+
+    def toggle(self, packed, zobrist, plate, below):
+        # Codes after lifting `plate` off `below` (0 for the floor), or after putting it down there
+        return packed ^ (below << self.shifts[plate]), zobrist ^ self.zobrist_keys[plate][below]
+
+    def decode(self, packed, stack_count):
+        # Stacks ordered by their bottom plate, empty ones last
+        mask = (1 << self.bits) - 1
+        below = [0] + [(packed >> self.shifts[plate]) & mask for plate in range(1, self.total_plates + 1)]
+        above = {below[plate]: plate for plate in range(1, self.total_plates + 1) if below[plate]}
+        stacks = []
+        for plate in range(1, self.total_plates + 1):
+            if below[plate] == 0:
+                stack = [plate]
+                while stack[-1] in above:
+                    stack.append(above[stack[-1]])
+                stacks.append(stack)
+        return stacks + [[] for _ in range(stack_count - len(stacks))]
+
+    def packed_bytes(self, packed):
+        # Fixed-width bytes form, for storing codes on disk or in shared memory
+        return packed.to_bytes(-(-self.total_plates * self.bits // 8), "little")
+
+def deep_size(key):
+    # Bytes held by a key built from tuples and ints (small ints are shared, so not counted)
+    if isinstance(key, tuple):
+        return sys.getsizeof(key) + sum(deep_size(item) for item in key)
+    return sys.getsizeof(key) if isinstance(key, int) and not -5 <= key <= 256 else 0
@@ -0,0 +1,181 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+
+from engine import GameState, level_size
+from state_codec import StateCodec
+
+# --- Endgame Tablebase ---
+# Moves-to-win of every position of the small levels, worked out once by
+# retrograde analysis (breadth-first from the win, playing moves backwards) and
+# stored in a file that the game memory-maps, so looking a position up is a
+# binary search with no solving at runtime.
+#
+# File layout: a header (magic, version, plates, stacks, code width, count), then
+# the packed codes of all positions sorted and written big-endian at a fixed
+# width (byte order is numeric order), then one byte of distance per code.
+#
+#   python tablebase.py                       build the tables for levels 1-3
+#   python tablebase.py --level 3 --check     build level 4's and compare with solver.py
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+TABLEBASE_LEVELS = [0, 1, 2] # 4 plates / 3 stacks, 6 / 3, 8 / 4
+HEADER = struct.Struct("<4sBBBBI")
+MAGIC = b"PLTB"
+VERSION = 1
+
+def tablebase_path(total_plates, stack_count, directory=TABLEBASE_DIR):
+    return os.path.join(directory, f"plates{total_plates}_stacks{stack_count}.tb")
+
+def retrograde(total_plates, stack_count):
+    # {packed code: moves to win} for every position that can still be won
+    codec = StateCodec.for_plates(total_plates)
+    shifts = codec.shifts
+    goal = tuple([tuple(range(1, total_plates + 1))] + [()] * (stack_count - 1))
+    goal_code = codec.encode(goal)
+    distance = {goal_code: 0}
+    frontier = [(goal_code, goal)]
+    depth = 0
+    while frontier:
+        depth += 1
+        layer = []
+        for code, position in frontier:
+            for a, src in enumerate(position):
+                if not src:
+                    continue
+                top = src[-1]
+                below = src[-2] if len(src) > 1 else 0
+                if below > top:
+                    continue # Could not have been put there: it sits on a bigger plate
+                lifted = code ^ (below << shifts[top])
+                tried_empty = len(src) == 1
+                for b, dst in enumerate(position):
+                    if b == a:
+                        continue
+                    if not dst:
+                        if tried_empty:
+                            continue
+                        tried_empty = True
+                    parent_code = lifted ^ ((dst[-1] if dst else 0) << shifts[top])
+                    if parent_code in distance:
+                        continue
+                    distance[parent_code] = depth
+                    parent = list(position)
+                    parent[a] = src[:-1]
+                    parent[b] = dst + (top,)
+                    layer.append((parent_code, tuple(parent)))
+        frontier = layer
+    return distance
+
+def build(total_plates, stack_count, directory=TABLEBASE_DIR):
+    # Writes the table for one level size; returns the number of positions
+    distance = retrograde(total_plates, stack_count)
+    codec = StateCodec.for_plates(total_plates)
+    width = -(-total_plates * codec.bits // 8)
+    codes = sorted(distance)
+    os.makedirs(directory, exist_ok=True)
+    path = tablebase_path(total_plates, stack_count, directory)
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, total_plates, stack_count, width, len(codes)))
+        f.write(b"".join(code.to_bytes(width, "big") for code in codes))
+        f.write(bytes(distance[code] for code in codes))
+    os.replace(path + ".tmp", path)
+    return len(codes)
+
+class Tablebase:
+    _open = {}
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.total_plates, self.stack_count, self.width, self.count = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} tablebase")
+        self.codes_at = HEADER.size
+        self.distances_at = HEADER.size + self.count * self.width
+        self.codec = StateCodec.for_plates(self.total_plates)
+        self.advice_key = None
+        self.advice_value = None
+
+    @classmethod
+    def load(cls, total_plates, stack_count, directory=TABLEBASE_DIR):
+        # The table for a level size, opened once and shared; None if it has not been built
+        key = (total_plates, stack_count, directory)
+        if key not in cls._open:
+            path = tablebase_path(total_plates, stack_count, directory)
+            cls._open[key] = cls(path) if os.path.exists(path) else None
+        return cls._open[key]
+
+    def lookup(self, code):
+        # Moves to win from a packed code, None if the position is not in the table
+        key = code.to_bytes(self.width, "big")
+        data, width, base = self.data, self.width, self.codes_at
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            at = base + mid * width
+            probe = data[at:at + width]
+            if probe == key:
+                return data[self.distances_at + mid]
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def distance(self, stacks):
+        return self.lookup(self.codec.encode(stacks))
+
+    def advice(self, state):
+        # (best move as (from, to) or None when won, moves to go) for a GameState; the last answer is cached
+        key = state.key()
+        if key != self.advice_key:
+            shifts = self.codec.shifts
+            best = None
+            best_distance = None
+            for f, t in state.legal_moves():
+                top = state.stacks[f][-1]
+                below = state.stacks[f][-2] if len(state.stacks[f]) > 1 else 0
+                onto = state.stacks[t][-1] if state.stacks[t] else 0
+                d = self.lookup(state.packed ^ ((below ^ onto) << shifts[top]))
+                if d is not None and (best_distance is None or d < best_distance):
+                    best, best_distance = (f, t), d
+            togo = self.lookup(state.packed)
+            self.advice_key = key
+            self.advice_value = (None if togo == 0 else best, togo)
+        return self.advice_value
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the endgame tablebases of the small levels")
+    parser.add_argument("--level", type=int, action="append", help="0-based level (default: levels 1-3)")
+    parser.add_argument("--dir", default=TABLEBASE_DIR)
+    parser.add_argument("--check", type=int, nargs="?", const=100, default=0, metavar="DEALS",
+                        help="compare with solver.py on this many random deals (default 100)")
+    args = parser.parse_args()
+
+    for level in args.level or TABLEBASE_LEVELS:
+        total_plates, stack_count = level_size(level)
+        started = time.perf_counter()
+        count = build(total_plates, stack_count, args.dir)
+        path = tablebase_path(total_plates, stack_count, args.dir)
+        print(f"Level {level + 1}: {count} positions, {os.path.getsize(path) / 1024:.0f} KiB, "
+              f"{time.perf_counter() - started:.1f}s -> {path}")
+        if args.check:
+            from solver import solve
+            table = Tablebase.load(total_plates, stack_count, args.dir)
+            rng = random.Random(level)
+            for _ in range(args.check):
+                stacks = GameState.deal(total_plates, stack_count, rng).stacks
+                par = solve(stacks, total_plates).par
+                if table.distance(stacks) != par:
+                    raise SystemExit(f"Mismatch on {stacks}: table {table.distance(stacks)}, solver {par}")
+            print(f"  matches solver.py on {args.check} deals")
+
+if __name__ == "__main__":
+    main()
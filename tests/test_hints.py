@@ -0,0 +1,37 @@
+import random
+import time
+
+from engine import GameState
+from hints import HintEngine
+
+def wait_for(condition, seconds):
+    # True once condition() holds, False if it still does not after `seconds`
+    deadline = time.perf_counter() + seconds
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+def test_moving_a_plate_stops_the_search():
+    # 300 plates on 20 stacks keep the worker busy for the whole budget
+    hints = HintEngine(budget=30.0)
+    state = GameState.deal(300, 20, random.Random(1))
+    hints.request(state)
+    assert wait_for(lambda: hints.busy, 1.0)
+    time.sleep(0.2) # Well into the search
+    state.move(*next(iter(state.legal_moves())))
+    hints.cancel()
+    assert wait_for(lambda: not hints.busy, 0.25)
+    assert not hints.poll()
+    assert hints.hint is None and not hints.searching
+
+def test_next_hint_is_not_held_up_by_a_cancelled_search():
+    hints = HintEngine(budget=30.0)
+    hints.request(GameState.deal(300, 20, random.Random(2)))
+    assert wait_for(lambda: hints.busy, 1.0)
+    time.sleep(0.2)
+    small = GameState.deal(8, 4, random.Random(2))
+    hints.request(small)
+    assert wait_for(hints.poll, 1.0)
+    assert hints.hint is not None and small.is_valid_move(*hints.hint.move)
@@ -0,0 +1,32 @@
+import threading
+import time
+
+from level_pipeline import LevelPipeline, ParSolver
+
+def searching(stopped, started):
+    # A solve or prepare that runs until its stop() turns true, then notes that it ended
+    def run(*args):
+        stop = args[-1]
+        started.set()
+        while not stop():
+            time.sleep(0.001)
+        stopped.set()
+    return run
+
+def test_a_new_level_stops_the_par_solve():
+    started, stopped = threading.Event(), threading.Event()
+    par_solver = ParSolver()
+    par_solver.start(searching(stopped, started))
+    assert started.wait(1.0)
+    par_solver.known(12)
+    assert stopped.wait(0.25)
+    assert par_solver.result() == (True, 12)
+
+def test_cancel_stops_the_level_being_prepared():
+    started, stopped = threading.Event(), threading.Event()
+    pipeline = LevelPipeline(searching(stopped, started))
+    pipeline.prefetch([3])
+    assert started.wait(1.0)
+    pipeline.cancel()
+    assert stopped.wait(0.25)
+    assert pipeline.take(3) is None
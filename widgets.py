@@ -0,0 +1,45 @@
+import pygame
+
+# --- Retained Widgets ---
+# A widget keeps the surface it last composited together with the state it was
+# built from (text, enabled flag, size ...). Drawing just blits that surface;
+# it is only recomposed when the state tuple changes.
+class RetainedSurface:
+    def __init__(self):
+        self.state = None
+        self.surface = None
+        self.offset = (0, 0)
+        self.rebuilds = 0
+
+    def draw(self, target, topleft, state, compose):
+        if self.surface is None or state != self.state:
+            self.surface, self.offset = compose()
+            self.state = state
+            self.rebuilds += 1
+        target.blit(self.surface, (topleft[0] + self.offset[0], topleft[1] + self.offset[1]))
+
+def compose_labels(labels):
+    # Just the labels, cropped to their bounding box; returns (surface, offset) like compose_panel()
+    rects = [surface.get_rect(topleft=(int(x), int(y))) for surface, (x, y) in labels]
+    bounds = rects[0].unionall(rects[1:])
+    surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+    for label, (x, y) in labels:
+        surface.blit(label, (int(x) - bounds.x, int(y) - bounds.y))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    return surface, bounds.topleft
+
+def compose_panel(size, fill, border_color, border, radius, labels=()):
+    # Rounded box with labels on top; labels are (surface, (x, y)) relative to the box and may
+    # stick out of it, in which case the surface grows (transparent) so nothing is cut off.
+    box = pygame.Rect((0, 0), size)
+    bounds = box.unionall([surface.get_rect(topleft=(int(x), int(y))) for surface, (x, y) in labels])
+    surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+    box.move_ip(-bounds.x, -bounds.y)
+    pygame.draw.rect(surface, fill, box, border_radius=radius)
+    pygame.draw.rect(surface, border_color, box, border, border_radius=radius)
+    for label, (x, y) in labels:
+        surface.blit(label, (int(x) - bounds.x, int(y) - bounds.y))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    return surface, bounds.topleft